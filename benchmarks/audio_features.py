@@ -0,0 +1,99 @@
+"""Compares the audio analysis of a synthetic song in one process and in a
+process pool, timing each and checking that the features match.
+
+Usage:
+    python benchmarks/audio_features.py --seconds 600 --n_jobs 2 4
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import librosa
+import numpy as np
+
+from deep_lyric_visualizer.render.audio_features import AudioFeatures
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from run_benchmarks import git_commit  # noqa: E402
+from synthetic import make_audio  # noqa: E402
+
+
+def max_differences(features, reference):
+    """Returns the largest absolute difference of each feature."""
+    return {name: float(np.abs(getattr(features, name) -
+                               getattr(reference, name)).max())
+            for name in ('specm', 'gradm', 'chroma')}
+
+
+def run(args, audio_file):
+    y, sr = librosa.load(audio_file)
+
+    runs = []
+    reference = None
+    for n_jobs in [1] + args.n_jobs:
+        for source in ('audio', 'file') if args.stream_audio else ('audio',):
+            start = time.perf_counter()
+            if source == 'audio':
+                features = AudioFeatures.from_audio(
+                    y, sr, args.frame_length, n_jobs=n_jobs,
+                    block_frames=args.block_frames)
+            else:
+                features = AudioFeatures.from_file(
+                    audio_file, args.frame_length, n_jobs=n_jobs,
+                    block_frames=args.block_frames)
+            seconds = time.perf_counter() - start
+
+            if reference is None:
+                reference = features
+            runs.append(dict(source=source, n_jobs=n_jobs, seconds=seconds,
+                             frames=len(features),
+                             max_difference=max_differences(features,
+                                                            reference)))
+            print(f'{source:>5} n_jobs={n_jobs:<3} {seconds:8.2f}s '
+                  f'{reference_speedup(runs):5.2f}x ' +
+                  ' '.join(f'{k}={v:.2e}'
+                           for k, v in runs[-1]['max_difference'].items()))
+    return runs
+
+
+def reference_speedup(runs):
+    return runs[0]['seconds'] / runs[-1]['seconds']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, default=600)
+    parser.add_argument('--n_jobs', type=int, nargs='+',
+                        default=[os.cpu_count()])
+    parser.add_argument('--frame_length', type=int, default=512)
+    parser.add_argument('--block_frames', type=int, default=4096)
+    parser.add_argument('--stream_audio', type=int, default=1,
+                        help='Also time the analysis streamed from the file.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as project_path:
+        audio_file = os.path.join(project_path, 'song.wav')
+        make_audio(audio_file, args.seconds, seed=args.seed)
+        runs = run(args, audio_file)
+
+    if args.output:
+        result = dict(commit=git_commit(),
+                      timestamp=datetime.datetime.now().isoformat(),
+                      platform=platform.platform(),
+                      python=platform.python_version(),
+                      cpus=os.cpu_count(),
+                      params=vars(args),
+                      runs=runs)
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
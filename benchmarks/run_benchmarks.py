@@ -0,0 +1,245 @@
+"""Runs the whole pipeline on a synthetic song with stand-in models and records
+the time spent in each stage, so that changes can be compared run to run.
+
+Usage:
+    python benchmarks/run_benchmarks.py --seconds 30 --output results.json
+"""
+import argparse
+import datetime
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+import librosa
+import numpy as np
+
+from deep_lyric_visualizer import instrumentation
+from deep_lyric_visualizer.helpers import create_imagenet_yaml
+from deep_lyric_visualizer.image_categories.image_categories import (
+    ImageCategories)
+from deep_lyric_visualizer.image_categories.image_category_tokenizer import (
+    ImageCategoryTokenizer)
+from deep_lyric_visualizer.lyrics.lyrics import Lyrics
+from deep_lyric_visualizer.render.audio_features import AudioFeatures
+from deep_lyric_visualizer.render.renderer import (
+    FrameRenderer, parse_batch_size, to_uint8_frames)
+from deep_lyric_visualizer.render.sparse_vectors import densify
+from deep_lyric_visualizer.render.vectors import song_vectors
+from deep_lyric_visualizer.render.video_encoder import VideoEncoder
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from standins import BenchmarkEnvironment, write_config  # noqa: E402
+from synthetic import make_audio, make_lrc  # noqa: E402
+
+SONGNAME = 'benchmark_song'
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def setup_project(project_path, seconds, seed):
+    """Creates the directory structure, configuration, song and lyrics used
+    by the benchmark.
+
+    Returns:
+        tuple (str, str, str): The configuration file, the image class file
+            and the audio file.
+    """
+    song_dir = os.path.join(project_path, 'data', 'lyrics', SONGNAME)
+    os.makedirs(song_dir)
+    os.makedirs(os.path.join(project_path, 'data', 'processed'))
+    os.makedirs(os.path.join(project_path, 'data', 'embeddings', SONGNAME))
+
+    make_lrc(os.path.join(song_dir, f'{SONGNAME}.lrc'), seconds, seed=seed)
+    audio_file = os.path.join(project_path, f'{SONGNAME}.wav')
+    make_audio(audio_file, seconds, seed=seed)
+
+    class_file = os.path.join(project_path, 'data', 'processed',
+                              'image_classes.yml')
+    create_imagenet_yaml(class_file)
+
+    return write_config(project_path), class_file, audio_file
+
+
+def write_video(frames, fps, audio_file, path):
+    """Writes the frames to a video with moviepy, as visualize.py does with
+    subtitles, if moviepy is installed.
+
+    Returns:
+        int: The number of frames written.
+    """
+    try:
+        import moviepy.editor as mpy
+    except ImportError:
+        return 0
+
+    # the pinned moviepy 0.2 silences its progress bar with progress_bar,
+    # which moviepy 1.0 replaced with logger
+    quiet = dict(verbose=False, progress_bar=False)
+    if 'logger' in inspect.signature(
+            mpy.VideoClip.write_videofile).parameters:
+        quiet = dict(verbose=False, logger=None)
+
+    clip = mpy.ImageSequenceClip(frames, fps=fps)
+    clip = clip.set_audio(mpy.AudioFileClip(audio_file).subclip(
+        0, len(frames) / fps))
+    clip.write_videofile(path, codec='libx264', audio_codec='aac', fps=fps,
+                         **quiet)
+    return len(frames)
+
+
+def run(args, project_path):
+    span = instrumentation.span
+    cfg, class_file, audio_file = setup_project(
+        project_path, args.seconds, args.seed)
+    np.random.seed(args.seed)
+
+    env = BenchmarkEnvironment(cfg, class_file)
+    lyrics = Lyrics(SONGNAME, gen_env=env)
+    image_categories = ImageCategories(
+        tokenizer=ImageCategoryTokenizer(env, method=args.tokenizer,
+                                         n_jobs=args.n_jobs),
+        gen_env=env)
+
+    with span('tokenization') as st:
+        st.items = len(lyrics.tokens)
+
+    with span('vectorization') as st:
+        st.items = len(lyrics.word_to_vec)
+
+    with span('category_tokenization') as st:
+        st.items = len(image_categories.tokens)
+
+    with span('category_vectorization') as st:
+        st.items = len(image_categories.vectors)
+
+    with span('sort_topics') as st:
+        lyrics.assign_topics(image_categories, n=args.num_classes)
+        lyric_df = lyrics.generate_lyric_df()
+        universal = lyric_df['topic_id'].value_counts()[
+            0:args.num_classes].index.tolist()
+        st.items = len(lyrics.lrc)
+
+    with span('audio_features') as st:
+        if args.stream_audio:
+            features = AudioFeatures.from_file(audio_file, args.frame_length,
+                                               n_jobs=args.audio_jobs)
+        else:
+            y, sr = librosa.load(audio_file)
+            features = AudioFeatures.from_audio(y, sr, args.frame_length,
+                                                n_jobs=args.audio_jobs)
+        st.items = len(features)
+
+    with span('trajectory') as st:
+        frame_time = args.seconds / len(features)
+        noise_vectors, class_vectors, _ = song_vectors(
+            features, lyrics, universal, universal, frame_time,
+            args.frame_length, num_classes=args.num_classes,
+            smooth_factor=args.smooth_factor, seed=args.seed)
+        st.items = len(noise_vectors)
+
+    n_frames = min(args.frames or len(noise_vectors), len(noise_vectors))
+    renderer = FrameRenderer(env.gan_network(args.resolution),
+                             batch_size=args.batch_size)
+
+    if args.batch_size == 'auto':
+        renderer.tune(noise_vectors[:n_frames], class_vectors[:n_frames])
+
+    if args.pipeline:
+        # inference, conversion and encoding overlapping in threads
+        with span('render_pipeline') as st:
+            encoder = None
+            if args.encode:
+                encoder = VideoEncoder(
+                    os.path.join(project_path, 'output.mp4'),
+                    22050 / args.frame_length, audio_file)
+            st.items = sum(len(batch) for batch in renderer.iter_render(
+                noise_vectors[:n_frames], class_vectors[:n_frames], encoder))
+            if encoder:
+                encoder.close()
+        return dict(batch_size=renderer.batch_size, tuning=renderer.tuning)
+
+    outputs = []
+    with span('gan_inference') as st:
+        for i in range(0, n_frames, renderer.batch_size):
+            stop = min(i + renderer.batch_size, n_frames)
+            outputs.append(renderer.infer(noise_vectors[i:stop],
+                                          densify(class_vectors[i:stop])))
+        st.items = n_frames
+
+    frames = []
+    with span('frame_conversion') as st:
+        for output in outputs:
+            frames.extend(to_uint8_frames(output))
+        st.items = len(frames)
+
+    if args.encode:
+        with span('encoding') as st:
+            st.items = write_video(frames, 22050 / args.frame_length,
+                                   audio_file,
+                                   os.path.join(project_path, 'output.mp4'))
+
+    return dict(batch_size=renderer.batch_size, tuning=renderer.tuning)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--frames', type=int, default=0,
+                        help='Frames to render. Defaults to the whole song.')
+    parser.add_argument('--resolution', type=int, default=128)
+    parser.add_argument('--batch_size', type=parse_batch_size, default=30,
+                        help="A number of frames, or 'auto'.")
+    parser.add_argument('--num_classes', type=int, default=12)
+    parser.add_argument('--tokenizer', default='nltk',
+                        choices=['nltk', 'regex'])
+    parser.add_argument('--n_jobs', type=int, default=1,
+                        help='Processes tokenizing the image categories.')
+    parser.add_argument('--frame_length', type=int, default=512)
+    parser.add_argument('--smooth_factor', type=int, default=20)
+    parser.add_argument('--stream_audio', type=int, default=0,
+                        help='Analyse the audio block by block from the file.')
+    parser.add_argument('--audio_jobs', type=int, default=1,
+                        help='Processes analysing blocks of the audio.')
+    parser.add_argument('--encode', type=int, default=1)
+    parser.add_argument('--pipeline', type=int, default=0,
+                        help='Overlap inference, conversion and encoding.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='')
+    parser.add_argument('--trace', default='',
+                        help='Where to write a Chrome trace of the run.')
+    args = parser.parse_args()
+
+    instrumentation.enable()
+    with tempfile.TemporaryDirectory() as project_path:
+        render = run(args, project_path)
+    tracer = instrumentation.disable()
+
+    print(tracer.table())
+    if args.trace:
+        tracer.save(args.trace)
+
+    if args.output:
+        result = dict(commit=git_commit(),
+                      timestamp=datetime.datetime.now().isoformat(),
+                      platform=platform.platform(),
+                      python=platform.python_version(),
+                      params=vars(args),
+                      render=render,
+                      stages=tracer.summary())
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Small local stand-ins for Wikipedia2Vec and BigGAN with the same interfaces,
+so that the whole pipeline can be benchmarked offline on a CPU.
+"""
+import math
+import os
+import zlib
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch import nn
+
+from deep_lyric_visualizer.generator.generation_environment import (
+    GenerationEnvironment)
+
+NOISE_DIM = 128
+N_CLASSES = 1000
+
+
+class HashingWordEmbedder:
+
+    def __init__(self, dim=100, oov_rate=0.05):
+        """A stand-in for Wikipedia2Vec. Every word gets a fixed pseudo-random
+        vector derived from its hash, and a fixed fraction of words are
+        treated as out of vocabulary.
+
+        Args:
+            dim (int, optional): The dimension of the vectors. Defaults to 100.
+            oov_rate (float, optional): The fraction of words that raise a
+                KeyError, like missing words do in Wikipedia2Vec.
+                Defaults to 0.05.
+        """
+        self.dim = dim
+        self.oov_rate = oov_rate
+
+    def get_word_vector(self, word):
+        """Returns the vector for a word.
+
+        Args:
+            word (str): The word to look up.
+
+        Raises:
+            KeyError: Raised when the word is out of vocabulary.
+
+        Returns:
+            np.array: A float32 vector.
+        """
+        h = zlib.crc32(word.encode('utf8'))
+        if (h % 1000) / 1000 < self.oov_rate:
+            raise KeyError(word)
+        return np.random.RandomState(h).normal(
+            size=self.dim).astype(np.float32)
+
+
+class TinyGAN(nn.Module):
+
+    def __init__(self, resolution=128, channels=16):
+        """A stand-in for BigGAN: a few upsampling convolutions from the noise
+        and class vectors to an image of the given resolution.
+
+        Args:
+            resolution (int, optional): The size of the images. Must be 4
+                times a power of 2. Defaults to 128.
+            channels (int, optional): The number of channels of the hidden
+                layers. Defaults to 16.
+        """
+        super().__init__()
+        self.channels = channels
+        self.fc = nn.Linear(NOISE_DIM + N_CLASSES, channels * 4 * 4)
+        self.blocks = nn.ModuleList(
+            [nn.Conv2d(channels, channels, 3, padding=1)
+             for _ in range(int(math.log2(resolution // 4)))])
+        self.to_rgb = nn.Conv2d(channels, 3, 3, padding=1)
+
+    def forward(self, z, class_label, truncation):
+        x = self.fc(torch.cat([z * truncation, class_label], dim=1))
+        x = x.view(-1, self.channels, 4, 4)
+        for conv in self.blocks:
+            x = F.relu(conv(F.interpolate(x, scale_factor=2)))
+        return torch.tanh(self.to_rgb(x))
+
+
+class BenchmarkEnvironment(GenerationEnvironment):
+
+    def __init__(self, cfg, image_class_file, wordvec_dim=100, oov_rate=0.05):
+        """A generation environment which uses the stand-in models.
+
+        Args:
+            cfg (str): The path of the configuration file.
+            image_class_file (str): The path of the yaml file with the
+                ImageNet classes.
+            wordvec_dim (int, optional): The dimension of the word vectors.
+                Defaults to 100.
+            oov_rate (float, optional): The fraction of words missing from
+                the vocabulary. Defaults to 0.05.
+        """
+        super().__init__(cfg)
+        self._image_class_file = image_class_file
+        self._embedder = HashingWordEmbedder(wordvec_dim, oov_rate)
+
+    def image_class_location(self):
+        return self._image_class_file
+
+    def word_embedder(self):
+        self.wordvec_dim = self._embedder.dim
+        return self._embedder
+
+    def gan_network(self, resolution):
+        torch.manual_seed(0)
+        return TinyGAN(int(resolution))
+
+
+def write_config(project_path, filename='benchmark_cfg.yaml'):
+    """Writes a configuration file for the benchmark environment, using the
+    default configuration with the project path set to project_path.
+
+    Args:
+        project_path (str): The directory to use as the project root.
+        filename (str, optional): The name of the file, inside project_path.
+            Defaults to 'benchmark_cfg.yaml'.
+
+    Returns:
+        str: The path of the configuration file.
+    """
+    import yaml
+    import deep_lyric_visualizer
+
+    default_cfg = os.path.join(os.path.dirname(deep_lyric_visualizer.__file__),
+                               'config', 'default_cfg.yaml')
+    with open(default_cfg, 'r') as f:
+        cfg = yaml.safe_load(f)
+
+    cfg['PROJECT_PATH'] = project_path
+    cfg['SAVE_FILETYPE'] = 'pickle'
+
+    path = os.path.join(project_path, filename)
+    with open(path, 'w') as f:
+        yaml.dump(cfg, f)
+    return path
@@ -0,0 +1,86 @@
+"""Synthetic songs for the benchmarks: a .wav file with chords and a beat,
+and a matching .lrc file with one line of lyrics every few seconds.
+"""
+import numpy as np
+from scipy.io import wavfile
+
+SAMPLE_RATE = 22050
+
+# words that appear in ImageNet class names, plus filler that is either a
+# stopword or unlikely to be in the vocabulary of a word embedder
+IMAGE_WORDS = ['shark', 'goldfish', 'eagle', 'owl', 'frog', 'turtle', 'snake',
+               'spider', 'butterfly', 'dog', 'wolf', 'fox', 'cat', 'tiger',
+               'lion', 'bear', 'monkey', 'elephant', 'piano', 'guitar',
+               'drum', 'violin', 'car', 'train', 'ship', 'castle', 'church',
+               'bridge', 'volcano', 'mountain', 'beach', 'flower', 'mushroom',
+               'pizza', 'coffee', 'wine', 'candle', 'clock', 'umbrella']
+FILLER_WORDS = ['the', 'a', 'my', 'your', 'love', 'night', 'baby', 'oh',
+                'gonna', 'wanna', 'yeah', 'ooh', 'tonight', 'dreamin',
+                'heart', 'fire', 'dance', 'forever', 'ya', 'gotta']
+
+
+def make_audio(path, seconds, sr=SAMPLE_RATE, bpm=120, seed=0):
+    """Writes a mono 16-bit .wav file with a chord progression and a beat, so
+    that the spectrogram, chromagram and onsets are not trivial.
+
+    Args:
+        path (str): Where to write the file.
+        seconds (float): The length of the song.
+        sr (int, optional): The sampling rate. Defaults to 22050.
+        bpm (int, optional): The tempo of the beat. Defaults to 120.
+        seed (int, optional): The random seed. Defaults to 0.
+    """
+    rng = np.random.RandomState(seed)
+    n = int(seconds * sr)
+    t = np.arange(n) / sr
+    y = np.zeros(n, dtype=np.float32)
+
+    # a new chord every two seconds
+    chord_len = 2 * sr
+    for start in range(0, n, chord_len):
+        stop = min(start + chord_len, n)
+        root = 220 * 2 ** (rng.randint(0, 12) / 12)
+        for ratio in (1, 1.26, 1.5):
+            y[start:stop] += 0.2 * np.sin(2 * np.pi * root * ratio *
+                                          t[start:stop])
+
+    # a decaying noise burst on every beat
+    beat_len = int(60 / bpm * sr)
+    burst = rng.uniform(-1, 1, beat_len // 4) * \
+        np.exp(-np.linspace(0, 8, beat_len // 4))
+    for start in range(0, n - len(burst), beat_len):
+        y[start:start + len(burst)] += 0.5 * burst
+
+    y /= np.abs(y).max()
+    wavfile.write(path, sr, (y * 0.8 * 32767).astype(np.int16))
+
+
+def make_lrc(path, seconds, seconds_per_line=3, words_per_line=6, seed=0):
+    """Writes a .lrc file with a line of random lyrics every few seconds.
+
+    Args:
+        path (str): Where to write the file.
+        seconds (float): The length of the song.
+        seconds_per_line (float, optional): The time between lines.
+            Defaults to 3.
+        words_per_line (int, optional): The number of words per line.
+            Defaults to 6.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        int: The number of lines written.
+    """
+    rng = np.random.RandomState(seed)
+    lines = []
+    for start in np.arange(0, seconds, seconds_per_line):
+        n_image = rng.randint(1, 3)
+        words = list(rng.choice(IMAGE_WORDS, n_image)) + \
+            list(rng.choice(FILLER_WORDS, words_per_line - n_image))
+        rng.shuffle(words)
+        minutes, secs = divmod(start, 60)
+        lines.append(f'[{int(minutes):02d}:{secs:05.2f}]{" ".join(words)}')
+
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    return len(lines)
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+class HashingFile:
+
+    def __init__(self, tmp_dir):
+        """A temporary file which computes the SHA-256 of what is written to
+        it, so that a file can be hashed while it is received, without
+        reading it again. It can otherwise be used as the file object it
+        wraps.
+
+        Args:
+            tmp_dir (str): The directory of the temporary file.
+        """
+        fd, self.name = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        self.file = os.fdopen(fd, 'w+b')
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def discard(self):
+        """Closes and removes the file, when it is not added to a store."""
+        self.file.close()
+        if os.path.exists(self.name):
+            os.remove(self.name)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+class ContentStore:
+
+    def __init__(self, store_dir, suffix, nested=False):
+        """A directory of files named by the SHA-256 of their contents, so that
+        the same file is stored once however many times it is added, and its
+        hash can be used as the key of anything derived from it.
+
+        Args:
+            store_dir (str): The directory of the files. It is created if it
+                does not exist.
+            suffix (str): The extension of the files, such as '.mp3'.
+            nested (bool, optional): Whether to store each file in its own
+                directory named by the hash, as the lyrics are. Defaults to
+                False.
+        """
+        self.store_dir = store_dir
+        self.suffix = suffix
+        self.nested = nested
+        self.tmp_dir = os.path.join(store_dir, 'tmp')
+        self.duplicates = 0
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path(self, sha256):
+        """Returns the location of a file in the store.
+
+        Args:
+            sha256 (str): The hash of the file.
+
+        Returns:
+            str: The path of the file.
+        """
+        if self.nested:
+            return os.path.join(self.store_dir, sha256, sha256 + self.suffix)
+        return os.path.join(self.store_dir, sha256 + self.suffix)
+
+    def temporary_file(self):
+        """Returns a file to write a new file to, such as an upload while it
+        is received, before adding it with add_file.
+
+        Returns:
+            HashingFile: The file.
+        """
+        return HashingFile(self.tmp_dir)
+
+    def add_file(self, hashing_file):
+        """Adds a file written to a HashingFile, from any store on the same
+        file system. If the store already has the same contents, the new file
+        is removed.
+
+        Args:
+            hashing_file (HashingFile): The file. It is closed.
+
+        Returns:
+            tuple (str, str): The hash and the path of the file in the store.
+        """
+        hashing_file.close()
+        sha256 = hashing_file.sha256.hexdigest()
+        loc = self.path(sha256)
+
+        if os.path.exists(loc):
+            os.remove(hashing_file.name)
+            self.duplicates += 1
+            logger.info('%s is already stored. Reusing it.', sha256)
+        else:
+            os.makedirs(os.path.dirname(loc), exist_ok=True)
+            shutil.move(hashing_file.name, loc)
+            logger.info('Stored %d bytes as %s.', hashing_file.size, loc)
+        return sha256, loc
+
+    def add(self, stream, chunk_size=2 ** 16):
+        """Adds the contents of a stream, reading it a chunk at a time.
+
+        Args:
+            stream (file): A readable binary stream.
+            chunk_size (int, optional): The number of bytes read at a time.
+                Defaults to 64KB.
+
+        Returns:
+            tuple (str, str): The hash and the path of the file in the store.
+        """
+        hashing_file = self.temporary_file()
+        try:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                hashing_file.write(chunk)
+        except BaseException:
+            hashing_file.discard()
+            raise
+        return self.add_file(hashing_file)
@@ -3,8 +3,6 @@ import os
 from abc import ABC, abstractmethod
 
 import yaml
-from pytorch_pretrained_biggan import BigGAN
-from wikipedia2vec import Wikipedia2Vec
 
 from deep_lyric_visualizer.helpers import dict_assign, setup_logger, find_first_file_with_ext
 
@@ -67,6 +65,8 @@ class GenerationEnvironment(ABC):
             'attributes of the instance')
         dict_assign(self, self.cfg)
         self.wordvec_dim = 0
+        self._word_embedder = None
+        self._fallback_embedder = None
 
         if not self.PROJECT_PATH:
             self.PROJECT_PATH = self.n_dot(4, __file__)
@@ -296,6 +296,17 @@ class GenerationEnvironment(ABC):
         """
         pass
 
+    def fallback_embedder(self):
+        """This method may return an embedder used for words which are not
+        in the vocabulary of the word embedder. It should have a
+        get_word_vectors method like nlp.NgramEmbedder.
+
+        Returns:
+            NgramEmbedder: The fallback embedder, or None to leave out words
+                which are not in the vocabulary.
+        """
+        return None
+
     @abstractmethod
     def gan_network(self):
         """This method should return the appropriate GAN Network model.
@@ -308,11 +319,17 @@ class WikipediaBigGANGenerationEnviornment(GenerationEnvironment):
 
     def word_embedder(self):
         """Sets up the Wikipedia2Vec model from the default file used by this
-        application.
+        application. The model is loaded once and shared by every object using
+        this environment.
 
         Returns:
             Wikipedia2Vec: A Wikipedia2Vec Model
         """
+        if self._word_embedder is not None:
+            return self._word_embedder
+
+        from wikipedia2vec import Wikipedia2Vec
+
         loc = self.model_loc(self.WIKIPEDIA_2_VEC_MODEL_NAME)
         logger.info(f'Loading Wikipedia2Vec word embeddings model from {loc}.')
         model = Wikipedia2Vec.load(loc)
@@ -323,8 +340,33 @@ class WikipediaBigGANGenerationEnviornment(GenerationEnvironment):
         self.wordvec_dim = dim
         logger.debug(f'Assuming dimension {dim} for {loc}.')
 
+        self._word_embedder = model
         return model
 
+    def fallback_embedder(self):
+        """Sets up the character n-gram embedder for words which are not in
+        the vocabulary, if its table has been built with
+        nlp/ngram_embedder.py.
+
+        Returns:
+            NgramEmbedder: The n-gram embedder, or None if there is no table.
+        """
+        if self._fallback_embedder is not None:
+            return self._fallback_embedder
+
+        from deep_lyric_visualizer.nlp.ngram_embedder import NgramEmbedder
+
+        loc = self.model_loc(self.NGRAM_TABLE_NAME)
+        try:
+            self._fallback_embedder = NgramEmbedder(loc)
+        except FileNotFoundError:
+            logger.info(f'No n-gram table at {loc}. Words which are not in '
+                        'the vocabulary will be left out.')
+            return None
+
+        logger.info(f'Loaded n-gram table from {loc}.')
+        return self._fallback_embedder
+
     def gan_network(self, resolution):
         """Sets up the BigGAN model from the default file used by this
         application.
@@ -335,6 +377,34 @@ class WikipediaBigGANGenerationEnviornment(GenerationEnvironment):
         Returns:
             BigGAN: A BigGAN model
         """
+        from pytorch_pretrained_biggan import BigGAN
+
         logger.info(f'Loading BigGAN with resolution {resolution}.')
         model = BigGAN.from_pretrained(f'biggan-deep-{resolution}')
         return model
+
+
+class EmbeddingTableBigGANGenerationEnvironment(
+        WikipediaBigGANGenerationEnviornment):
+
+    def word_embedder(self):
+        """Sets up a memory-mapped embedding table with the vectors of the
+        words in the lyrics and image categories, extracted from the
+        Wikipedia2Vec model with nlp/embedding_table.py. This loads much faster
+        than the full model.
+
+        Returns:
+            EmbeddingTable: An embedding table
+        """
+        if self._word_embedder is not None:
+            return self._word_embedder
+
+        from deep_lyric_visualizer.nlp.embedding_table import EmbeddingTable
+
+        loc = self.model_loc(self.EMBEDDING_TABLE_NAME)
+        logger.info(f'Loading embedding table from {loc}.')
+        table = EmbeddingTable(loc)
+        self.wordvec_dim = table.dim
+
+        self._word_embedder = table
+        return table
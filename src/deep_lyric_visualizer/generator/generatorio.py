@@ -2,7 +2,8 @@ from abc import ABC, abstractmethod
 from deep_lyric_visualizer.generator.generation_environment import (GenerationEnvironment,
                                                                     WikipediaBigGANGenerationEnviornment)
 import logging
-from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.helpers import setup_logger, TruncatedRepr
+from deep_lyric_visualizer.instrumentation import traced
 
 import os
 
@@ -124,6 +125,7 @@ class GeneratorIO(ABC):
         """
         return attr
 
+    @traced('GeneratorIO.save')
     def save(self, songname=None):
         """Save the object to the appropriate location.
 
@@ -135,11 +137,13 @@ class GeneratorIO(ABC):
 
         transformed_attrs = [self.transform_save(x) for x in attrs]
         self.make_save_locations(songname)
-        logger.debug(f'Saving {transformed_attrs} to {self.save_loc}')
+        logger.debug('Saving %s to %s', TruncatedRepr(transformed_attrs),
+                     self.save_loc)
         self.save_to_file(transformed_attrs, self.save_loc)
-        logger.debug(
-            f'Saved information for {self.obj.name} to {self.save_loc}')
+        logger.debug('Saved information for %s to %s', self.obj.name,
+                     self.save_loc)
 
+    @traced('GeneratorIO.load')
     def load(self, songname=None):
         """Load the object to the appropriate location.
 
@@ -153,7 +157,8 @@ class GeneratorIO(ABC):
             logger.error(f'No file to load in {self.save_loc}')
             raise
         for i, r in enumerate(res):
-            logger.debug(f'Loading {r} into {self.attrs[i]} attribute.')
+            logger.debug('Loading %s into %s attribute.', TruncatedRepr(r),
+                         self.attrs[i])
             setattr(self.obj, self.transform_load(self.attrs[i]), r)
 
         logger.info(
@@ -1,6 +1,7 @@
 import logging.config
 import logging
 import os
+import reprlib
 import yaml
 
 
@@ -1011,12 +1012,23 @@ def create_imagenet_yaml(output_filename='image_classes.yml'):
         yaml.dump(temp_dict, f)
 
 
+# whether setup_logger has already configured logging in this process
+_logging_configured = False
+
+
 def setup_logger(path='config/logging.yaml',
                  level=logging.INFO,
-                 env_key='LOG_CFG_LOC'):
+                 env_key='LOG_CFG_LOC',
+                 profile=None,
+                 levels=None,
+                 force=False):
     """Sets up the logger for the library, using a yaml file or, if none
     exists, using the default settings.
 
+    Every module of the package calls this on import, so the configuration
+    is only read the first time, unless a profile is given or force is True.
+    Levels are applied on every call.
+
     To use a custom logger, feel free to delete the file in config.
 
     Args:
@@ -1029,7 +1041,47 @@ def setup_logger(path='config/logging.yaml',
 
         env_key (str, optional): Environment variable to refer to logging
         location. Defaults to 'LOG_CFG_LOC'.
+
+        profile (str, optional): The name of a logging profile in the config
+        directory of the package, for instance 'production', which uses
+        config/logging_production.yaml. Can also be set with the LOG_PROFILE
+        environment variable. Defaults to None, which uses path.
+
+        levels (dict, optional): Levels for parts of the package, for instance
+        {'deep_lyric_visualizer.nlp': 'WARNING'}, applied on top of the
+        configuration. Can also be set with the LOG_LEVELS environment
+        variable, as comma separated name=LEVEL pairs. Defaults to None.
+
+        force (bool, optional): Whether to read the configuration again if
+        logging has already been configured. Defaults to False.
+
+    Raises:
+        ValueError: Raised when there is no profile with the given name.
     """
+    global _logging_configured
+
+    if not _logging_configured or profile or force:
+        _configure_logging(path, level, env_key, profile)
+        _logging_configured = True
+
+    levels = dict(levels or {})
+    for pair in filter(None, os.getenv('LOG_LEVELS', '').split(',')):
+        name, _, name_level = pair.partition('=')
+        levels[name.strip()] = name_level.strip()
+
+    for name, name_level in levels.items():
+        if isinstance(name_level, str):
+            name_level = name_level.upper()
+        logging.getLogger(name).setLevel(name_level)
+
+
+def _configure_logging(path, level, env_key, profile):
+    profile = profile or os.getenv('LOG_PROFILE', None)
+    if profile:
+        path = os.path.join(os.path.dirname(__file__), 'config',
+                            f'logging_{profile}.yaml')
+        if not os.path.exists(path):
+            raise ValueError(f'No logging profile named {profile}.')
 
     env_res = os.getenv(env_key, None)
     if env_res:
@@ -1037,12 +1089,40 @@ def setup_logger(path='config/logging.yaml',
 
     if os.path.exists(path):
         with open(path, 'r') as f:
-            config = yaml.load(f)
+            config = yaml.safe_load(f)
         logging.config.dictConfig(config)
     else:
         logging.basicConfig(level=level)
 
 
+class TruncatedRepr:
+
+    def __init__(self, obj, limit=200):
+        """Wraps a (possibly large) object passed as an argument to a logging
+        call, such as logger.debug('Saving %s', TruncatedRepr(vectors)). The
+        repr is only built if the message is emitted, and is shortened to at
+        most limit characters.
+
+        Args:
+            obj (Object): The object to log.
+            limit (int, optional): The maximum length of the repr.
+                Defaults to 200.
+        """
+        self.obj = obj
+        self.limit = limit
+
+    def __str__(self):
+        short = reprlib.Repr()
+        short.maxlevel = 2
+        short.maxstring = short.maxother = self.limit
+        text = short.repr(self.obj)
+        if len(text) > self.limit:
+            text = text[:self.limit - 3] + '...'
+        return text
+
+    __repr__ = __str__
+
+
 setup_logger()
 logger = logging.getLogger(__name__)
 
@@ -1,5 +1,6 @@
 import logging
 from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.instrumentation import span
 
 from deep_lyric_visualizer.image_categories.image_category_tokenizer import ImageCategoryTokenizer
 from deep_lyric_visualizer.image_categories.image_category_vectorizer import ImageCategoryVectorizer
@@ -70,13 +71,15 @@ class ImageCategories(GeneratorObject):
                 lists of lists of tokens.
         """
         if not self._tokens:
-            try:
-                self.img_cat_tokenizer.load()
-            except FileNotFoundError:
-                self.img_cat_tokenizer.tokenize_image_classes()
-                if save:
-                    self.img_cat_tokenizer.save()
-            self._tokens = self.img_cat_tokenizer.class_tokens
+            with span('ImageCategories.tokens') as sp:
+                try:
+                    self.img_cat_tokenizer.load()
+                except FileNotFoundError:
+                    self.img_cat_tokenizer.tokenize_image_classes()
+                    if save:
+                        self.img_cat_tokenizer.save()
+                self._tokens = self.img_cat_tokenizer.class_tokens
+                sp.items = len(self._tokens)
         return self._tokens
 
     @property
@@ -101,13 +104,16 @@ class ImageCategories(GeneratorObject):
                 category.
         """
         if not self._vectors:
-            try:
-                self.img_cat_vectorizer.load()
-            except FileNotFoundError:
-                self.img_cat_vectorizer.vectorize_categories(self.tokens)
-                if save:
-                    self.img_cat_vectorizer.save()
-            self._vectors = self.img_cat_vectorizer.vectorized_dict
+            tokens = self.tokens
+            with span('ImageCategories.vectors') as sp:
+                try:
+                    self.img_cat_vectorizer.load()
+                except FileNotFoundError:
+                    self.img_cat_vectorizer.vectorize_categories(tokens)
+                    if save:
+                        self.img_cat_vectorizer.save()
+                self._vectors = self.img_cat_vectorizer.vectorized_dict
+                sp.items = len(self._vectors)
 
         return self._vectors
 
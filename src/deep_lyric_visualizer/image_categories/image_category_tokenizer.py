@@ -1,8 +1,13 @@
 
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
 from deep_lyric_visualizer.helpers import setup_logger, _extract_name_from_path
 
-from deep_lyric_visualizer.nlp.tokenizer import Tokenizer
+from deep_lyric_visualizer.nlp.tokenizer import (
+    Tokenizer, word_tokenizer, filter_tokens)
 from deep_lyric_visualizer.image_categories.image_category_vectorizer import ImageCategoryVectorizer
 
 
@@ -10,8 +15,27 @@ setup_logger()
 logger = logging.getLogger(__name__)
 
 
+def _tokenize_categories(categories, method, stopwords, cat_sep):
+    """Tokenizes a chunk of categories in a worker process.
+
+    Args:
+        categories (list [str]): The categories.
+        method (str): The tokenizer method, see nlp.tokenizer.word_tokenizer.
+        stopwords (frozenset [str]): The stopwords to drop.
+        cat_sep (str): The seperator which splits the topics.
+
+    Returns:
+        list [list [list [str]]]: The tokens of each topic of each category.
+    """
+    tokenize = word_tokenizer(method)
+    return [[filter_tokens(tokenize(phrase), stopwords)
+             for phrase in category.split(cat_sep)]
+            for category in categories]
+
+
 class ImageCategoryTokenizer(Tokenizer):
-    def __init__(self, gen_env=None):
+    def __init__(self, gen_env=None, method='nltk', n_jobs=1,
+                 chunksize=2000):
         """The tokenizer used for the image categories. Inherits from the more
         general Tokenizer class in the nlp folder of this package.
 
@@ -21,8 +45,17 @@ class ImageCategoryTokenizer(Tokenizer):
             gen_env (generator.GenerationEnvironment, optional):
                 An instance of the GenerationEnvironment class.
                 Defaults to None, which will use th efeautl environment.
+            method (str, optional): One of {"nltk", "regex"}. The regex
+                tokenizer is much faster for large label sets.
+                Defaults to 'nltk'.
+            n_jobs (int, optional): The number of processes tokenizing the
+                image classes. None uses every CPU. Defaults to 1.
+            chunksize (int, optional): The number of image classes sent to a
+                process at a time. Defaults to 2000.
         """
-        super().__init__(gen_env)
+        super().__init__(gen_env, method)
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.chunksize = chunksize
 
         self.name = __name__ if __name__ != '__main__' else _extract_name_from_path(
             __file__)
@@ -52,17 +85,39 @@ class ImageCategoryTokenizer(Tokenizer):
         """
         self.image_classes = self.env.read_id_to_img_class()
 
-    def tokenize_image_classes(self):
+    def tokenize_image_classes(self, cat_sep=','):
         """Tokenizes the image classes and assigns them to the class_tokens
-        attribute.
+        attribute. With more than one job, and more than one chunk of image
+        classes, the chunks are tokenized in a process pool. The tokens are
+        in the same order as the image classes either way.
+
+        Args:
+            cat_sep (str, optional): The seperator which splits the topics.
+            Defaults to ','.
         """
 
         if not self.image_classes:
             logger.debug('No image classes loaded. Attempting to load now.')
             self.load_image_classes()
 
-        self.class_tokens = {id_: self.tokenize_category(
-            cat) for id_, cat in self.image_classes.items()}
+        ids = list(self.image_classes)
+        if self.n_jobs == 1 or len(ids) <= self.chunksize:
+            self.class_tokens = {id_: self.tokenize_category(
+                cat, cat_sep) for id_, cat in self.image_classes.items()}
+            return
+
+        categories = list(self.image_classes.values())
+        chunks = [categories[i:i + self.chunksize]
+                  for i in range(0, len(categories), self.chunksize)]
+        logger.info('Tokenizing %d image classes in %d chunks with %d '
+                    'processes.', len(ids), len(chunks), self.n_jobs)
+
+        # map returns the chunks in order, whichever process finishes first
+        with ProcessPoolExecutor(self.n_jobs) as pool:
+            tokens = pool.map(_tokenize_categories, chunks,
+                              repeat(self.method), repeat(self.stopwords),
+                              repeat(cat_sep))
+            self.class_tokens = dict(zip(ids, chain.from_iterable(tokens)))
 
 
 if __name__ == '__main__':
@@ -7,11 +7,14 @@ from deep_lyric_visualizer.generator.generatorio import PickleGeneratorIO, YAMLG
 
 from deep_lyric_visualizer.nlp.vectorizer import Vectorizer
 import numpy as np
+from scipy import sparse
 setup_logger()
 logger = logging.getLogger(__name__)
 
 
 class ImageCategoryVectorizer(Vectorizer):
+    STRATEGIES = ('mean', 'idf', 'first')
+
     def __init__(self, gen_env=None):
         """A vectorizer specific to image categories. Inherits from the
         Vectorizer class in the nlp section of this package.
@@ -45,71 +48,163 @@ class ImageCategoryVectorizer(Vectorizer):
             np.array: A so-called category vector, an embedding for the
                 category.
         """
+        return self._vectorize_all([category_tokens], 'mean')[0]
+
+    def _vectorize_all(self, categories, strategy):
+        """Vectorizes many categories in one pass. The (category, phrase,
+        token) triples of all the categories are flattened, the vectors of the
+        tokens are looked up at once, and the phrase and category vectors are
+        weighted means computed with segment sums over the flat arrays.
+
+        The strategies differ in the weights:
+            mean: every token of a phrase, and every phrase of a category,
+                counts the same.
+            idf: tokens are weighted by their inverse document frequency over
+                the categories vectorized together, so that words shared by
+                many categories, such as "dog" or "fish", count less.
+            first: the phrases of a category are weighted by 1 / rank, as the
+                first phrase is the usual name of the category and the later
+                ones are rarer synonyms.
+
+        Phrases without any token in the vocabulary are left out, and a
+        category without any such phrase is the zero vector.
+
+        Args:
+            categories (list [list [list [str]]]): The tokens of each phrase of
+                each category.
+            strategy (str): One of {"mean", "idf", "first"}.
+
+        Raises:
+            ValueError: Raised when the strategy is unknown.
+
+        Returns:
+            np.array: A matrix with a row for each category.
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f'Unknown strategy {strategy}. Use one of '
+                             f'{self.STRATEGIES}.')
+
+        tokens = [t for category in categories for phrase in category
+                  for t in phrase]
+        phrase_lengths = np.array([len(phrase) for category in categories
+                                   for phrase in category], dtype=np.int64)
+        category_lengths = np.array([len(category) for category in categories],
+                                    dtype=np.int64)
+        category_offsets = np.cumsum(category_lengths) - category_lengths
+        phrase_ranks = (np.arange(category_lengths.sum())
+                        - np.repeat(category_offsets, category_lengths))
+
+        if not tokens:
+            return np.zeros((len(categories), self.env.wordvec_dim))
+        vectors, found = self.get_word_vectors(tokens)
+
+        token_weights = found.astype(np.float64)
+        if strategy == 'idf':
+            token_weights *= self._idf(tokens, phrase_lengths,
+                                       category_lengths)
+
+        phrase_weight_sums = _segment_sum(token_weights, phrase_lengths)
+        phrase_vectors = _segment_sum(vectors * token_weights[:, None],
+                                      phrase_lengths)
+        valid = phrase_weight_sums > 0
+        phrase_vectors[valid] /= phrase_weight_sums[valid, None]
+
+        if strategy == 'first':
+            phrase_weights = 1. / (phrase_ranks + 1)
+        else:
+            phrase_weights = np.ones(len(phrase_ranks))
+        phrase_weights *= valid
+
+        category_weight_sums = _segment_sum(phrase_weights, category_lengths)
+        category_vectors = _segment_sum(
+            phrase_vectors * phrase_weights[:, None], category_lengths)
+        valid = category_weight_sums > 0
+        category_vectors[valid] /= category_weight_sums[valid, None]
+        return category_vectors
+
+    @staticmethod
+    def _idf(tokens, phrase_lengths, category_lengths):
+        """Returns the smoothed inverse document frequency of each token,
+        treating each category as a document.
 
-        wordvec_sum = np.zeros(self.env.wordvec_dim)
-        n_phrases = 0
-
-        for tokens in category_tokens:
-            n = len(tokens)
-            if n == 0:
-                continue
-
-            vec = np.zeros(self.env.wordvec_dim)
-            n_vectorizable_phrases = 0
-            for token in tokens:
-                try:
-                    vectorized = self.vectorize_word(token)
-                except KeyError:
-                    pass
-                else:
-                    n_vectorizable_phrases += 1
-                    vec += vectorized
-            if n_vectorizable_phrases == 0:
-                continue
-            else:
-                n_phrases += 1
-            vec = vec / n_vectorizable_phrases
-            wordvec_sum += vec
-        mean_wordvec = (
-            wordvec_sum / n_phrases) if n_phrases != 0 else wordvec_sum
-
-        return mean_wordvec
+        Args:
+            tokens (list [str]): The flattened tokens.
+            phrase_lengths (np.array): The number of tokens of each phrase.
+            category_lengths (np.array): The number of phrases of each
+                category.
+
+        Returns:
+            np.array: The weight of each token.
+        """
+        ids = {}
+        token_ids = np.array([ids.setdefault(t, len(ids)) for t in tokens],
+                             dtype=np.int64)
+        phrase_categories = np.repeat(np.arange(len(category_lengths)),
+                                      category_lengths)
+        token_categories = np.repeat(phrase_categories, phrase_lengths)
+
+        n_unique = len(ids)
+        pairs = np.unique(token_categories * n_unique + token_ids)
+        doc_freq = np.bincount(pairs % n_unique, minlength=n_unique)
+
+        n_docs = len(category_lengths)
+        return (np.log((1 + n_docs) / (1 + doc_freq)) + 1)[token_ids]
 
     def vectorize_category(self, category_tokens, strategy='mean'):
         """Handles the vectorization of a cateogry by a particular strategy.
-        At the moment, the only considered strategy is the mean strategy.
 
         Args:
             category_tokens (list [list [str]]): This is a list of lists,
                 one list of tokens for each topic in the category.
-            strategy (str, optional): One of {"mean"}. The strategy to use
-                Currently only the mean strategy is supported.
-                Defaults to 'mean'.
+            strategy (str, optional): One of {"mean", "idf", "first"}. The
+                strategy to use, see _vectorize_all. With "idf", the
+                frequencies are only counted within this category, so use
+                vectorize_categories instead. Defaults to 'mean'.
 
         Returns:
             np.array: An array with the vector representing the category
         """
-        if strategy == 'mean':
-            return self._mean_strategy(category_tokens)
+        return self._vectorize_all([category_tokens], strategy)[0]
 
     def vectorize_categories(self, categories_tokens, strategy='mean'):
         """Vectorize a set of categories given their lists of lists of tokens.
+        All the categories are vectorized together in one pass, which keeps
+        rebuilding the vectors of large custom label sets fast.
 
         Args:
             categories_tokens (dict): A dictionary representing the id number
             for a category to the list of lists of tokens for that category.
-            strategy (str, optional): One of {"mean"}. The strategy to use
-                Currently only the mean strategy is supported.
-                Defaults to 'mean'.
+            strategy (str, optional): One of {"mean", "idf", "first"}. The
+                strategy to use, see _vectorize_all. Defaults to 'mean'.
 
         Returns:
             dict: Dictionary with embeddings for each category_id.
         """
-        self.vectorized_dict = {id_: self.vectorize_category(
-            category) for id_, category in categories_tokens.items()}
+        category_vectors = self._vectorize_all(
+            list(categories_tokens.values()), strategy)
+
+        self.vectorized_dict = dict(zip(categories_tokens, category_vectors))
         return self.vectorized_dict
 
 
+def _segment_sum(values, lengths):
+    """Sums consecutive segments of an array.
+
+    Args:
+        values (np.array): The values, with the segments along the first axis.
+        lengths (np.array): The length of each segment, which may be zero.
+
+    Returns:
+        np.array: The sum of each segment, zero for empty segments.
+    """
+    # a segment by value matrix, with a one where the value is in the segment
+    segments = np.repeat(np.arange(len(lengths)), lengths)
+    membership = sparse.csr_matrix(
+        (np.ones(len(segments)), (segments, np.arange(len(segments)))),
+        shape=(len(lengths), len(segments)))
+    return np.asarray(membership @ values)
+
+
 if __name__ == '__main__':
     im_vec = ImageCategoryVectorizer()
     im_vec.load()
@@ -0,0 +1,227 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# the active tracer. None means that instrumentation is disabled, in which case
+# span() and traced() do nothing besides checking this variable.
+_tracer = None
+
+
+def peak_rss_mb():
+    """Returns the peak resident set size of the process so far, in MB.
+
+    Returns:
+        float: The peak RSS, or None if it can not be measured here.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class Tracer:
+
+    def __init__(self):
+        """Collects the spans recorded while instrumentation is enabled, and
+        exports them as a Chrome trace or a summary table.
+        """
+        self.events = []
+        self.pid = os.getpid()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, start, wall, cpu, items, args):
+        """Records a finished span.
+
+        Args:
+            name (str): The name of the span.
+            start (float): The perf_counter value when the span started.
+            wall (float): The wall time of the span in seconds.
+            cpu (float): The CPU time of the process in seconds.
+            items (int): The number of items processed in the span.
+            args (dict): Any other information about the span.
+        """
+        event = dict(name=name, start=start - self._start, wall=wall,
+                     cpu=cpu, items=items, peak_rss_mb=peak_rss_mb(),
+                     tid=threading.get_ident(), args=args)
+        with self._lock:
+            self.events.append(event)
+
+    def chrome_trace(self):
+        """Returns the spans in the Chrome trace event format, which can be
+        opened in chrome://tracing or Perfetto.
+
+        Returns:
+            dict: The trace.
+        """
+        trace_events = []
+        for e in self.events:
+            args = dict(e['args'], cpu_s=e['cpu'], items=e['items'],
+                        peak_rss_mb=e['peak_rss_mb'])
+            trace_events.append(dict(name=e['name'], ph='X', pid=self.pid,
+                                     tid=e['tid'], ts=e['start'] * 1e6,
+                                     dur=e['wall'] * 1e6, args=args))
+        return dict(traceEvents=trace_events, displayTimeUnit='ms')
+
+    def save(self, path):
+        """Writes the spans to a JSON file in the Chrome trace event format.
+
+        Args:
+            path (str): Where to write the trace.
+        """
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def summary(self):
+        """Aggregates the spans by name, in the order they first finished.
+
+        Returns:
+            list [dict]: One dictionary per name, with the number of calls,
+                the total wall and CPU time, the total number of items and
+                the peak RSS at the end of the spans.
+        """
+        rows = {}
+        for e in self.events:
+            row = rows.setdefault(e['name'], dict(
+                name=e['name'], calls=0, wall=0., cpu=0., items=0,
+                peak_rss_mb=None))
+            row['calls'] += 1
+            row['wall'] += e['wall']
+            row['cpu'] += e['cpu']
+            row['items'] += e['items']
+            if e['peak_rss_mb'] is not None:
+                row['peak_rss_mb'] = max(row['peak_rss_mb'] or 0,
+                                         e['peak_rss_mb'])
+        return list(rows.values())
+
+    def table(self):
+        """Returns the summary as a plain text table.
+
+        Returns:
+            str: The table, with one row per span name.
+        """
+        lines = [f'{"span":<36}{"calls":>7}{"wall (s)":>10}{"cpu (s)":>10}'
+                 f'{"items":>9}{"items/s":>10}{"peak MB":>9}']
+        for row in self.summary():
+            rate = row['items'] / row['wall'] if row['wall'] else 0
+            peak = row['peak_rss_mb'] or 0
+            lines.append(f'{row["name"]:<36}{row["calls"]:>7}'
+                         f'{row["wall"]:>10.3f}{row["cpu"]:>10.3f}'
+                         f'{row["items"]:>9}{rate:>10.1f}{peak:>9.0f}')
+        return '\n'.join(lines)
+
+
+class Span:
+
+    def __init__(self, tracer, name, args):
+        """Times a block of code. Set the items attribute inside the block
+        to record how many items (frames, tokens, etc.) it processed.
+
+        Args:
+            tracer (Tracer): The tracer to record the span in.
+            name (str): The name of the span.
+            args (dict): Any other information about the span.
+        """
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.items = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._start
+        cpu = time.process_time() - self._cpu
+        if exc is not None:
+            self.args['error'] = repr(exc)
+        self.tracer.record(self.name, self._start, wall, cpu,
+                           int(self.items), self.args)
+        return False
+
+
+class _NullSpan:
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    """Enables instrumentation with a new tracer.
+
+    Returns:
+        Tracer: The tracer that records the spans.
+    """
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    """Disables instrumentation.
+
+    Returns:
+        Tracer: The tracer that was active, or None.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer():
+    """Returns the active tracer, or None if instrumentation is disabled."""
+    return _tracer
+
+
+def span(name, **args):
+    """Returns a context manager timing a block of code as a named span. When
+    instrumentation is disabled, this is a shared object that does nothing.
+
+    Args:
+        name (str): The name of the span.
+        **args: Any other information to record with the span.
+
+    Returns:
+        Span: The span.
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return Span(_tracer, name, args)
+
+
+def traced(name=None):
+    """A decorator recording each call to a function as a span.
+
+    Args:
+        name (str, optional): The name of the span. Defaults to None, which
+            uses the qualified name of the function.
+    """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
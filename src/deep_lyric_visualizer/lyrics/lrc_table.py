@@ -0,0 +1,197 @@
+import logging
+import re
+
+import numpy as np
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+SYNCED_LINE = re.compile(r'^((?:\[\d+:\d+(?:\.\d+)?\])+)(.*)$')
+TIMECODE = re.compile(r'\[(\d+):(\d+(?:\.\d+)?)\]')
+OFFSET_TAG = re.compile(r'^\[offset:\s*([+-]?\d+)\s*\]')
+
+
+def iter_lrc_lines(lines):
+    """Streams the synced lines of a .lrc file, one line of the file at a
+    time. A line with several timecodes, such as a repeated chorus, gives one
+    synced line per timecode. Tags and unsynced lines are skipped, apart from
+    the offset tag.
+
+    Args:
+        lines (iterable [str]): The lines of the file, such as an open file.
+
+    Yields:
+        tuple (float, str): The time in seconds and the text of a synced
+            line, or (None, offset) for an offset tag, with the offset in
+            milliseconds.
+    """
+    for line in lines:
+        line = line.rstrip('\r\n')
+        match = SYNCED_LINE.match(line)
+        if match:
+            timecodes, text = match.groups()
+            for minutes, seconds in TIMECODE.findall(timecodes):
+                yield int(minutes) * 60 + float(seconds), text
+            continue
+
+        match = OFFSET_TAG.match(line)
+        if match:
+            yield None, int(match.group(1))
+
+
+class LrcTable:
+
+    def __init__(self, times, text, offsets, category_ids=None,
+                 topic_ids=None):
+        """The synced lines of a .lrc file, stored by column: the start time
+        of each line, the text of all the lines in one string with the
+        offsets where each line starts and ends, and the categories and
+        topics assigned to each line as integer arrays. This pickles to a
+        fraction of the size of a list of line objects, and lines can be
+        selected by time with a binary search.
+
+        Args:
+            times (np.array): The start time of each line in seconds, sorted.
+            text (str): The text of all the lines, one after the other.
+            offsets (np.array): The position of the start of each line in
+                text, followed by the length of text.
+            category_ids (np.array, optional): The ranked category ids of each
+                line, padded with -1. Defaults to None.
+            topic_ids (np.array, optional): The topic ids of each line, padded
+                with -1. Defaults to None.
+        """
+        self.times = np.asarray(times, dtype=np.float64)
+        self.text = text
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.category_ids = category_ids
+        self.topic_ids = topic_ids
+
+        if len(self.offsets) != len(self.times) + 1:
+            raise ValueError('There must be one more offset than lines.')
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Parses the lines of a .lrc file. The lines are sorted by time and
+        shifted by the offset tag, like pylrc does.
+
+        Args:
+            lines (iterable [str]): The lines of the file, such as an open
+                file, which is read one line at a time.
+
+        Returns:
+            LrcTable: The synced lines of the file.
+        """
+        times, texts = [], []
+        offset = 0
+        for time, text in iter_lrc_lines(lines):
+            if time is None:
+                offset = text
+                continue
+            times.append(time)
+            texts.append(text)
+
+        times = np.array(times, dtype=np.float64) + offset / 1000
+        order = np.argsort(times, kind='stable')
+        texts = [texts[i] for i in order]
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=offsets[1:])
+
+        logger.debug('Parsed %d synced lines.', len(texts))
+        return cls(times[order], ''.join(texts), offsets)
+
+    @classmethod
+    def from_file(cls, path):
+        """Parses a .lrc file without reading it into memory at once.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            LrcTable: The synced lines of the file.
+        """
+        with open(path, 'r') as f:
+            return cls.from_lines(f)
+
+    def __len__(self):
+        return len(self.times)
+
+    def line(self, i):
+        """Returns the text of a line.
+
+        Args:
+            i (int): The index of the line.
+
+        Returns:
+            str: The text.
+        """
+        return self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def lines(self):
+        """Returns the text of every line.
+
+        Returns:
+            list [str]: The text of each line.
+        """
+        return [self.line(i) for i in range(len(self))]
+
+    def between(self, start, end):
+        """Returns the lines starting between two times.
+
+        Args:
+            start (float): The start, in seconds, included.
+            end (float): The end, in seconds, excluded.
+
+        Returns:
+            slice: The slice of the lines, to index the columns with.
+        """
+        return slice(*np.searchsorted(self.times, [start, end], side='left'))
+
+    def line_at(self, time):
+        """Returns the index of the line being sung at a time, the last line
+        starting at or before it.
+
+        Args:
+            time (float or np.array): The time, or times, in seconds.
+
+        Returns:
+            int or np.array: The index of the line, -1 before the first line.
+        """
+        return np.searchsorted(self.times, time, side='right') - 1
+
+    def set_categories(self, category_ids):
+        """Stores the ranked categories of each line as a padded array, of
+        int16 when the ids fit, as every category of every line is kept.
+
+        Args:
+            category_ids (list [list [int] or None]): The ranked category ids
+                of each line, None for lines without categories.
+        """
+        width = max((len(c) for c in category_ids if c), default=0)
+        largest = max((max(c) for c in category_ids if c), default=0)
+        dtype = np.int16 if largest < np.iinfo(np.int16).max else np.int32
+        self.category_ids = np.full((len(self), width), -1, dtype=dtype)
+        for row, categories in zip(self.category_ids, category_ids):
+            if categories:
+                row[:len(categories)] = categories
+        self.topic_ids = None
+
+    def assign_topics(self, n=1):
+        """Uses the first n categories of each line as its topics.
+
+        Args:
+            n (int, optional): The number of topics per line. Defaults to 1.
+        """
+        self.topic_ids = self.category_ids[:, :n]
+
+    def has_topics(self):
+        """Returns which lines have topics.
+
+        Returns:
+            np.array: A boolean array, True for the lines with topics.
+        """
+        if self.topic_ids is None or not self.topic_ids.shape[1]:
+            return np.zeros(len(self), dtype=bool)
+        return self.topic_ids[:, 0] >= 0
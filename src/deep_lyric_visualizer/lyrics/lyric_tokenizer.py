@@ -3,13 +3,12 @@ import logging
 from deep_lyric_visualizer.helpers import setup_logger, dict_assign, find_first_file_with_ext
 
 from deep_lyric_visualizer.generator.generation_environment import GenerationEnvironment, WikipediaBigGANGenerationEnviornment
-from nlp.tokenizer import Tokenizer
+from deep_lyric_visualizer.nlp.tokenizer import Tokenizer
+from deep_lyric_visualizer.lyrics.lrc_table import LrcTable
 
 import re
 import os
 
-import pylrc
-
 
 from deep_lyric_visualizer.generator.generatorio import PickleGeneratorIO, YAMLGeneratorIO
 setup_logger()
@@ -27,13 +26,12 @@ class LyricTokenizer(Tokenizer):
         """
         super().__init__(gen_env)
 
-        self.lrc_str = None
-        self.lrc_obj = None
+        self.lrc = None
         self.lyric_list = None
         self.tokens_list = None
         self.name = __name__
 
-        self.attrs = ['tokens_list', 'lrc_str', 'lyric_list', 'lrc_obj']
+        self.attrs = ['tokens_list', 'lrc']
 
     def tokenize_lyrics(self, songname, process=True):
         """Tokenizes the lyrics, given a song name, and returns the tokens
@@ -50,10 +48,9 @@ class LyricTokenizer(Tokenizer):
             list list[str]: A list of lists of tokens, one for each line.
         """
 
-        self.lrc_str = self.env.read_lrc_file(songname)
-        self.lrc_obj = pylrc.parse(self.lrc_str)
+        self.lrc = LrcTable.from_file(self.env.find_lrc_file(songname))
 
-        self.lyric_list = self.lrc_to_lyric_list(self.lrc_obj)
+        self.lyric_list = self.lrc_to_lyric_list(self.lrc)
         logger.info(f'Tokenizing lyrics for song {songname}')
 
         tokens_list = [self.tokenize_phrase(lyric_line, process=process)
@@ -63,15 +60,15 @@ class LyricTokenizer(Tokenizer):
         self.tokens_list = tokens_list
         return tokens_list
 
-    def lrc_to_lyric_list(self, lrc_obj):
-        """Converts a lrc object to a lyric list.
+    def lrc_to_lyric_list(self, lrc):
+        """Converts a lrc table to a lyric list.
 
         Args:
-            lrc_obj (pylrc.lrc): A lrc object to extract lyrics from
+            lrc (LrcTable): A lrc table to extract lyrics from
 
         Returns:
             list: A list of lyrics in the same format as from a text file.
         """
         logger.debug('Converting lrc file to list of lyric strings.')
 
-        return [x.text for x in lrc_obj]
+        return lrc.lines()
@@ -39,17 +39,20 @@ class LyricVectorizer(Vectorizer):
 
         logger.info(
             'Vectorizing lists of tokens and adding to word_to_vec dictionary.')
-        n_failed = 0
-        for tokens in token_list:
-            if not tokens:
-                logger.warning(f'Empty tokens list. Skipping...')
-                continue
-            success_pct = self.memoize_vectorize_tokens(tokens)
-            if success_pct != 100:
-                n_failed += 1
-        logger.info(f'All lines\' tokens have been vectorized')
+
+        # look up every token of the song at once
+        tokens = [t for line in token_list for t in line]
+        self.get_word_vectors(tokens)
+
+        n_empty = sum(1 for line in token_list if not line)
+        n_failed = sum(1 for line in token_list
+                       if any(t in self.oov_tokens for t in line))
+        logger.info('All lines\' tokens have been vectorized')
+        if n_empty > 0:
+            logger.warning('%d lines have no tokens.', n_empty)
         if n_failed > 0:
-            logger.warning('Some words could not be converted.')
+            logger.warning('Some words could not be converted in %d of %d '
+                           'lines.', n_failed, len(token_list))
         return self.word_to_vec
 
     def vectorize_line(self, line):
@@ -59,9 +62,11 @@ class LyricVectorizer(Vectorizer):
             line (list [str]): A list of tokens
 
         Returns:
-            list [np.array]: A list of arrays (vectors) for each word
+            list [np.array]: A list of arrays (vectors) for each word in the
+                vocabulary. Words which are not are left out.
         """
-        return [self.vectorize_word(w) for w in line]
+        vectors, found = self.get_word_vectors(line)
+        return list(vectors[found])
 
     def vectorize_lines(self, token_list, start=None, stop=None):
         """Vectorize multiple lines of tokens
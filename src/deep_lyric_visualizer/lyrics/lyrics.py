@@ -1,5 +1,6 @@
 import logging
 from deep_lyric_visualizer.helpers import setup_logger, _extract_name_from_path
+from deep_lyric_visualizer.instrumentation import traced
 
 from deep_lyric_visualizer.lyrics.lyric_tokenizer import LyricTokenizer
 from deep_lyric_visualizer.lyrics.lyric_vectorizer import LyricVectorizer
@@ -10,8 +11,7 @@ from deep_lyric_visualizer.generator.generator_object import GeneratorObject
 
 from deep_lyric_visualizer.image_categories.image_categories import ImageCategories
 
-from pylrc import parser
-
+import numpy as np
 import pandas as pd
 
 setup_logger()
@@ -68,15 +68,13 @@ class Lyrics(GeneratorObject):
 
         self._tokens = None
         self._word_to_vec = None
-        self._lyric_list = None
-        self._lrc_str = None
-        self._lrc_obj = None
+        self._lrc = None
         self.topics = None
         self.name = __name__ if __name__ != '__main__' else _extract_name_from_path(
             __file__)
-        self.attrs = ['_tokens', '_word_to_vec',
-                      '_lyric_list', '_lrc_str', '_lrc_obj']
+        self.attrs = ['_tokens', '_word_to_vec', '_lrc']
 
+    @traced('Lyrics.generate_tokens')
     def generate_tokens(self, load=True, save=True):
 
         try:
@@ -93,11 +91,18 @@ class Lyrics(GeneratorObject):
         logger.info('Generated tokens.')
 
     @property
-    def lrc_obj(self):
-        if not self._lrc_obj:
+    def lrc(self):
+        """The synced lines of the song, with their categories and topics once
+        they are sorted.
 
-            self._lrc_obj = self.tokenizer.lrc_obj
-        return self._lrc_obj
+        Returns:
+            LrcTable: The lines of the song.
+        """
+        if self._lrc is None:
+            if self.tokenizer.lrc is None:
+                self.generate_tokens()
+            self._lrc = self.tokenizer.lrc
+        return self._lrc
 
     @property
     def tokens(self):
@@ -110,19 +115,7 @@ class Lyrics(GeneratorObject):
 
     @property
     def lyric_list(self):
-        if self._lyric_list:
-            return self._lyric_list
-        else:
-            self._lyric_list = self.tokenizer.lyric_list
-            return self._lyric_list
-
-    @property
-    def lrc_str(self):
-        if self._lrc_str:
-            return self._lrc_str
-        else:
-            self._lrc_str = self.tokenizer.lrc_str
-            return self._lrc_str
+        return self.lrc.lines()
 
     @property
     def word_to_vec(self):
@@ -133,6 +126,7 @@ class Lyrics(GeneratorObject):
             self._word_to_vec = self.vectorizer.word_to_vec
             return self._word_to_vec
 
+    @traced('Lyrics.generate_wordvecs')
     def generate_wordvecs(self, save=True):
         if not self.tokens:
             self.generate_tokens(load=False)
@@ -158,45 +152,76 @@ class Lyrics(GeneratorObject):
 
         return self.vectorizer.vectorize_song(self.tokens)
 
+    @traced('Lyrics.sort_topics')
     def sort_topics(self, image_categories=None, *args, **kwargs):
         if not image_categories:
             image_categories = ImageCategories(gen_env=self.env)
         line_assigner = LyricLineAssigner(*args, **kwargs)
         vectorized_song = self.vectorized_song()
 
-        for i, line in enumerate(vectorized_song):
-            if not line:
-                self.lrc_obj[i].category_id = None
-                continue
-            self.lrc_obj[i].category_id = line_assigner.assign_line(
-                line, image_categories.vectors, None)
-        return self.lrc_obj
+        self.lrc.set_categories(
+            [line_assigner.assign_line(line, image_categories.vectors, None)
+             if line else None for line in vectorized_song])
+        return self.lrc
 
+    @traced('Lyrics.assign_topics')
     def assign_topics(self, image_categories=None, n=1, *args, **kwargs):
-        if not self.lrc_obj:
+        if self.lrc.category_ids is None:
             self.sort_topics(image_categories, *args, **kwargs)
-        if not all(hasattr(x, 'category_id') for x in self.lrc_obj):
-            self.sort_topics(image_categories, *args, **kwargs)
-        for lrc_obj in self.lrc_obj:
-            if not lrc_obj.category_id:
-                lrc_obj.topic_ids = None
-                continue
-            lrc_obj.topic_ids = lrc_obj.category_id[0:n]
+        self.lrc.assign_topics(n)
 
     def generate_lyric_df(self):
-        temp_list = []
-        for lrc_o in self.lrc_obj:
-            data = dict(time=pd.to_timedelta(lrc_o.time, unit='s'),
-                        lyrics=lrc_o.text)
-            if lrc_o.topic_ids:
-                for i, topic in enumerate(lrc_o.topic_ids):
-                    data['topic'] = i
-                    data['topic_id'] = topic
-
-                    temp_list.append(data.copy())
-        df = pd.DataFrame(temp_list).dropna(how='any')
-        df['topic_id'] = df['topic_id'].astype(int)
-        return df
+        """Returns a row for each topic of each line of lyrics.
+
+        Returns:
+            pd.DataFrame: The time and lyrics of each line with each of its
+                topics, and the rank of the topic within the line.
+        """
+        topic_ids = self.lrc.topic_ids
+        if topic_ids is None:
+            topic_ids = np.zeros((len(self.lrc), 0), dtype=np.int32)
+
+        lines, topics = np.nonzero(topic_ids >= 0)
+        lyric_list = self.lrc.lines()
+        return pd.DataFrame(dict(
+            time=pd.to_timedelta(self.lrc.times[lines], unit='s'),
+            lyrics=[lyric_list[i] for i in lines],
+            topic=topics,
+            topic_id=topic_ids[lines, topics].astype(int)))
+
+    @traced('Lyrics.frame_topic_index')
+    def frame_topic_index(self, frame_rate, n_frames, default_topics):
+        """Returns the topic ids to use for each frame of the video. Each
+        frame uses the topics of the last line of lyrics sung at or before
+        it. Frames before the first line, and topics missing from a line,
+        use default_topics.
+
+        Args:
+            frame_rate (float): The number of frames per second.
+            n_frames (int): The number of frames.
+            default_topics (list [int]): The topic ids to fall back on. The
+                length of this list is the number of topics per frame.
+
+        Returns:
+            np.array: An integer array of shape (n_frames, number of topics),
+                with the topic ids for each frame.
+        """
+        n_topics = len(default_topics)
+        lines = self.lrc.has_topics()
+
+        # row 0 is used for frames before the first line
+        table = np.tile(np.asarray(default_topics, dtype=np.int32),
+                        (lines.sum() + 1, 1))
+        if lines.any():
+            topic_ids = self.lrc.topic_ids[lines, :n_topics]
+            width = topic_ids.shape[1]
+            table[1:, :width] = np.where(topic_ids >= 0, topic_ids,
+                                         table[1:, :width])
+
+        line_times = self.lrc.times[lines]
+        frame_times = np.arange(n_frames) / frame_rate
+
+        return table[np.searchsorted(line_times, frame_times, side='right')]
 
     def save(self):
         self.genio.save(self.songname)
@@ -213,7 +238,7 @@ if __name__ == '__main__':
     lyrics.load()
     lyrics.assign_topics(n=5)
 
-    print([l.topic_ids for l in lyrics.lrc_obj])
+    print(lyrics.lrc.topic_ids)
     df = lyrics.generate_lyric_df()
     import pdb
     pdb.set_trace()
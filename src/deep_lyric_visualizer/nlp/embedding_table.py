@@ -0,0 +1,182 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+def table_paths(path):
+    """Returns the files making up an embedding table.
+
+    Args:
+        path (str): The path of the table, without extension.
+
+    Returns:
+        tuple (str, str): The vocabulary file (one token per line) and the
+            .npy file with the vectors.
+    """
+    return path + '.vocab', path + '.npy'
+
+
+def extract_embedding_table(word_embedder, tokens, path):
+    """Extracts the vectors of some tokens from a full word embedder, such as
+    Wikipedia2Vec, and saves them as an embedding table: a sorted vocabulary
+    and a contiguous float32 matrix with a row for each token.
+
+    Args:
+        word_embedder (Wikipedia2Vec): The model to extract the vectors from.
+        tokens (iterable [str]): The tokens to keep.
+        path (str): Where to save the table, without extension.
+
+    Returns:
+        list [str]: The tokens which were not in the model's vocabulary.
+    """
+    vocab, vectors, missing = [], [], []
+    for token in sorted(set(tokens)):
+        try:
+            vectors.append(word_embedder.get_word_vector(token))
+        except KeyError:
+            missing.append(token)
+        else:
+            vocab.append(token)
+
+    if not vectors:
+        raise ValueError('None of the tokens are in the vocabulary.')
+
+    vocab_file, vectors_file = table_paths(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(vocab_file, 'w', encoding='utf8') as f:
+        f.write('\n'.join(vocab) + '\n')
+    np.save(vectors_file, np.asarray(vectors, dtype=np.float32))
+
+    logger.info('Saved %d vectors to %s. %d tokens were not in the '
+                'vocabulary.', len(vocab), path, len(missing))
+    return missing
+
+
+class EmbeddingTable:
+
+    def __init__(self, path, mmap=True):
+        """A word embedder backed by a table saved with
+        extract_embedding_table. It has the same get_word_vector method as
+        Wikipedia2Vec, but loads in a fraction of the time, and the vectors are
+        memory-mapped so that processes using the same table share them.
+
+        Args:
+            path (str): The path of the table, without extension.
+            mmap (bool, optional): Whether to memory-map the vectors instead
+                of reading them into memory. Defaults to True.
+        """
+        vocab_file, vectors_file = table_paths(path)
+        with open(vocab_file, 'r', encoding='utf8') as f:
+            self.vocab = f.read().split()
+        self.vectors = np.load(vectors_file, mmap_mode='r' if mmap else None)
+
+        if len(self.vocab) != len(self.vectors):
+            raise ValueError(f'The vocabulary and vectors of {path} do not '
+                             'have the same length.')
+
+        self.index = {token: i for i, token in enumerate(self.vocab)}
+        self.dim = self.vectors.shape[1]
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def get_word_vector(self, word):
+        """Returns the vector of a word.
+
+        Args:
+            word (str): The word.
+
+        Raises:
+            KeyError: Raised when the word is not in the table.
+
+        Returns:
+            np.array: The vector of the word.
+        """
+        return np.array(self.vectors[self.index[word]])
+
+    def get_word_vectors(self, words):
+        """Returns the vectors of many words, gathered from the table at once.
+
+        Args:
+            words (list [str]): The words.
+
+        Returns:
+            tuple (np.array, np.array): A matrix with the vector of each word
+                (zeros for words not in the table), and a boolean array which
+                is True for the words in the table.
+        """
+        rows = np.array([self.index.get(w, -1) for w in words], dtype=np.int64)
+        found = rows >= 0
+        vectors = np.zeros((len(words), self.dim), dtype=np.float32)
+        vectors[found] = self.vectors[rows[found]]
+        return vectors, found
+
+
+def catalog_vocabulary(gen_env):
+    """Returns every token of the lyrics in the lyric directory and of the
+    image categories, which are the only words the vectorizers look up.
+
+    Args:
+        gen_env (GenerationEnvironment): The environment to find the lyrics
+            and image categories with.
+
+    Returns:
+        set [str]: The tokens.
+    """
+    from deep_lyric_visualizer.lyrics.lyric_tokenizer import LyricTokenizer
+    from deep_lyric_visualizer.image_categories import (
+        image_category_tokenizer)
+
+    tokens = set()
+
+    lyric_dir = gen_env.create_abs_path(gen_env.LYRIC_PATH)
+    lyric_tokenizer = LyricTokenizer(gen_env)
+    for songname in sorted(os.listdir(lyric_dir)):
+        if not os.path.isdir(os.path.join(lyric_dir, songname)):
+            continue
+        try:
+            lines = lyric_tokenizer.tokenize_lyrics(songname)
+        except TypeError:
+            logger.warning('No lrc file for %s. Skipping...', songname)
+            continue
+        for line in lines:
+            tokens.update(line)
+
+    category_tokenizer = image_category_tokenizer.ImageCategoryTokenizer(
+        gen_env)
+    category_tokenizer.tokenize_image_classes()
+    for category in category_tokenizer.class_tokens.values():
+        for phrase in category:
+            tokens.update(phrase)
+
+    return tokens
+
+
+if __name__ == '__main__':
+    from deep_lyric_visualizer.generator.generation_environment import (
+        WikipediaBigGANGenerationEnviornment)
+
+    parser = argparse.ArgumentParser(
+        description='Extracts the vectors of the words in the lyrics and '
+        'image categories from the Wikipedia2Vec model into an embedding '
+        'table.')
+    parser.add_argument('--cfg', default=None)
+    parser.add_argument('--output', default=None,
+                        help='Defaults to EMBEDDING_TABLE_NAME in the models '
+                        'directory.')
+    args = parser.parse_args()
+
+    env = WikipediaBigGANGenerationEnviornment(args.cfg)
+    output = args.output or env.model_loc(env.EMBEDDING_TABLE_NAME)
+    extract_embedding_table(env.word_embedder(), catalog_vocabulary(env),
+                            output)
@@ -0,0 +1,200 @@
+import argparse
+import json
+import logging
+import zlib
+
+import numpy as np
+from scipy import sparse
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+def char_ngrams(word, min_n=3, max_n=5):
+    """Returns the character n-grams of a word, with < and > marking the
+    start and end of the word, as in fastText.
+
+    Args:
+        word (str): The word.
+        min_n (int, optional): The shortest n-gram. Defaults to 3.
+        max_n (int, optional): The longest n-gram. Defaults to 5.
+
+    Returns:
+        list [str]: The n-grams. Words too short for any n-gram are returned
+            whole.
+    """
+    marked = f'<{word}>'
+    ngrams = [marked[i:i + n] for n in range(min_n, max_n + 1)
+              for i in range(len(marked) - n + 1)]
+    return ngrams or [marked]
+
+
+def ngram_buckets(word, n_buckets, min_n=3, max_n=5):
+    """Returns the hash buckets of the character n-grams of a word.
+
+    Args:
+        word (str): The word.
+        n_buckets (int): The number of buckets in the table.
+        min_n (int, optional): The shortest n-gram. Defaults to 3.
+        max_n (int, optional): The longest n-gram. Defaults to 5.
+
+    Returns:
+        list [int]: One bucket per n-gram.
+    """
+    return [zlib.crc32(g.encode('utf8')) % n_buckets
+            for g in char_ngrams(word, min_n, max_n)]
+
+
+def _table_paths(path):
+    return path + '.ngrams.npy', path + '.counts.npy', path + '.json'
+
+
+def build_ngram_table(vocab, vectors, path, n_buckets=2 ** 17, min_n=3,
+                      max_n=5):
+    """Builds a table with the mean vector of the words containing each
+    character n-gram (hashed into a fixed number of buckets), and saves it
+    to be loaded by NgramEmbedder.
+
+    Args:
+        vocab (list [str]): The words of the vocabulary.
+        vectors (np.array): The vectors of the words, one row per word.
+        path (str): Where to save the table, without extension.
+        n_buckets (int, optional): The number of buckets. Defaults to 2 ** 17.
+        min_n (int, optional): The shortest n-gram. Defaults to 3.
+        max_n (int, optional): The longest n-gram. Defaults to 5.
+    """
+    buckets, words = [], []
+    for i, word in enumerate(vocab):
+        word_buckets = ngram_buckets(word, n_buckets, min_n, max_n)
+        buckets.extend(word_buckets)
+        words.extend([i] * len(word_buckets))
+
+    # a bucket by word matrix counting the n-grams of each word in each bucket
+    membership = sparse.csr_matrix(
+        (np.ones(len(buckets), dtype=np.float32), (buckets, words)),
+        shape=(n_buckets, len(vocab)))
+
+    counts = np.asarray(membership.sum(axis=1), dtype=np.float32).ravel()
+    table = membership @ np.asarray(vectors, dtype=np.float32)
+    table /= np.maximum(counts, 1)[:, None]
+
+    table_file, counts_file, meta_file = _table_paths(path)
+    np.save(table_file, table.astype(np.float32))
+    np.save(counts_file, counts.astype(np.int32))
+    with open(meta_file, 'w') as f:
+        json.dump(dict(n_buckets=n_buckets, min_n=min_n, max_n=max_n), f)
+
+    logger.info('Saved n-gram table with %d of %d buckets used to %s.',
+                np.count_nonzero(counts), n_buckets, path)
+
+
+class NgramEmbedder:
+
+    def __init__(self, path):
+        """A fallback word embedder for words missing from the vocabulary,
+        such as slang, contractions and misspellings. The vector of a word is
+        the mean of the vectors of its character n-grams, read from a
+        memory-mapped table built with build_ngram_table.
+
+        Args:
+            path (str): The path of the table, without extension.
+        """
+        table_file, counts_file, meta_file = _table_paths(path)
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+
+        self.n_buckets = meta['n_buckets']
+        self.min_n = meta['min_n']
+        self.max_n = meta['max_n']
+        self.vectors = np.load(table_file, mmap_mode='r')
+        self.counts = np.load(counts_file)
+        self.dim = self.vectors.shape[1]
+
+    def get_word_vectors(self, words):
+        """Returns the vectors of many words. Only the n-grams which appear in
+        the vocabulary the table was built from are used.
+
+        Args:
+            words (list [str]): The words.
+
+        Returns:
+            tuple (np.array, np.array): A matrix with the vector of each word
+                (zeros for words with no known n-gram), and a boolean array
+                which is True for the words with a vector.
+        """
+        vectors = np.zeros((len(words), self.dim), dtype=np.float32)
+        if not len(words):
+            return vectors, np.zeros(0, dtype=bool)
+
+        buckets, lengths = [], []
+        for word in words:
+            word_buckets = ngram_buckets(word, self.n_buckets, self.min_n,
+                                         self.max_n)
+            buckets.extend(word_buckets)
+            lengths.append(len(word_buckets))
+
+        buckets = np.array(buckets)
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+
+        # average the rows of the known n-grams of each word
+        known = self.counts[buckets] > 0
+        n_known = np.add.reduceat(known.astype(np.int32), offsets)
+        sums = np.add.reduceat(
+            np.asarray(self.vectors[buckets]) * known[:, None], offsets)
+
+        found = n_known > 0
+        vectors[found] = sums[found] / n_known[found, None]
+        return vectors, found
+
+    def get_word_vector(self, word):
+        """Returns the vector of a word.
+
+        Args:
+            word (str): The word.
+
+        Raises:
+            KeyError: Raised when none of the n-grams of the word are known.
+
+        Returns:
+            np.array: The vector of the word.
+        """
+        vectors, found = self.get_word_vectors([word])
+        if not found[0]:
+            raise KeyError(word)
+        return vectors[0]
+
+
+if __name__ == '__main__':
+    from deep_lyric_visualizer.nlp.embedding_table import EmbeddingTable
+    from deep_lyric_visualizer.generator.generation_environment import (
+        WikipediaBigGANGenerationEnviornment)
+
+    parser = argparse.ArgumentParser(
+        description='Builds the character n-gram table used for words '
+        'missing from the vocabulary.')
+    parser.add_argument('--cfg', default=None)
+    parser.add_argument('--source', default='table',
+                        choices=['table', 'wikipedia2vec'],
+                        help='Build from the words of the embedding table, or '
+                        'from every word of the Wikipedia2Vec model.')
+    parser.add_argument('--n_buckets', type=int, default=2 ** 17)
+    parser.add_argument('--output', default=None,
+                        help='Defaults to NGRAM_TABLE_NAME in the models '
+                        'directory.')
+    args = parser.parse_args()
+
+    env = WikipediaBigGANGenerationEnviornment(args.cfg)
+    if args.source == 'table':
+        table = EmbeddingTable(env.model_loc(env.EMBEDDING_TABLE_NAME))
+        vocab, vectors = table.vocab, table.vectors
+    else:
+        model = env.word_embedder()
+        words = list(model.dictionary.words())
+        vocab = [w.text for w in words]
+        vectors = model.syn0[[w.index for w in words]]
+
+    build_ngram_table(vocab, vectors,
+                      args.output or env.model_loc(env.NGRAM_TABLE_NAME),
+                      args.n_buckets)
@@ -1,34 +1,102 @@
 
 import logging
-from deep_lyric_visualizer.helpers import setup_logger, dict_assign, find_first_file_with_ext
+import re
 
-from deep_lyric_visualizer.generator.generator_object import GeneratorObject
+from deep_lyric_visualizer.helpers import setup_logger, dict_assign, find_first_file_with_ext, TruncatedRepr
 
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords as nltk_stopwords
+from deep_lyric_visualizer.generator.generator_object import GeneratorObject
 
 from deep_lyric_visualizer.generator.generatorio import PickleGeneratorIO, YAMLGeneratorIO
 setup_logger()
 logger = logging.getLogger(__name__)
 
 
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+METHODS = ('nltk', 'regex')
+
+
+def word_tokenizer(method):
+    """Returns the function splitting a phrase into tokens.
+
+    Args:
+        method (str): One of {"nltk", "regex"}. "nltk" uses NLTK's
+            word_tokenize. "regex" only splits out runs of letters, which is
+            much faster for short strings such as image labels, but splits
+            words like "man-eater" and "don't" apart instead of dropping them.
+
+    Raises:
+        ValueError: Raised when the method is unknown.
+
+    Returns:
+        function: A function from a string to a list of tokens.
+    """
+    if method == 'nltk':
+        from nltk.tokenize import word_tokenize
+        return word_tokenize
+    elif method == 'regex':
+        return WORD_PATTERN.findall
+    else:
+        raise ValueError(f'Unknown tokenizer method {method}. Use one of '
+                         f'{METHODS}.')
+
+
+def filter_tokens(tokens, stopwords):
+    """Lowercases the tokens and drops the stopwords and the tokens which are
+    not purely alphabetic.
+
+    Args:
+        tokens (list [str]): The raw tokens.
+        stopwords (set [str]): The stopwords to drop.
+
+    Returns:
+        list [str]: The remaining tokens.
+    """
+    processed_tokens = [w.lower() for w in tokens if w.isalpha()]
+    return [w for w in processed_tokens if w not in stopwords]
+
+
 class Tokenizer(GeneratorObject):
 
-    def __init__(self, gen_env=None):
+    def __init__(self, gen_env=None, method='nltk'):
+        if method not in METHODS:
+            raise ValueError(f'Unknown tokenizer method {method}. Use one of '
+                             f'{METHODS}.')
 
         super().__init__(gen_env)
         self.tokens = None
 
         self.name = __name__
 
+        self.method = method
+        self._stopwords = None
+
         self.attrs = ['tokens']
 
+    @property
+    def stopwords(self):
+        """The stopwords removed from the tokens, built once per tokenizer.
+
+        Returns:
+            frozenset [str]: The NLTK English stopwords with the stopwords
+                of the environment.
+        """
+        if self._stopwords is None:
+            from nltk.corpus import stopwords as nltk_stopwords
+
+            self._stopwords = frozenset(
+                set(nltk_stopwords.words('english')) |
+                set(self.env.ADDITIONAL_STOPWORDS) -
+                set(self.env.REMOVED_STOPWORDS))
+            logger.debug('Completed stopword generation. Stopwords : %s',
+                         TruncatedRepr(self._stopwords))
+        return self._stopwords
+
     def tokenize_phrase(self, phrase, process=True):
-        tokens = word_tokenize(phrase)
+        tokens = word_tokenizer(self.method)(phrase)
 
         if process:
             tokens = self._process_tokens(tokens)
-            logger.info(f'All tokens processed.')
+            logger.debug('All tokens processed.')
         else:
             logger.debug(
                 'Processing flag is false. Simply returning raw tokens.')
@@ -36,29 +104,12 @@ class Tokenizer(GeneratorObject):
         return tokens
 
     def _process_tokens(self, tokens):
-        logger.debug(f'Tokens: {tokens} -- Processing start...')
-
-        logger.debug(
-            f'Tokens: {tokens} -- Lowercasing and removing non alphanumeric tokens.')
-        processed_tokens = [w.lower() for w in tokens if w.isalpha()]
-        logger.debug(
-            f'Tokens: {tokens} -- Lowercased and filtered tokens. Output: {processed_tokens}')
-
-        logger.debug(
-            f'Tokens: {tokens} -- Creating stopwords list based on configuration file and common stopwords.')
-        stopwords = set(nltk_stopwords.words('english')) | \
-            set(self.env.ADDITIONAL_STOPWORDS) - \
-            set(self.env.REMOVED_STOPWORDS)
-        logger.debug(
-            f'Tokens: {tokens} -- Completed stopword generation. Stopwords : {stopwords}')
-
-        logger.debug(f'Tokens: {tokens} -- Removing words in stopwords.')
-        selected = [w for w in processed_tokens if w not in stopwords]
-        logger.debug(
-            f'Tokens: {tokens} -- Removed stopwords tokens. Output: {selected}')
-
+        # this runs for every line and category, so the messages are only
+        # formatted when debug logging is on
+        selected = filter_tokens(tokens, self.stopwords)
         logger.debug(
-            f'Tokens: {tokens} -- Completed processing. Final output: {selected}')
+            'Tokens: %s -- Completed processing. Final output: %s',
+            tokens, selected)
         return selected
 
     def load(self, songname=None):
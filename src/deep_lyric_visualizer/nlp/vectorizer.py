@@ -2,7 +2,7 @@ import os
 import yaml
 import pickle
 import logging
-from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.helpers import setup_logger, TruncatedRepr
 from deep_lyric_visualizer.generator.generator_object import GeneratorObject
 from deep_lyric_visualizer.generator.generatorio import PickleGeneratorIO, YAMLGeneratorIO
 
@@ -16,8 +16,10 @@ class Vectorizer(GeneratorObject):
     def __init__(self, gen_env=None):
         super().__init__(gen_env)
         self.word_embedder = self.env.word_embedder()
+        self.fallback_embedder = self.env.fallback_embedder()
 
         self.word_to_vec = {}
+        self.oov_tokens = set()
         self.name = __name__
 
         self.attrs = ['word_to_vec']
@@ -28,51 +30,148 @@ class Vectorizer(GeneratorObject):
         elif self.env.SAVE_FILETYPE == 'yaml':
             self.genio = YAMLGeneratorIO(self)
 
+    def _lookup_vectors(self, tokens):
+        """Looks up tokens in the word embedder, without raising for tokens
+        which are not in its vocabulary.
+
+        Args:
+            tokens (list [str]): Unique tokens to look up.
+
+        Returns:
+            tuple (np.array, np.array): The vectors of the tokens, and a
+                boolean array which is True for the tokens that were found.
+        """
+        embedder = self.word_embedder
+
+        # embedders with a batch method, such as nlp.EmbeddingTable
+        if hasattr(embedder, 'get_word_vectors'):
+            return embedder.get_word_vectors(tokens)
+
+        # Wikipedia2Vec returns None for missing words with get_word, so the
+        # rows of the known words can be gathered in one go
+        if getattr(embedder, 'syn0', None) is not None and \
+                hasattr(embedder, 'get_word'):
+            items = [embedder.get_word(t) for t in tokens]
+            found = np.array([item is not None for item in items], dtype=bool)
+            vectors = np.zeros((len(tokens), embedder.syn0.shape[1]),
+                               dtype=np.float32)
+            vectors[found] = embedder.syn0[
+                [item.index for item in items if item is not None]]
+            return vectors, found
+
+        vectors, found = [], []
+        for t in tokens:
+            try:
+                vectors.append(embedder.get_word_vector(t))
+            except Exception:
+                vectors.append(None)
+        found = np.array([v is not None for v in vectors], dtype=bool)
+        return vectors, found
+
+    def get_word_vectors(self, tokens):
+        """Returns the vectors of many tokens at once. Tokens which have not
+        been looked up before are deduplicated and looked up together, and
+        added to the word_to_vec dictionary. Tokens that are not in the
+        vocabulary are looked up in the fallback embedder, if there is one.
+        Tokens that are in neither are collected in oov_tokens and reported
+        in a single warning.
+
+        Args:
+            tokens (list [str]): The tokens to vectorize.
+
+        Returns:
+            tuple (np.array, np.array): A float32 matrix with a row for each
+                token (zeros for tokens not in the vocabulary), and a boolean
+                array which is True for the tokens that were found.
+        """
+        new = [t for t in dict.fromkeys(tokens)
+               if t not in self.word_to_vec and t not in self.oov_tokens]
+
+        if new:
+            vectors, found = self._lookup_vectors(new)
+            missing = []
+            for t, vec, is_found in zip(new, vectors, found):
+                if is_found:
+                    self.word_to_vec[t] = vec
+                else:
+                    missing.append(t)
+
+            # compose vectors for the missing tokens from their n-grams
+            if missing and self.fallback_embedder is not None:
+                vectors, found = self.fallback_embedder.get_word_vectors(
+                    missing)
+                logger.info('Composed vectors for %d of %d tokens which are '
+                            'not in the vocabulary.', found.sum(),
+                            len(missing))
+                for t, vec, is_found in zip(missing, vectors, found):
+                    if is_found:
+                        self.word_to_vec[t] = vec
+                missing = [t for t, is_found in zip(missing, found)
+                           if not is_found]
+
+            if missing:
+                self.oov_tokens.update(missing)
+                logger.warning('%d of %d new tokens are not in the '
+                               'vocabulary: %s', len(missing), len(new),
+                               TruncatedRepr(missing))
+
+        dim = self.env.wordvec_dim
+        if self.word_to_vec:
+            dim = len(next(iter(self.word_to_vec.values())))
+
+        # gather each distinct token once, then index the rows for every token
+        known = [t for t in dict.fromkeys(tokens) if t in self.word_to_vec]
+        rows = {t: i for i, t in enumerate(known)}
+        index = np.array([rows.get(t, -1) for t in tokens], dtype=np.int64)
+        found = index >= 0
+
+        vectors = np.zeros((len(tokens), dim), dtype=np.float32)
+        if known:
+            table = np.array([self.word_to_vec[t] for t in known],
+                             dtype=np.float32)
+            vectors[found] = table[index[found]]
+
+        return vectors, found
+
     def memoize_vectorize_tokens(self, tokens):
+        """Vectorizes a list of tokens, adding them to the word_to_vec
+        dictionary.
 
-        logger.debug(
-            f'Tokens: {tokens} -- Vecorizing tokens in token list.')
+        Args:
+            tokens (list [str]): The tokens to vectorize.
 
-        success = 0
-        n = len(tokens)
-        for i, t in enumerate(tokens):
-            if t in self.word_to_vec:
-                logger.debug(f'Token: {t} -- Already converted. Skipping...')
-                success += 1
-                continue
+        Returns:
+            float: The percentage of tokens which could be vectorized.
+        """
+        _, found = self.get_word_vectors(tokens)
 
-            logger.debug(
-                f'Token: {t} -- Converting to word vector ({i + 1} out of {len(tokens)}.')
-            try:
-                self.word_to_vec[t] = self.word_embedder.get_word_vector(t)
-            except Exception as e:
-                logger.warning(f'Token: {t} -- Could not find in vocabulary.')
-            else:
-                logger.debug(f'Token: {t} - - Successfully vectorized token.)')
-                success += 1
-
-        success_pct = round((success / n) * 100, 2)
+        success_pct = round(found.mean() * 100, 2)
         if success_pct != 100:
-            logger.warning(
-                f'Tokens: {tokens} -- Only {success_pct}% of tokens successfully converted.')
-        else:
             logger.debug(
-                f'Tokens: {tokens} -- All tokens were converted.')
-        logger.debug(f'Tokens: {tokens} -- Vectorization complete.')
+                'Tokens: %s -- Only %s%% of tokens successfully converted.',
+                tokens, success_pct)
+        else:
+            logger.debug('Tokens: %s -- All tokens were converted.', tokens)
 
         return success_pct
 
     def vectorize_word(self, word):
+        """Returns the vector of a single word, through the same lookup as
+        get_word_vectors.
 
-        try:
-            ret = self.word_to_vec[word]
-        except KeyError:
-            logger.debug(
-                f'Did not find word \'{word}\' in generated dictionary. Using embedder.')
-            ret = self.word_embedder.get_word_vector(word)
-        else:
-            logger.debug(f'Found word \'{word}\' in generated dictionary.')
-        return ret
+        Args:
+            word (str): The word to vectorize.
+
+        Returns:
+            np.array: The vector of the word.
+
+        Raises:
+            KeyError: If the word is not in the vocabulary.
+        """
+        vectors, found = self.get_word_vectors([word])
+        if not found[0]:
+            raise KeyError(word)
+        return vectors[0]
 
     def save(self, dirname=None):
         """Exports generated vectorization dictionary for future use
@@ -0,0 +1,452 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from itertools import chain, starmap
+
+import numpy as np
+
+from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.instrumentation import span
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+FEATURE_SR = 22050
+CHROMA_BINS_PER_OCTAVE = 36
+
+
+def _overlapping(blocks, context):
+    """Yields each block of a stream of audio with up to context samples of
+    the audio before and after it, so that a block can be processed as if it
+    were part of the whole signal.
+
+    Args:
+        blocks (iterable [np.array]): The blocks, each at least context
+            samples long, apart from the last.
+        context (int): The number of samples to add on each side.
+
+    Yields:
+        tuple (np.array, int, int): The block with its context, the number of
+            samples before the block and the number of samples of the block.
+    """
+    blocks = iter(blocks)
+    previous = np.zeros(0, dtype=np.float32)
+    current = next(blocks, None)
+    while current is not None:
+        following = next(blocks, None)
+        after = following[:context] if following is not None else current[:0]
+        yield np.concatenate([previous, current, after]), len(previous), \
+            len(current)
+        previous = np.concatenate([previous, current])[-context:]
+        current = following
+
+
+def _rechunk(blocks, size):
+    """Regroups a stream of audio into blocks of exactly size samples, apart
+    from the last one.
+
+    Args:
+        blocks (iterable [np.array]): The audio.
+        size (int): The number of samples per block.
+
+    Yields:
+        np.array: The new blocks.
+    """
+    buffer = np.zeros(0, dtype=np.float32)
+    for block in blocks:
+        buffer = np.concatenate([buffer, block])
+        while len(buffer) >= size:
+            yield buffer[:size]
+            buffer = buffer[size:]
+    if len(buffer):
+        yield buffer
+
+
+def stream_audio(path, sr=FEATURE_SR, block_size=2 ** 20, duration=None,
+                 context=2 ** 12):
+    """Decodes an audio file block by block, as mono audio resampled to sr.
+    Each block is resampled with context samples of its neighbours, so the
+    result matches resampling the whole file. Files soundfile cannot read are
+    loaded whole with librosa.load instead.
+
+    Args:
+        path (str): The audio file.
+        sr (int, optional): The sampling rate. Defaults to 22050, the one of
+            librosa.load.
+        block_size (int, optional): The approximate number of samples per
+            block. Defaults to 2 ** 20, about 48 seconds at 22050 Hz.
+        duration (float, optional): Only decode this many seconds. Defaults
+            to None, the whole file.
+        context (int, optional): The number of samples around each block used
+            when resampling. Defaults to 2 ** 12.
+
+    Yields:
+        np.array: The blocks of audio.
+    """
+    import librosa
+
+    try:
+        orig_sr = librosa.get_samplerate(path)
+    except Exception:
+        logger.warning('%s cannot be streamed, loading it whole.', path,
+                       exc_info=True)
+        y, _ = librosa.load(path, sr=sr, duration=duration)
+        yield from _rechunk([y], block_size)
+        return
+
+    # whole numbers of periods of the ratio, so each block resamples to a
+    # whole number of samples
+    ratio = Fraction(sr, orig_sr)
+    period = ratio.denominator
+    n_periods = max(1, int(block_size / ratio) // period)
+    blocks = librosa.stream(path, block_length=n_periods, frame_length=period,
+                            hop_length=period, mono=True, duration=duration)
+    if ratio == 1:
+        yield from blocks
+        return
+
+    context = -(-context // period) * period
+    for padded, before, n in _overlapping(blocks, context):
+        resampled = librosa.resample(padded, orig_sr=orig_sr, target_sr=sr)
+        start = int(before * ratio)
+        yield resampled[start:start + int(np.ceil(n * ratio))]
+
+
+def _analyse_block(padded, before, n, sr, frame_length, tuning, onsets):
+    """Computes the features of the frames of a block of audio, which may run
+    in another process.
+
+    Args:
+        padded (np.array): The block with its context, from _overlapping.
+        before (int): The number of samples of context before the block.
+        n (int): The number of samples of the block.
+        sr (int): The sampling rate of the audio.
+        frame_length (int): The number of samples per frame.
+        tuning (float): The tuning of the chromagram.
+        onsets (bool): Whether to compute the onset strength.
+
+    Returns:
+        tuple (np.array, np.array, np.array, int): The mean power, the
+            chromagram and the onset strength (or None) of the frames of the
+            block, and the number of samples of the block.
+    """
+    import librosa
+
+    # the frames centered on the samples of this block, and on the last
+    # sample of the song after the last block
+    first = before // frame_length
+    n_frames = -(-n // frame_length)
+    if before + n == len(padded) and n % frame_length == 0:
+        n_frames += 1
+    frames = slice(first, first + n_frames)
+
+    with span('melspectrogram') as sp:
+        spec = librosa.feature.melspectrogram(
+            y=padded, sr=sr, n_mels=128, fmax=8000, hop_length=frame_length)
+        power = np.mean(spec[:, frames], axis=0)
+        sp.items = n_frames
+
+    with span('chroma_cqt') as sp:
+        chroma = librosa.feature.chroma_cqt(
+            y=padded, sr=sr, hop_length=frame_length, tuning=tuning,
+            bins_per_octave=CHROMA_BINS_PER_OCTAVE)[:, frames]
+        sp.items = n_frames
+
+    onset = None
+    if onsets:
+        onset = librosa.onset.onset_strength(
+            y=padded, sr=sr, hop_length=frame_length)[frames]
+
+    return power, chroma, onset, n
+
+
+def _ordered_map(pool, fn, jobs, max_pending):
+    """Runs jobs in a pool, keeping at most max_pending jobs submitted, and
+    yields the results in the order of the jobs.
+
+    Args:
+        pool (concurrent.futures.Executor): The pool.
+        fn (function): The function to run.
+        jobs (iterable [tuple]): The arguments of each call.
+        max_pending (int): The maximum number of jobs submitted at a time.
+
+    Yields:
+        object: The results.
+    """
+    pending = deque()
+    for args in jobs:
+        pending.append(pool.submit(fn, *args))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class AudioFeatures:
+
+    def __init__(self, specm, gradm, chroma):
+        """The features of a song that drive the noise and class vectors, with
+        one value (or column) per frame.
+
+        Args:
+            specm (np.array): The mean power of the melspectrogram,
+                normalized between 0 and 1.
+            gradm (np.array): The positive part of the gradient of the mean
+                power, with a maximum of 1.
+            chroma (np.array): The chromagram, pitches by frames.
+        """
+        self.specm = specm
+        self.gradm = gradm
+        self.chroma = chroma
+
+        # set by the constructors which know them
+        self.duration = None
+        self.onsets = None
+
+        # sort pitches by overall power
+        self.chromasort = np.argsort(np.mean(chroma, axis=1))[::-1]
+
+    def __len__(self):
+        return len(self.gradm)
+
+    @classmethod
+    def from_audio(cls, y, sr, frame_length=512, n_jobs=1,
+                   block_frames=4096):
+        """Computes the features from the audio of a song.
+
+        Args:
+            y (np.array): The audio time series.
+            sr (int): The sampling rate of the audio.
+            frame_length (int, optional): The number of samples per frame.
+                Defaults to 512.
+            n_jobs (int, optional): The number of processes analysing blocks
+                of the song at once. None uses every CPU. With more than one,
+                the result matches the one of a single process within
+                floating point tolerance. Defaults to 1.
+            block_frames (int, optional): The number of frames per block with
+                more than one process. Defaults to 4096, about 95 seconds.
+
+        Returns:
+            AudioFeatures: The features of the song.
+        """
+        import librosa
+
+        if n_jobs != 1:
+            # the tuning chroma_cqt would estimate from the whole song
+            tuning = librosa.estimate_tuning(
+                y=y, sr=sr, bins_per_octave=CHROMA_BINS_PER_OCTAVE)
+            return cls._from_blocks(_rechunk([y], block_frames * frame_length),
+                                    sr, frame_length, tuning=tuning,
+                                    n_jobs=n_jobs)
+
+        # create spectrogram
+        with span('melspectrogram') as sp:
+            spec = librosa.feature.melspectrogram(
+                y=y, sr=sr, n_mels=128, fmax=8000, hop_length=frame_length)
+            sp.items = spec.shape[1]
+
+        # create chromagram of pitches X time points
+        with span('chroma_cqt') as sp:
+            chroma = librosa.feature.chroma_cqt(
+                y=y, sr=sr, hop_length=frame_length,
+                bins_per_octave=CHROMA_BINS_PER_OCTAVE)
+            sp.items = chroma.shape[1]
+
+        # get mean power at each time point
+        features = cls.from_power(np.mean(spec, axis=0), chroma)
+        features.duration = len(y) / sr
+        return features
+
+    @classmethod
+    def from_file(cls, path, frame_length=512, duration=None,
+                  block_frames=4096, context_frames=64, tuning=None,
+                  onsets=False, n_jobs=1):
+        """Computes the features of a song while streaming it from the file,
+        a block of frames at a time, so that the memory used does not grow
+        with the length of the song beyond the few values kept per frame.
+        This is meant for long mixes and podcasts, for which loading the
+        whole audio and spectrogram does not fit in memory.
+
+        Each block is analysed with context_frames frames of audio on each
+        side and trimmed, so that the frames match the ones computed on the
+        whole song.
+
+        Args:
+            path (str): The audio file.
+            frame_length (int, optional): The number of samples per frame, at
+                22050 Hz. Defaults to 512.
+            duration (float, optional): Only analyse this many seconds.
+                Defaults to None, the whole song.
+            block_frames (int, optional): The number of frames per block.
+                Defaults to 4096, about 95 seconds.
+            context_frames (int, optional): The number of frames of context
+                on each side of a block. Defaults to 64.
+            tuning (float, optional): The tuning of the chromagram, in
+                fractions of a bin. Defaults to None, which estimates it from
+                the first block.
+            onsets (bool, optional): Whether to also compute the onset
+                strength of each frame, normalized to a maximum of 1, in the
+                onsets attribute. Defaults to False.
+            n_jobs (int, optional): The number of processes analysing blocks
+                at once. None uses every CPU. Defaults to 1.
+
+        Returns:
+            AudioFeatures: The features of the song.
+        """
+        audio = _rechunk(stream_audio(path, FEATURE_SR, duration=duration),
+                         block_frames * frame_length)
+        return cls._from_blocks(audio, FEATURE_SR, frame_length,
+                                context_frames, tuning, onsets, n_jobs)
+
+    @classmethod
+    def _from_blocks(cls, blocks, sr, frame_length, context_frames=64,
+                     tuning=None, onsets=False, n_jobs=1):
+        """Computes the features from blocks of audio, in this process or in a
+        process pool. At most two blocks per process are decoded ahead of the
+        results, to keep the memory bounded.
+
+        Args:
+            blocks (iterable [np.array]): The audio, in blocks of a whole
+                number of frames.
+            sr (int): The sampling rate of the audio.
+
+            The other arguments are the ones of from_file.
+
+        Returns:
+            AudioFeatures: The features of the song.
+        """
+        import librosa
+
+        padded_blocks = _overlapping(blocks, context_frames * frame_length)
+        first_block = next(padded_blocks, None)
+        if first_block is None:
+            raise ValueError('There is no audio to analyse.')
+        if tuning is None:
+            tuning = librosa.estimate_tuning(
+                y=first_block[0], sr=sr,
+                bins_per_octave=CHROMA_BINS_PER_OCTAVE)
+
+        jobs = ((padded, before, n, sr, frame_length, tuning, onsets)
+                for padded, before, n in chain([first_block], padded_blocks))
+
+        n_jobs = n_jobs or os.cpu_count()
+        with span('analyse_audio') as sp:
+            if n_jobs == 1:
+                results = list(starmap(_analyse_block, jobs))
+            else:
+                with ProcessPoolExecutor(n_jobs) as pool:
+                    results = list(_ordered_map(pool, _analyse_block, jobs,
+                                                2 * n_jobs))
+            power, chroma, onset, lengths = zip(*results)
+            sp.items = sum(len(p) for p in power)
+
+        n_samples = sum(lengths)
+        logger.info('Analysed %.1f seconds of audio in %d blocks with %d '
+                    'processes.', n_samples / sr, len(power), n_jobs)
+        features = cls.from_power(np.concatenate(power),
+                                  np.concatenate(chroma, axis=1))
+        features.duration = n_samples / sr
+        if onsets:
+            onset = np.concatenate(onset)
+            features.onsets = onset / max(np.max(onset), 1e-12)
+        return features
+
+    def save(self, path):
+        """Saves the features to a .npz file.
+
+        Args:
+            path (str): The file.
+        """
+        arrays = dict(specm=self.specm, gradm=self.gradm, chroma=self.chroma)
+        if self.duration is not None:
+            arrays['duration'] = self.duration
+        if self.onsets is not None:
+            arrays['onsets'] = self.onsets
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Loads features saved with save.
+
+        Args:
+            path (str): The file.
+
+        Returns:
+            AudioFeatures: The features.
+        """
+        with np.load(path) as f:
+            features = cls(f['specm'], f['gradm'], f['chroma'])
+            if 'duration' in f:
+                features.duration = float(f['duration'])
+            if 'onsets' in f:
+                features.onsets = f['onsets']
+        return features
+
+    @classmethod
+    def cached(cls, cache_dir, audio_sha256, compute, **params):
+        """Loads the features of a song from a cache keyed by the hash of its
+        audio and the parameters of the analysis, or computes and caches them,
+        so that a song is analysed once however many times it is uploaded.
+
+        Args:
+            cache_dir (str): The directory of the cache. It is created if it
+                does not exist.
+            audio_sha256 (str): The hash of the audio file.
+            compute (function): Computes the features when they are not in
+                the cache.
+            **params: The parameters which change the features, such as the
+                frame length.
+
+        Returns:
+            AudioFeatures: The features.
+        """
+        key = '-'.join([audio_sha256] +
+                       [f'{k}={params[k]}' for k in sorted(params)])
+        path = os.path.join(cache_dir, key + '.npz')
+        if os.path.exists(path):
+            try:
+                features = cls.load(path)
+            except (OSError, ValueError, KeyError):
+                logger.warning('Could not read cached features %s.', path)
+            else:
+                logger.info('Loaded cached features %s.', path)
+                return features
+
+        features = compute()
+
+        # write to a temporary file first so a crash never leaves partial
+        # features behind
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        features.save(tmp)
+        os.replace(tmp, path)
+        return features
+
+    @classmethod
+    def from_power(cls, specm, chroma):
+        """Computes the features from the mean power and the chromagram.
+
+        Args:
+            specm (np.array): The mean power of the melspectrogram at each
+                frame.
+            chroma (np.array): The chromagram, pitches by frames.
+
+        Returns:
+            AudioFeatures: The features of the song.
+        """
+        # compute power gradient across time points
+        gradm = np.gradient(specm)
+
+        # set max to 1
+        gradm = gradm/np.max(gradm)
+
+        # set negative gradient time points to zero
+        gradm = gradm.clip(min=0)
+
+        # normalize mean power between 0-1
+        specm = (specm-np.min(specm))/np.ptp(specm)
+
+        return cls(specm, gradm, chroma)
@@ -0,0 +1,420 @@
+"""Renders a catalog of songs listed in a manifest with one process, loading
+each model once and filling the GAN batches with frames of consecutive songs.
+
+Usage:
+    python -m deep_lyric_visualizer.render.batch_render manifest.yml
+
+The manifest is a YAML (or JSON) file with the parameters shared by every song
+under defaults, and the songs with their own parameters under songs:
+
+    defaults:
+      resolution: 256
+      num_classes: 12
+    songs:
+      - song: songs/first.mp3
+        output_file: videos/first.mp4
+      - song: songs/second.mp3
+        jitter: 0.2
+"""
+import argparse
+import logging
+import os
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+import yaml
+
+from deep_lyric_visualizer import instrumentation
+from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.instrumentation import span
+from deep_lyric_visualizer.render.fingerprint import (
+    file_sha256, fingerprint_params, lrc_sha256, new_seed, render_fingerprint,
+    save_fingerprint)
+from deep_lyric_visualizer.render.pipeline import pipeline
+from deep_lyric_visualizer.render.renderer import (
+    FrameRenderer, parse_batch_size, to_uint8_frames)
+from deep_lyric_visualizer.render.sparse_vectors import densify
+from deep_lyric_visualizer.render.vectors import compute_vectors
+from deep_lyric_visualizer.render.video_encoder import VideoEncoder
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+# the parameters of a song and their defaults, the same as visualize.py
+SONG_DEFAULTS = dict(resolution='512', duration=None, pitch_sensitivity=220,
+                     tempo_sensitivity=0.25, depth=1, num_classes=12,
+                     sort_classes_by_power=0, jitter=0.5, frame_length=512,
+                     truncation=1, smooth_factor=20, smooth_method='linear',
+                     seed=None, lyrics=None, output_file=None)
+
+
+def load_manifest(path):
+    """Reads the songs of a manifest, with the defaults filled in.
+
+    Args:
+        path (str): The YAML or JSON manifest.
+
+    Raises:
+        ValueError: Raised when a song has no audio file or unknown
+            parameters.
+
+    Returns:
+        list [dict]: The parameters of each song. The song key is the audio
+            file, lyrics is the name of the lyrics (the name of the audio file
+            by default) and output_file is the video (the audio file with an
+            .mp4 extension by default).
+    """
+    with open(path, 'r') as f:
+        manifest = yaml.safe_load(f)
+
+    defaults = dict(SONG_DEFAULTS, **manifest.get('defaults', {}))
+    specs = []
+    for entry in manifest['songs']:
+        if isinstance(entry, str):
+            entry = dict(song=entry)
+        spec = dict(defaults, **entry)
+
+        unknown = set(spec) - set(SONG_DEFAULTS) - {'song'}
+        if unknown:
+            raise ValueError(f'Unknown parameters {sorted(unknown)} for '
+                             f'{spec.get("song")}.')
+        if not spec.get('song'):
+            raise ValueError('Every song of the manifest needs a song.')
+
+        base = os.path.splitext(spec['song'])[0]
+        spec['lyrics'] = spec['lyrics'] or os.path.basename(base)
+        spec['output_file'] = spec['output_file'] or base + '.mp4'
+        specs.append(spec)
+    return specs
+
+
+def group_by_model(specs):
+    """Groups the songs rendered with the same model and truncation, which
+    can share GAN batches. The songs of each group are in the order of the
+    manifest, and the groups are in the order of their first song, except
+    that the groups of the same model are next to each other, so that each
+    model is loaded once.
+
+    Args:
+        specs (list [dict]): The parameters of each song.
+
+    Returns:
+        OrderedDict: The songs of each (model name, truncation).
+    """
+    groups = OrderedDict()
+    for spec in specs:
+        key = (f'biggan-deep-{spec["resolution"]}', spec['truncation'])
+        groups.setdefault(key, []).append(spec)
+
+    models = list(OrderedDict.fromkeys(model for model, _ in groups))
+    return OrderedDict(sorted(groups.items(),
+                              key=lambda item: models.index(item[0][0])))
+
+
+def fill_batches(lengths, batch_size):
+    """Fills batches of frames with the frames of consecutive songs, so that
+    every batch but the last has batch_size frames. The songs are read from
+    lengths only when the batch being filled needs their frames.
+
+    Args:
+        lengths (iterable [tuple (object, int)]): A key and the number of
+            frames of each song.
+        batch_size (int or function): The number of frames per batch, or a
+            function returning it, which is called before filling each batch
+            so that the batches follow a batch size lowered meanwhile.
+
+    Yields:
+        list [tuple (object, int, int)]: The key, start and stop of the
+            frames of each song in a batch.
+    """
+    def next_size():
+        return batch_size() if callable(batch_size) else batch_size
+
+    batch, size, target = [], 0, next_size()
+    for key, n_frames in lengths:
+        start = 0
+        while start < n_frames:
+            stop = min(n_frames, start + target - size)
+            batch.append((key, start, stop))
+            size += stop - start
+            start = stop
+            if size == target:
+                yield batch
+                batch, size, target = [], 0, next_size()
+    if batch:
+        yield batch
+
+
+def take_batch(songs, batch):
+    """Gathers the vectors of a batch from the songs being rendered. Only
+    the thread running the GAN uses songs: the other stages get the
+    parameters, number of frames and frame rate of the songs of the batch
+    with it, and a song is removed from songs once its last frames are
+    batched, which frees its vectors.
+
+    Args:
+        songs (dict): The parameters, noise vectors, class vectors and frame
+            rate of each song, by key.
+        batch (list [tuple (object, int, int)]): The key, start and stop of
+            the frames of each song in the batch, from fill_batches.
+
+    Returns:
+        tuple (np.array, np.array, dict): The noise vectors and dense class
+            vectors of the batch, and the parameters, number of frames and
+            frame rate of each song in the batch.
+    """
+    noise_batch = np.concatenate(
+        [songs[i][1][start:stop] for i, start, stop in batch])
+    class_batch = np.concatenate(
+        [densify(songs[i][2][start:stop]) for i, start, stop in batch])
+
+    batch_songs = {}
+    for i, _, stop in batch:
+        spec, noise_vectors, _, fps = songs[i]
+        batch_songs[i] = (spec, len(noise_vectors), fps)
+        if stop == len(noise_vectors):
+            del songs[i]
+    return noise_batch, class_batch, batch_songs
+
+
+def load_model(model_name):
+    """Loads a pretrained BigGAN.
+
+    Args:
+        model_name (str): The name of the model, such as biggan-deep-512.
+
+    Returns:
+        BigGAN: The model.
+    """
+    from pytorch_pretrained_biggan import BigGAN
+    return BigGAN.from_pretrained(model_name)
+
+
+def prepare_song(spec):
+    """Computes the noise and class vectors of a song with compute_vectors,
+    the same way as visualize.py. The seed (a random one if it is None),
+    fingerprint and fingerprint_inputs of the render are filled in the
+    parameters.
+
+    Args:
+        spec (dict): The parameters of the song, from load_manifest.
+
+    Returns:
+        tuple (np.array, scipy.sparse matrix, float): The noise vectors, the
+            class vectors and the number of frames per second.
+    """
+    from deep_lyric_visualizer.lyrics.lyrics import Lyrics
+
+    if spec['seed'] is None:
+        spec['seed'] = new_seed()
+    lyrics = Lyrics(spec['lyrics'])
+    vectors = compute_vectors(
+        spec['song'], lyrics, spec['frame_length'],
+        spec['pitch_sensitivity'], spec['tempo_sensitivity'], spec['depth'],
+        spec['num_classes'], spec['sort_classes_by_power'], spec['jitter'],
+        spec['truncation'], spec['smooth_factor'], spec['smooth_method'],
+        duration=spec['duration'], seed=spec['seed'])
+
+    spec['fingerprint'], spec['fingerprint_inputs'] = render_fingerprint(
+        file_sha256(spec['song']), lrc_sha256(lyrics.lrc),
+        fingerprint_params(spec),
+        spec['seed'], f'biggan-deep-{spec["resolution"]}')
+    return vectors
+
+
+class BatchRenderer:
+
+    def __init__(self, batch_size=60, device=None, load_model=load_model,
+                 prepare=prepare_song, encoder=VideoEncoder,
+                 memory_budget_mb=None):
+        """Renders the songs of a manifest. Each model is loaded once, and the
+        songs rendered with it are prepared one after the other as the GAN
+        batches need their frames, so that batches are always full and at
+        most the vectors of the songs in the current batch are in memory.
+        The frames of each batch are then converted and sent to the encoder
+        of their song in other threads, while the GAN runs on the next batch.
+
+        Args:
+            batch_size (int or str, optional): The number of frames per
+                batch, or 'auto' to choose it for each model from the frames
+                of its first song. Defaults to 60.
+            device (str, optional): The device to run the GAN on. Defaults to
+                None, which uses CUDA if it is available.
+            load_model (function, optional): Loads a model from its name.
+                Defaults to load_model.
+            prepare (function, optional): Computes the noise vectors, class
+                vectors and frame rate of a song from its parameters.
+                Defaults to prepare_song.
+            encoder (class, optional): Called with the output file, the frame
+                rate, the audio file and the metadata of a song, returns an
+                object with write and close methods. Defaults to VideoEncoder.
+            memory_budget_mb (float, optional): The memory budget of the
+                automatic batch size. Defaults to None, see FrameRenderer.
+        """
+        self.batch_size = batch_size
+        self.device = device
+        self.load_model = load_model
+        self.prepare = prepare
+        self.encoder = encoder
+        self.memory_budget_mb = memory_budget_mb
+
+    def render(self, specs):
+        """Renders every song.
+
+        Args:
+            specs (list [dict]): The parameters of each song, from
+                load_manifest.
+
+        Returns:
+            dict: The number of frames rendered for each output file.
+        """
+        rendered = {}
+        models = {}
+        for (model_name, truncation), group in group_by_model(specs).items():
+            if model_name not in models:
+                models.clear()
+                with span('load_model'):
+                    models[model_name] = self.load_model(model_name)
+            renderer = FrameRenderer(models[model_name], truncation,
+                                     self.batch_size, self.device,
+                                     memory_budget_mb=self.memory_budget_mb)
+            logger.info('Rendering %d songs with %s and truncation %s.',
+                        len(group), model_name, truncation)
+            rendered.update(self.render_group(renderer, group))
+        return rendered
+
+    def open_encoder(self, spec, fps):
+        """Opens the encoder of a song, with its fingerprint as the comment
+        of the video.
+
+        Args:
+            spec (dict): The parameters of the song.
+            fps (float): The number of frames per second.
+
+        Returns:
+            object: The encoder.
+        """
+        metadata = None
+        if spec.get('fingerprint'):
+            metadata = dict(comment=spec['fingerprint'])
+        return self.encoder(spec['output_file'], fps, spec['song'],
+                            metadata=metadata)
+
+    def close_encoder(self, encoder, spec, n_frames):
+        """Closes the encoder of a song once all its frames are written, and
+        saves the fingerprint of the video next to it.
+
+        Args:
+            encoder (object): The encoder of the song.
+            spec (dict): The parameters of the song.
+            n_frames (int): The number of frames of the song.
+        """
+        encoder.close()
+        if spec.get('fingerprint'):
+            save_fingerprint(spec['output_file'], spec['fingerprint'],
+                             spec['fingerprint_inputs'])
+        logger.info('Rendered %d frames of %s to %s.', n_frames, spec['song'],
+                    spec['output_file'])
+
+    def render_group(self, renderer, specs):
+        """Renders songs sharing a model and truncation, in shared batches.
+
+        Args:
+            renderer (FrameRenderer): The renderer of the model.
+            specs (list [dict]): The parameters of each song.
+
+        Returns:
+            dict: The number of frames rendered for each output file.
+        """
+        songs = {}
+
+        def lengths():
+            for i, spec in enumerate(specs):
+                with span('prepare_song') as sp:
+                    noise_vectors, class_vectors, fps = self.prepare(spec)
+                    sp.items = len(noise_vectors)
+                if not len(noise_vectors):
+                    logger.warning('%s has no frames. Skipping...',
+                                   spec['song'])
+                    continue
+                songs[i] = (spec, noise_vectors, class_vectors, fps)
+                yield i, len(noise_vectors)
+
+        songs_lengths = lengths()
+        if renderer.batch_size == 'auto':
+            first = next(songs_lengths, None)
+            if first is None:
+                return {}
+            renderer.tune(songs[first[0]][1], songs[first[0]][2])
+            songs_lengths = chain([first], songs_lengths)
+
+        def infer():
+            # the batch size is read for each batch, as it is lowered when the
+            # GAN runs out of memory
+            for batch in fill_batches(songs_lengths,
+                                      lambda: renderer.batch_size):
+                noise_batch, class_batch, batch_songs = take_batch(
+                    songs, batch)
+                yield (batch, batch_songs,
+                       renderer.infer(noise_batch, class_batch))
+
+        def postprocess(item):
+            batch, batch_songs, output = item
+            with span('to_uint8_frames') as sp:
+                frames = to_uint8_frames(output)
+                sp.items = len(frames)
+            return batch, batch_songs, frames
+
+        encoders = {}
+        rendered = {}
+
+        def encode(item):
+            # send the frames of each song to its encoder
+            batch, batch_songs, frames = item
+            with span('encode') as sp:
+                offset = 0
+                for i, start, stop in batch:
+                    spec, n_frames, fps = batch_songs[i]
+                    if i not in encoders:
+                        encoders[i] = self.open_encoder(spec, fps)
+                    for frame in frames[offset:offset + stop - start]:
+                        encoders[i].write(frame)
+                    offset += stop - start
+
+                    if stop == n_frames:
+                        self.close_encoder(encoders.pop(i), spec, n_frames)
+                        rendered[spec['output_file']] = n_frames
+                sp.items = len(frames)
+
+        # the GAN runs on a batch while the previous ones are converted and
+        # encoded
+        for _ in pipeline(infer(), postprocess, encode):
+            pass
+        return rendered
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Renders the songs of a manifest with one process.')
+    parser.add_argument('manifest')
+    parser.add_argument('--batch_size', type=parse_batch_size, default=60,
+                        help="A number of frames, or 'auto'.")
+    parser.add_argument('--memory_budget', type=float, default=None,
+                        help='The memory budget of --batch_size auto, in MB.')
+    parser.add_argument('--device', default=None)
+    parser.add_argument('--trace', default='',
+                        help='Where to write a Chrome trace of the run.')
+    args = parser.parse_args()
+
+    if args.trace:
+        instrumentation.enable()
+
+    BatchRenderer(args.batch_size, args.device,
+                  memory_budget_mb=args.memory_budget).render(
+        load_manifest(args.manifest))
+
+    if args.trace:
+        tracer = instrumentation.disable()
+        tracer.save(args.trace)
+        print('\n' + tracer.table())
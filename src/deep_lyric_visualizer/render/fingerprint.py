@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import secrets
+
+import numpy as np
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+# bump when a change to the rendering changes the frames of the same inputs,
+# so that videos cached by fingerprint are not reused
+FINGERPRINT_VERSION = 1
+
+# the options of visualize.py which change the video, apart from the song,
+# lyrics, classes and seed
+FINGERPRINT_ARGS = ('resolution', 'duration', 'pitch_sensitivity',
+                    'tempo_sensitivity', 'depth', 'num_classes',
+                    'sort_classes_by_power', 'jitter', 'frame_length',
+                    'truncation', 'smooth_factor', 'smooth_method',
+                    'subtitles', 'keyframes', 'keyframe_threshold',
+                    'onset_threshold', 'max_keyframe_gap', 'stream_audio')
+
+
+def new_seed():
+    """Returns a random seed, for renders without one, so that they can be
+    recorded and reproduced.
+
+    Returns:
+        int: The seed.
+    """
+    return secrets.randbits(32)
+
+
+def file_sha256(path, chunk_size=2 ** 20):
+    """Hashes a file a chunk at a time.
+
+    Args:
+        path (str): The file.
+        chunk_size (int, optional): The number of bytes read at a time.
+            Defaults to 1MB.
+
+    Returns:
+        str: The hex SHA-256 of the contents of the file.
+    """
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def lrc_sha256(lrc):
+    """Hashes the lyrics used by a render: the times and text of the lines,
+    and the categories and topics assigned to them.
+
+    Args:
+        lrc (LrcTable): The lyrics.
+
+    Returns:
+        str: The hex SHA-256 of the lyrics.
+    """
+    h = hashlib.sha256()
+    h.update(np.ascontiguousarray(lrc.times, dtype=np.float64))
+    h.update(lrc.text.encode('utf8'))
+    for ids in (lrc.category_ids, lrc.topic_ids):
+        if ids is None:
+            h.update(b'none')
+        else:
+            ids = np.asarray(ids, dtype=np.int32)
+            h.update(str(ids.shape).encode())
+            h.update(np.ascontiguousarray(ids))
+    return h.hexdigest()
+
+
+def fingerprint_params(options):
+    """Returns the options of a render which change its video, so that every
+    caller fingerprints the same options the same way.
+
+    Args:
+        options (dict): The options of the render, named as the arguments of
+            visualize.py. Other options, such as the batch size, are left out.
+
+    Returns:
+        dict: The options to fingerprint.
+    """
+    return {k: options[k] for k in FINGERPRINT_ARGS if k in options}
+
+
+def render_fingerprint(audio_sha256, lyrics_sha256, params, seed,
+                       model_name):
+    """Returns the fingerprint of a render: a hash of everything that
+    determines its video. Two renders with the same fingerprint give the
+    same video, so it can be used as the key of a cache of videos.
+
+    Args:
+        audio_sha256 (str): The hash of the audio file, from file_sha256.
+        lyrics_sha256 (str): The hash of the lyrics, from lrc_sha256, or None
+            for renders without lyrics.
+        params (dict): The parameters of the render which change the video.
+            They must be serializable to JSON.
+        seed (int): The random seed of the render.
+        model_name (str): The name of the GAN.
+
+    Returns:
+        tuple (str, dict): The hex fingerprint, and the inputs it was
+            computed from, to record with the video.
+    """
+    inputs = dict(version=FINGERPRINT_VERSION, audio=audio_sha256,
+                  lyrics=lyrics_sha256, params=params, seed=seed,
+                  model=model_name)
+    encoded = json.dumps(inputs, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf8')).hexdigest(), inputs
+
+
+def save_fingerprint(video_file, fingerprint, inputs):
+    """Records the fingerprint of a video and its inputs next to it, in
+    <video_file>.json.
+
+    Args:
+        video_file (str): The video.
+        fingerprint (str): The fingerprint of the render.
+        inputs (dict): The inputs, from render_fingerprint.
+    """
+    with open(video_file + '.json', 'w') as f:
+        json.dump(dict(fingerprint=fingerprint, **inputs), f, indent=2,
+                  sort_keys=True)
+    logger.info('Render fingerprint of %s: %s', video_file, fingerprint)
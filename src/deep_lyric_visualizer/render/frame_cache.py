@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+class FrameCache:
+
+    def __init__(self, cache_dir, model_name, resolution, truncation,
+                 max_bytes=10 * 1024 ** 3):
+        """A content-addressed cache of rendered frames on local disk.
+
+        Each frame is stored as a compressed uint8 array, named by a hash of
+        everything that determines its pixels: the model, the resolution, the
+        truncation and the noise and class vectors. Re-rendering the same
+        vectors (for instance, with --use_previous_vectors 1) then reuses the
+        frames instead of running the GAN.
+
+        Frames are stored one per .npz file, under a directory named by the
+        first two characters of the hash, rather than grouped into chunk
+        files with an index. A frame is looked up on its own, since a render
+        with changed settings shares scattered frames with an earlier one,
+        and a frame can be written atomically and evicted by removing its
+        file, without rewriting or compacting a chunk. The frames are
+        compressed individually, which costs little as neighbouring GAN
+        frames share few exact bytes.
+
+        When the cache grows above max_bytes, the least recently used frames
+        are removed.
+
+        Args:
+            cache_dir (str): The directory to store the frames in. It is
+                created if it does not exist.
+            model_name (str): The name of the GAN model.
+            resolution (int): The resolution of the frames.
+            truncation (float): The truncation passed to the GAN.
+            max_bytes (int, optional): The maximum size of the cache on disk.
+                Defaults to 10GB.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._prefix = f'{model_name}|{resolution}|{float(truncation)!r}|'
+
+        self.hits = 0
+        self.misses = 0
+        # frames may be looked up and stored from different threads
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = OrderedDict()
+        self.size = 0
+        self._scan()
+
+    def _scan(self):
+        """Builds the in-memory LRU index from the files already on disk,
+        oldest (least recently used) first.
+        """
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.npz'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4],
+                                    stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.size += size
+
+        logger.debug('Found %d cached frames (%d bytes) in %s',
+                     len(self._index), self.size, self.cache_dir)
+
+    def key(self, noise_vector, class_vector):
+        """Returns the content hash for a pair of vectors.
+
+        Args:
+            noise_vector (np.array): The noise vector of the frame.
+            class_vector (np.array): The class vector of the frame.
+
+        Returns:
+            str: A hex digest identifying the frame.
+        """
+        h = hashlib.sha1(self._prefix.encode())
+        h.update(np.ascontiguousarray(noise_vector, dtype=np.float32))
+        h.update(np.ascontiguousarray(class_vector, dtype=np.float32))
+        return h.hexdigest()
+
+    def path(self, key):
+        """Returns the location of a frame in the cache.
+
+        Args:
+            key (str): The hash of the frame.
+
+        Returns:
+            str: The path of the compressed frame.
+        """
+        return os.path.join(self.cache_dir, key[:2], key + '.npz')
+
+    def get(self, key):
+        """Loads a frame from the cache.
+
+        Args:
+            key (str): The hash of the frame.
+
+        Returns:
+            np.array: The uint8 frame, or None if it is not cached.
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+
+        loc = self.path(key)
+        try:
+            with np.load(loc) as f:
+                frame = f['frame']
+        except (OSError, ValueError, KeyError):
+            logger.warning('Could not read cached frame %s. Removing it.', loc)
+            with self._lock:
+                self._remove(key)
+                self.misses += 1
+            return None
+
+        os.utime(loc)
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.hits += 1
+        return frame
+
+    def put(self, key, frame):
+        """Stores a frame in the cache, evicting old frames if necessary.
+
+        Args:
+            key (str): The hash of the frame.
+            frame (np.array): The uint8 frame.
+        """
+        with self._lock:
+            if key in self._index:
+                return
+
+        loc = self.path(key)
+        os.makedirs(os.path.dirname(loc), exist_ok=True)
+
+        # write to a temporary file first so a crash never leaves a partial
+        # frame behind
+        tmp = f'{loc}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, frame=np.asarray(frame, dtype=np.uint8))
+        os.replace(tmp, loc)
+
+        size = os.path.getsize(loc)
+        with self._lock:
+            if key not in self._index:
+                self._index[key] = size
+                self.size += size
+            self._evict()
+
+    def _remove(self, key):
+        size = self._index.pop(key, 0)
+        self.size -= size
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Removes the least recently used frames until the cache fits in
+        max_bytes.
+        """
+        n_evicted = 0
+        while self.size > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._remove(key)
+            n_evicted += 1
+
+        if n_evicted:
+            logger.debug('Evicted %d frames from %s', n_evicted,
+                         self.cache_dir)
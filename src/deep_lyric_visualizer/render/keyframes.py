@@ -0,0 +1,182 @@
+import logging
+from deep_lyric_visualizer.helpers import setup_logger
+
+import numpy as np
+from scipy import sparse
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+def latent_deltas(noise_vectors, class_vectors):
+    """Computes how much the GAN input changes from one frame to the next.
+    The class vectors may be sparse.
+
+    The noise and class changes are each scaled by their mean step size so
+    that neither dominates, and then summed. A value of 1 therefore means
+    "an average amount of change" for this song.
+
+    Args:
+        noise_vectors (np.array): The noise vectors, one row per frame.
+        class_vectors (np.array or scipy.sparse matrix): The class vectors,
+            one row per frame.
+
+    Returns:
+        np.array: The change for each frame relative to the previous frame.
+            The first frame always has a change of 0.
+    """
+    n = min(len(noise_vectors), class_vectors.shape[0])
+
+    deltas = np.zeros(n)
+    if n < 2:
+        return deltas
+
+    for vectors in (noise_vectors[:n], class_vectors[:n]):
+        if sparse.issparse(vectors):
+            diff = vectors[1:] - vectors[:-1]
+            step = np.sqrt(np.asarray(diff.multiply(diff).sum(axis=1)))[:, 0]
+        else:
+            diff = np.diff(np.asarray(vectors, dtype=np.float64), axis=0)
+            step = np.linalg.norm(diff, axis=1)
+        mean_step = step.mean()
+        if mean_step > 0:
+            deltas[1:] += step / mean_step
+
+    return deltas / 2
+
+
+class KeyframeSelector:
+
+    def __init__(self, delta_threshold=2.5, onset_threshold=0.5, max_gap=6):
+        """Chooses which frames are rendered by the GAN. All other frames are
+        blended from the keyframes on either side of them.
+
+        Args:
+            delta_threshold (float, optional): The amount of accumulated
+                latent change (see latent_deltas) after which a new keyframe
+                is placed. Defaults to 2.5.
+            onset_threshold (float, optional): Frames whose normalized onset
+                strength (between 0 and 1) is at least this value are always
+                keyframes. Defaults to 0.5.
+            max_gap (int, optional): The maximum number of frames between two
+                keyframes. This bounds the error of the blended frames.
+                Defaults to 6.
+        """
+        if max_gap < 1:
+            raise ValueError('max_gap must be at least 1.')
+
+        self.delta_threshold = delta_threshold
+        self.onset_threshold = onset_threshold
+        self.max_gap = max_gap
+
+    def select(self, deltas, onsets=None):
+        """Selects the keyframes.
+
+        Args:
+            deltas (np.array): The latent change for each frame.
+            onsets (np.array, optional): The normalized onset strength for
+                each frame. Defaults to None, which only uses the deltas.
+
+        Returns:
+            np.array: The sorted indexes of the keyframes. The first and last
+                frames are always included.
+        """
+        n = len(deltas)
+        if n == 0:
+            return np.array([], dtype=int)
+
+        if onsets is None:
+            onsets = np.zeros(n)
+        else:
+            onsets = np.resize(np.asarray(onsets, dtype=np.float64), n)
+
+        keyframes = [0]
+        accumulated = 0
+        for i in range(1, n):
+            accumulated += deltas[i]
+            if (accumulated >= self.delta_threshold
+                    or onsets[i] >= self.onset_threshold
+                    or i - keyframes[-1] >= self.max_gap):
+                keyframes.append(i)
+                accumulated = 0
+
+        if keyframes[-1] != n - 1:
+            keyframes.append(n - 1)
+
+        logger.info(
+            f'Selected {len(keyframes)} keyframes out of {n} frames.')
+        return np.array(keyframes)
+
+
+def slerp_positions(latents, keyframes):
+    """Finds where each frame lies on the spherical interpolation (slerp)
+    between the keyframes before and after it.
+
+    The position is the angle between the frame's latent and the previous
+    keyframe's latent, relative to the total angle travelled through the
+    frame to the next keyframe. This keeps the pacing of the original
+    trajectory, so that a quick change in the music still shows as a quick
+    change in the blended frames.
+
+    Args:
+        latents (np.array): The GAN inputs, one row per frame (for instance,
+            the noise and class vectors joined together).
+        keyframes (np.array): The sorted indexes of the keyframes, as returned
+            by KeyframeSelector.select.
+
+    Returns:
+        tuple (np.array, np.array): For every frame, the position of the
+            keyframe before it in the keyframes array, and the blending
+            weight (between 0 and 1) of the keyframe after it.
+    """
+    latents = np.asarray(latents, dtype=np.float64)
+    n = len(latents)
+    frames = np.arange(n)
+
+    if len(keyframes) < 2:
+        return np.zeros(n, dtype=int), np.zeros(n)
+
+    left = np.searchsorted(keyframes, frames, side='right') - 1
+    left = np.clip(left, 0, len(keyframes) - 2)
+    start = keyframes[left]
+    end = keyframes[left + 1]
+
+    unit = latents / np.maximum(
+        np.linalg.norm(latents, axis=1, keepdims=True), 1e-12)
+
+    def angle(a, b):
+        return np.arccos(np.clip(np.sum(unit[a] * unit[b], axis=1), -1, 1))
+
+    before = angle(start, frames)
+    after = angle(frames, end)
+    travelled = before + after
+    linear = (frames - start) / np.maximum(end - start, 1)
+    weights = np.where(travelled > 1e-6,
+                       before / np.maximum(travelled, 1e-6), linear)
+
+    return left, np.clip(weights, 0, 1)
+
+
+def blend_frames(key_images, left, weights):
+    """Yields every frame by blending the rendered keyframe images.
+
+    Args:
+        key_images (list [np.array]): The uint8 images rendered for each
+            keyframe.
+        left (np.array): The position of the keyframe before each frame, as
+            returned by slerp_positions.
+        weights (np.array): The blending weight of the keyframe after each
+            frame, as returned by slerp_positions.
+
+    Yields:
+        np.array: A uint8 image for each frame.
+    """
+    for k, w in zip(left, weights):
+        if w <= 0 or k + 1 >= len(key_images):
+            yield key_images[k]
+        elif w >= 1:
+            yield key_images[k + 1]
+        else:
+            blended = (1 - w) * key_images[k].astype(np.float32) + \
+                w * key_images[k + 1].astype(np.float32)
+            yield np.rint(blended).astype(np.uint8)
@@ -0,0 +1,106 @@
+import logging
+import queue
+import threading
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+# marks the end of the items in a queue
+_DONE = object()
+
+
+class _Failure:
+
+    def __init__(self, error):
+        """Carries an error raised in a stage to the consumer of the
+        pipeline.
+        """
+        self.error = error
+
+
+def pipeline(source, *stages, queue_size=4):
+    """Runs the iteration of source and each stage in its own thread,
+    connected by bounded queues, so that the stages work on consecutive items
+    at the same time. The threads overlap as long as the stages release the
+    GIL, as torch, numpy and writing to ffmpeg mostly do.
+
+    An error raised by the source or a stage is raised again by the
+    generator. Closing the generator early stops every thread.
+
+    Args:
+        source (iterable): The first stage, such as a generator running the
+            GAN on each batch.
+        *stages (function): The other stages, each called with an item of the
+            previous stage and returning an item for the next one.
+        queue_size (int, optional): The number of items waiting between two
+            stages, which bounds the memory used. Defaults to 4.
+
+    Yields:
+        object: The items returned by the last stage, in order.
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(queue_size) for _ in range(len(stages) + 1)]
+
+    def put(q, item):
+        # wait for space, unless the consumer is gone
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def produce():
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    return
+        except Exception as error:
+            put(queues[0], _Failure(error))
+            return
+        put(queues[0], _DONE)
+
+    def work(stage, inbox, outbox):
+        while True:
+            item = get(inbox)
+            if item is _DONE or isinstance(item, _Failure):
+                put(outbox, item)
+                return
+            try:
+                item = stage(item)
+            except Exception as error:
+                put(outbox, _Failure(error))
+                return
+            if not put(outbox, item):
+                return
+
+    threads = [threading.Thread(target=produce, daemon=True)]
+    threads += [threading.Thread(target=work, args=(stage, inbox, outbox),
+                                 daemon=True)
+                for stage, inbox, outbox in zip(stages, queues, queues[1:])]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
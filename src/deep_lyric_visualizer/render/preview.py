@@ -0,0 +1,248 @@
+import io
+import logging
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.render.renderer import (
+    FrameRenderer, to_uint8_frames)
+from deep_lyric_visualizer.render.sparse_vectors import densify
+from deep_lyric_visualizer.render.vectors import compute_vectors
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+PREVIEW_MODEL = 'biggan-deep-128'
+BOUNDARY = 'frame'
+
+
+@lru_cache(maxsize=1)
+def load_preview_model(model_name=PREVIEW_MODEL):
+    """Loads the GAN used for previews, once per process.
+
+    Args:
+        model_name (str, optional): The name of the pretrained BigGAN.
+            Defaults to the 128 pixel BigGAN-deep.
+
+    Returns:
+        BigGAN: The model.
+    """
+    from pytorch_pretrained_biggan import BigGAN
+    return BigGAN.from_pretrained(model_name)
+
+
+def preview_vectors(song, lyrics, frame_length=2048, pitch_sensitivity=220,
+                    tempo_sensitivity=0.25, depth=1, num_classes=12,
+                    sort_classes_by_power=1, jitter=0.5, truncation=1,
+                    smooth_factor=20, duration=None, seed=None,
+                    feature_cache=None, audio_sha256=None):
+    """Computes the noise and class vectors of a song with compute_vectors,
+    with a longer frame length for a lower frame rate.
+
+    Args:
+        song (str): The path of the audio file.
+        lyrics (Lyrics): The lyrics of the song.
+        frame_length (int, optional): The number of audio samples per frame.
+            Defaults to 2048, about 11 frames per second.
+        duration (float, optional): The number of seconds to preview.
+            Defaults to None, the whole song.
+        seed (int, optional): The seed of the trajectory. Defaults to None,
+            a different trajectory each time.
+        feature_cache (str, optional): A directory to cache the audio features
+            in, by the hash of the song. Defaults to None, no cache.
+        audio_sha256 (str, optional): The hash of the song, if it is known.
+            Defaults to None, which hashes the file when there is a cache.
+
+        The other arguments are the ones of visualize.py.
+
+    Returns:
+        tuple (np.array, scipy.sparse matrix, float): The noise vectors, the
+            class vectors and the number of frames per second.
+    """
+    return compute_vectors(
+        song, lyrics, frame_length, pitch_sensitivity, tempo_sensitivity,
+        depth, num_classes, sort_classes_by_power, jitter, truncation,
+        smooth_factor, duration=duration, seed=seed,
+        feature_cache=feature_cache, audio_sha256=audio_sha256)
+
+
+def encode_jpeg(frame, quality=75):
+    """Encodes a frame as a JPEG image.
+
+    Args:
+        frame (np.array): A uint8 image of shape (height, width, 3).
+        quality (int, optional): The JPEG quality. Defaults to 75.
+
+    Returns:
+        bytes: The JPEG file.
+    """
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+class FrameQueue:
+
+    def __init__(self, maxsize=4):
+        """A bounded queue between the thread rendering frames and the
+        client. When the client falls behind and the queue is full, the
+        oldest frame is dropped, so that the client always gets the most
+        recent frames instead of an ever growing delay.
+
+        Args:
+            maxsize (int, optional): The number of frames to hold.
+                Defaults to 4.
+        """
+        self.frames = deque(maxlen=maxsize)
+        self.closed = False
+        self.dropped = 0
+        self._condition = threading.Condition()
+
+    def put(self, frame):
+        """Adds a frame, dropping the oldest one if the queue is full.
+
+        Args:
+            frame (bytes): The frame.
+        """
+        with self._condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append(frame)
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """Waits for the next frame.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+                Defaults to None, which waits until there is a frame or the
+                queue is closed.
+
+        Returns:
+            bytes: The frame, or None if the queue is closed and empty, or the
+                timeout has passed.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.frames or self.closed,
+                                     timeout)
+            return self.frames.popleft() if self.frames else None
+
+    def close(self):
+        """Marks the end of the frames."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class PreviewStream:
+
+    def __init__(self, model, noise_vectors, class_vectors, fps,
+                 truncation=1, batch_size=1, queue_size=4, device='cpu',
+                 quality=75):
+        """Renders the frames of a preview in a background thread, in step
+        with the audio playing in the browser. Frames the renderer is too
+        late for are skipped instead of rendered, and frames the client is
+        too slow for are dropped by the queue, so the preview stays near real
+        time on a CPU.
+
+        Args:
+            model (BigGAN): The GAN model, usually from load_preview_model.
+            noise_vectors (np.array): The noise vector of each frame.
+            class_vectors (np.array or scipy.sparse matrix): The class vector
+                of each frame.
+            fps (float): The number of frames per second.
+            truncation (float, optional): The truncation passed to the GAN.
+                Defaults to 1.
+            batch_size (int, optional): The number of frames rendered at a
+                time. Defaults to 1, the lowest latency.
+            queue_size (int, optional): The number of encoded frames waiting
+                for the client. Defaults to 4.
+            device (str, optional): The device to run the GAN on. Defaults to
+                'cpu'.
+            quality (int, optional): The JPEG quality. Defaults to 75.
+        """
+        self.renderer = FrameRenderer(model, truncation, batch_size, device)
+        self.noise_vectors = noise_vectors
+        self.class_vectors = class_vectors
+        self.fps = fps
+        self.quality = quality
+        self.queue = FrameQueue(queue_size)
+
+        self.rendered = 0
+        self.skipped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self):
+        """Starts rendering, unless it has already started. Frame 0 is due
+        now.
+
+        Returns:
+            PreviewStream: The stream itself.
+        """
+        if self._thread.ident is None:
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops rendering, such as when the client disconnects."""
+        self._stop.set()
+
+    def _produce(self):
+        n_frames = len(self.noise_vectors)
+        batch_size = self.renderer.batch_size
+        start = time.perf_counter()
+
+        i = 0
+        try:
+            while i < n_frames and not self._stop.is_set():
+                # skip to the frame that is due, if rendering fell behind
+                due = int((time.perf_counter() - start) * self.fps)
+                if due > i:
+                    self.skipped += min(due, n_frames) - i
+                    i = due
+                    continue
+
+                stop = min(i + batch_size, n_frames)
+                output = self.renderer.infer(
+                    self.noise_vectors[i:stop],
+                    densify(self.class_vectors[i:stop]))
+                for frame in to_uint8_frames(output):
+                    self.queue.put(encode_jpeg(frame, self.quality))
+                self.rendered += stop - i
+                i = stop
+
+                # do not run ahead of the audio
+                ahead = i / self.fps - (time.perf_counter() - start)
+                if ahead > 0:
+                    self._stop.wait(ahead)
+        except Exception:
+            logger.exception('Preview rendering failed.')
+        finally:
+            self.queue.close()
+            logger.info('Preview rendered %d frames, skipped %d and dropped '
+                        '%d.', self.rendered, self.skipped,
+                        self.queue.dropped)
+
+    def mjpeg(self):
+        """Yields the frames as the parts of a multipart/x-mixed-replace HTTP
+        response, which browsers show as a video in an img tag. Stops the
+        rendering when the client goes away.
+
+        Yields:
+            bytes: One part per frame.
+        """
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                yield (f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                       f'Content-Length: {len(frame)}\r\n\r\n').encode() + \
+                    frame + b'\r\n'
+        finally:
+            self.stop()
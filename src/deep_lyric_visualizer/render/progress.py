@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+import time
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+class ProgressReporter:
+
+    def __init__(self, path, min_interval=0.5, clock=time.monotonic):
+        """Reports the progress of a render as its latest event, a JSON
+        object written to a file, which another process such as the web app
+        can read at any time:
+
+            {"stage": "render", "state": "running", "done": 120,
+             "total": 4000, "fps": 3.2, "eta": 1212.5, "elapsed": 37.5,
+             "time": 1700000000.0}
+
+        The file is replaced atomically, so a reader never sees a partial
+        event. Updates are cheap enough to report every batch: the file is
+        only written once per min_interval, and when the stage or state
+        changes.
+
+        Args:
+            path (str): The file to write the events to.
+            min_interval (float, optional): The minimum number of seconds
+                between two writes of updates. Defaults to 0.5.
+            clock (function, optional): The clock timing the stages.
+                Defaults to time.monotonic.
+        """
+        self.path = path
+        self.min_interval = min_interval
+        self.clock = clock
+        self.stage = None
+        self.total = None
+        self.done = 0
+        self.state = 'running'
+        self.message = None
+        self._started = self._written = clock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def start(self, stage, total=None):
+        """Starts a stage of the render.
+
+        Args:
+            stage (str): The name of the stage, such as 'render'.
+            total (int, optional): The number of items of the stage, such as
+                frames. Defaults to None, for stages without a known total.
+        """
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self._started = self.clock()
+        self._write()
+
+    def update(self, n=1):
+        """Records that items of the current stage are done.
+
+        Args:
+            n (int, optional): The number of items done. Defaults to 1.
+        """
+        self.done += n
+        if self.clock() - self._written >= self.min_interval or \
+                self.done == self.total:
+            self._write()
+
+    def finish(self):
+        """Records that the render is done."""
+        self.state = 'done'
+        self._write()
+
+    def fail(self, message):
+        """Records that the render failed.
+
+        Args:
+            message (str): What went wrong.
+        """
+        self.state = 'failed'
+        self.message = message
+        self._write()
+
+    def event(self):
+        """Returns the current event.
+
+        Returns:
+            dict: The stage, state, items done and total, items per second,
+                seconds remaining (None if unknown) and seconds elapsed in
+                the stage.
+        """
+        elapsed = self.clock() - self._started
+        fps = self.done / elapsed if elapsed > 0 else 0.
+        eta = None
+        if self.total is not None and fps > 0:
+            eta = round((self.total - self.done) / fps, 1)
+
+        event = dict(stage=self.stage, state=self.state, done=self.done,
+                     total=self.total, fps=round(fps, 2), eta=eta,
+                     elapsed=round(elapsed, 1), time=time.time())
+        if self.message is not None:
+            event['message'] = self.message
+        return event
+
+    def _write(self):
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.event(), f)
+        os.replace(tmp, self.path)
+        self._written = self.clock()
+
+
+def read_progress(path):
+    """Reads the latest progress event of a render.
+
+    Args:
+        path (str): The file written by a ProgressReporter.
+
+    Returns:
+        dict: The event, or None if no event was written yet.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def render_status(event, stored, running):
+    """Returns the progress of a render as seen by a client waiting for its
+    video. The video is only done once it is stored, which is after the
+    render reports done, so a render reported done but not yet stored is
+    still running, in a finalizing stage.
+
+    Args:
+        event (dict): The latest event of the render, from read_progress, or
+            None.
+        stored (bool): Whether the video is in the store.
+        running (bool): Whether a job is running the render.
+
+    Returns:
+        dict: The event, or None if the render is unknown.
+    """
+    if stored:
+        return dict(stage=None, state='done')
+    if event is None:
+        return None
+
+    event = dict(event)
+    if event['state'] == 'done':
+        event.update(stage='finalizing', state='running', total=None,
+                     eta=None)
+    if event['state'] == 'running' and not running:
+        # the app was restarted during the render
+        event.update(state='failed', message='The render was stopped.')
+    return event
@@ -0,0 +1,417 @@
+import functools
+import logging
+import os
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.instrumentation import peak_rss_mb, span, traced
+from deep_lyric_visualizer.render.pipeline import pipeline
+from deep_lyric_visualizer.render.sparse_vectors import densify
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+# the batch sizes tried when the batch size is 'auto'
+AUTO_BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+
+
+def is_out_of_memory(error):
+    """Returns whether an error is an allocation failure of torch, on the CPU
+    or a GPU.
+
+    Args:
+        error (Exception): The error.
+
+    Returns:
+        bool: True for allocation failures.
+    """
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error)
+    return isinstance(error, RuntimeError) and (
+        'out of memory' in message or "can't allocate memory" in message)
+
+
+def _encode(encoder, frames):
+    with span('encode') as sp:
+        for frame in frames:
+            encoder.write(frame)
+        sp.items = len(frames)
+    return frames
+
+
+def parse_batch_size(value):
+    """Parses a --batch_size argument.
+
+    Args:
+        value (str): A number of frames, or 'auto'.
+
+    Returns:
+        int or str: The batch size.
+    """
+    return value if value == 'auto' else int(value)
+
+
+def to_uint8_frames(output):
+    """Converts a batch of GAN output to images. Each image is scaled from its
+    own minimum and maximum to 0-255, the same as scipy.misc.toimage.
+
+    Args:
+        output (np.array): The GAN output, of shape (batch, 3, height, width).
+
+    Returns:
+        list [np.array]: One uint8 image of shape (height, width, 3) per
+            item in the batch.
+    """
+    output = np.asarray(output, dtype=np.float32)
+    cmin = output.min(axis=(1, 2, 3), keepdims=True)
+    cscale = output.max(axis=(1, 2, 3), keepdims=True) - cmin
+    cscale[cscale == 0] = 1
+
+    scaled = (output - cmin) * (255 / cscale)
+    scaled = scaled.clip(0, 255) + 0.5
+    frames = np.ascontiguousarray(
+        scaled.astype(np.uint8).transpose(0, 2, 3, 1))
+    return list(frames)
+
+
+class FrameRenderer:
+
+    def __init__(self, model, truncation=1, batch_size=30, device=None,
+                 frame_cache=None, memory_budget_mb=None, progress=None):
+        """Runs the GAN over noise and class vectors in batches and converts
+        the output to frames.
+
+        Args:
+            model (BigGAN): The GAN model. It is called with a batch of noise
+                vectors, a batch of class vectors and the truncation.
+            truncation (float, optional): The truncation passed to the GAN.
+                Defaults to 1.
+            batch_size (int or str, optional): The number of frames per
+                batch, or 'auto' to choose it with tune before the first
+                render. Defaults to 30.
+            device (torch.device, optional): The device to run the GAN on.
+                Defaults to None, which uses CUDA if it is available.
+            frame_cache (render.FrameCache, optional): A cache of frames
+                rendered earlier. Defaults to None, which renders every frame.
+            memory_budget_mb (float, optional): The peak memory allowed when
+                choosing the batch size, in MB of RAM on the CPU or of memory
+                allocated on the GPU. Defaults to None, 80% of the memory of
+                the device.
+            progress (render.ProgressReporter, optional): Where to report the
+                frames rendered, after every batch. Defaults to None.
+        """
+        import torch
+
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        self.device = torch.device(device)
+        self.model = model.to(self.device)
+        self.truncation = truncation
+        self.batch_size = batch_size
+        self.frame_cache = frame_cache
+        self.memory_budget_mb = memory_budget_mb
+        self.progress = progress
+        self.tuning = []
+
+    def infer(self, noise_batch, class_batch):
+        """Runs the GAN on a single batch. If the batch does not fit in
+        memory, the batch size is halved and the batch is run in parts,
+        instead of failing.
+
+        Args:
+            noise_batch (np.array): The noise vectors of the batch.
+            class_batch (np.array): The dense class vectors of the batch.
+
+        Returns:
+            np.array: The GAN output, of shape (batch, 3, height, width).
+        """
+        try:
+            return self._infer(noise_batch, class_batch)
+        except (RuntimeError, MemoryError) as error:
+            if not is_out_of_memory(error) or len(noise_batch) == 1:
+                raise
+
+        # outside of the except block, to free the memory of the failed batch
+        self._empty_cache()
+        batch_size = max(1, len(noise_batch) // 2)
+        if isinstance(self.batch_size, int):
+            self.batch_size = min(self.batch_size, batch_size)
+        logger.warning('Ran out of memory with a batch of %d frames. Backing '
+                       'off to %d.', len(noise_batch), batch_size)
+        return np.concatenate([
+            self.infer(noise_batch[i:i + batch_size],
+                       class_batch[i:i + batch_size])
+            for i in range(0, len(noise_batch), batch_size)])
+
+    def _infer(self, noise_batch, class_batch):
+        import torch
+
+        noise_vector = torch.Tensor(noise_batch).to(self.device)
+        class_vector = torch.Tensor(class_batch).to(self.device)
+
+        with span('FrameRenderer.infer') as sp:
+            with torch.no_grad():
+                output = self.model(noise_vector, class_vector,
+                                    self.truncation)
+            output = output.cpu().data.numpy()
+            sp.items = len(output)
+
+        return output
+
+    def _empty_cache(self):
+        if self.device.type == 'cuda':
+            import torch
+            torch.cuda.empty_cache()
+
+    def _reset_peak_memory(self):
+        if self.device.type == 'cuda':
+            import torch
+            # torch before 1.4 has no reset_peak_memory_stats
+            if hasattr(torch.cuda, 'reset_peak_memory_stats'):
+                torch.cuda.reset_peak_memory_stats(self.device)
+            else:
+                torch.cuda.reset_max_memory_allocated(self.device)
+
+    def _peak_memory_mb(self):
+        """Returns the peak memory allocated on the GPU since the last reset,
+        or the peak RSS of the process on the CPU. The peak RSS can not be
+        reset, so batch sizes are tried from the smallest, each raising it.
+        """
+        if self.device.type == 'cuda':
+            import torch
+            return torch.cuda.max_memory_allocated(self.device) / 1024 ** 2
+        return peak_rss_mb() or 0
+
+    def _memory_budget_mb(self):
+        if self.memory_budget_mb:
+            return self.memory_budget_mb
+        if self.device.type == 'cuda':
+            import torch
+            total = torch.cuda.get_device_properties(self.device).total_memory
+        else:
+            try:
+                total = os.sysconf('SC_PAGE_SIZE') * \
+                    os.sysconf('SC_PHYS_PAGES')
+            except (AttributeError, ValueError, OSError):
+                return float('inf')
+        return 0.8 * total / 1024 ** 2
+
+    def tune(self, noise_vectors, class_vectors, sizes=AUTO_BATCH_SIZES):
+        """Chooses the batch size with the highest throughput within the
+        memory budget, by rendering the first frames with increasing batch
+        sizes. Larger sizes are not tried once the memory budget is exceeded,
+        an allocation fails or the throughput drops.
+
+        Args:
+            noise_vectors (np.array): The noise vectors to render.
+            class_vectors (np.array or scipy.sparse matrix): The class
+                vectors to render.
+            sizes (list [int], optional): The batch sizes to try, from the
+                smallest. Defaults to AUTO_BATCH_SIZES.
+
+        Returns:
+            int: The batch size, which is also set as the batch size of the
+                renderer.
+        """
+        budget = self._memory_budget_mb()
+        sizes = [s for s in sizes if s <= len(noise_vectors)] or \
+            [len(noise_vectors)]
+
+        # the first run of a model is slower, as memory is allocated
+        self._infer(noise_vectors[:1], densify(class_vectors[:1]))
+
+        self.tuning = []
+        with span('FrameRenderer.tune') as sp:
+            for size in sizes:
+                noise_batch = noise_vectors[:size]
+                class_batch = densify(class_vectors[:size])
+                self._reset_peak_memory()
+                try:
+                    # repeat fast batches, whose timings are noisy
+                    times = []
+                    while not times or (len(times) < 5 and
+                                        sum(times) < 0.25):
+                        start = time.perf_counter()
+                        self._infer(noise_batch, class_batch)
+                        times.append(time.perf_counter() - start)
+                except (RuntimeError, MemoryError) as error:
+                    if not is_out_of_memory(error):
+                        raise
+                    logger.info('Batch size %d: out of memory.', size)
+                    break
+
+                fps = size / min(times)
+                peak = self._peak_memory_mb()
+                self.tuning.append(dict(batch_size=size, fps=fps,
+                                        peak_memory_mb=peak))
+                logger.info('Batch size %d: %.2f frames/s, peak memory %.0f '
+                            'MB.', size, fps, peak)
+
+                best = max(t['fps'] for t in self.tuning)
+                if peak > budget or fps < 0.9 * best:
+                    break
+            sp.items = sum(t['batch_size'] for t in self.tuning)
+        self._empty_cache()
+
+        within = [t for t in self.tuning if t['peak_memory_mb'] <= budget]
+        if within:
+            choice = max(within, key=lambda t: t['fps'])
+            self.batch_size = choice['batch_size']
+            logger.info('Chose batch size %d: %.2f frames/s, peak memory %.0f '
+                        'MB of a %.0f MB budget.', self.batch_size,
+                        choice['fps'], choice['peak_memory_mb'], budget)
+        else:
+            self.batch_size = 1
+            logger.warning('No batch size fits in the %.0f MB memory budget. '
+                           'Using 1.', budget)
+        return self.batch_size
+
+    def _infer_batches(self, noise_vectors, class_vectors):
+        """Runs the GAN on each batch, apart from the frames in the cache.
+
+        Yields:
+            tuple (list, list, list, np.array): The frames of the batch, None
+                for the frames not in the cache, the indices and cache keys of
+                those frames, and the GAN output for them.
+        """
+        frame_cache = self.frame_cache
+        n_frames = len(noise_vectors)
+        with tqdm(total=n_frames) as progress_bar:
+            start = 0
+            while start < n_frames:
+                # read for each batch, as infer lowers it after running out of
+                # memory
+                stop = min(n_frames, start + self.batch_size)
+
+                # get batch
+                noise_batch = noise_vectors[start:stop]
+                class_batch = densify(class_vectors[start:stop])
+
+                # reuse frames rendered from the same vectors in an earlier
+                # run
+                if frame_cache:
+                    keys = [frame_cache.key(nv, cv)
+                            for nv, cv in zip(noise_batch, class_batch)]
+                    batch_frames = [frame_cache.get(k) for k in keys]
+                else:
+                    keys = None
+                    batch_frames = [None] * len(noise_batch)
+
+                missing = [j for j, im in enumerate(batch_frames)
+                           if im is None]
+                output = None
+                if missing:
+                    output = self.infer(noise_batch[missing],
+                                        class_batch[missing])
+
+                    # empty cuda cache
+                    self._empty_cache()
+
+                progress_bar.update(stop - start)
+                start = stop
+                yield batch_frames, missing, keys, output
+
+    def _postprocess(self, batch):
+        """Converts the GAN output of a batch to frames, and caches them.
+
+        Args:
+            batch (tuple): An item of _infer_batches.
+
+        Returns:
+            list [np.array]: The frames of the batch.
+        """
+        batch_frames, missing, keys, output = batch
+        if missing:
+            with span('to_uint8_frames') as sp:
+                images = to_uint8_frames(output)
+                sp.items = len(images)
+
+            for j, im in zip(missing, images):
+                batch_frames[j] = im
+                if self.frame_cache:
+                    self.frame_cache.put(keys[j], im)
+
+        return batch_frames
+
+    def iter_render(self, noise_vectors, class_vectors, encoder=None,
+                    queue_size=4):
+        """Renders a frame for every pair of noise and class vectors, as a
+        pipeline of threads: while the GAN runs on a batch, the output of the
+        previous batches is converted to frames and, with an encoder, written
+        to the video. The rendering then takes about as long as the GAN.
+
+        Args:
+            noise_vectors (np.array): The noise vectors to render.
+            class_vectors (np.array or scipy.sparse matrix): The class
+                vectors to render.
+            encoder (VideoEncoder, optional): Where to write the frames.
+                Defaults to None.
+            queue_size (int, optional): The number of batches waiting between
+                two stages. Defaults to 4.
+
+        Yields:
+            list [np.array]: The uint8 frames of each batch.
+        """
+        if self.batch_size == 'auto':
+            self.tune(noise_vectors, class_vectors)
+
+        stages = [self._postprocess]
+        if encoder is not None:
+            stages.append(functools.partial(_encode, encoder))
+
+        if self.progress:
+            self.progress.start('render', len(noise_vectors))
+
+        for batch_frames in pipeline(
+                self._infer_batches(noise_vectors, class_vectors), *stages,
+                queue_size=queue_size):
+            if self.progress:
+                self.progress.update(len(batch_frames))
+            yield batch_frames
+
+        if self.frame_cache:
+            logger.info('Reused %d cached frames, rendered %d.',
+                        self.frame_cache.hits, self.frame_cache.misses)
+
+    @traced('FrameRenderer.render')
+    def render(self, noise_vectors, class_vectors):
+        """Renders a frame for every pair of noise and class vectors.
+
+        Args:
+            noise_vectors (np.array): The noise vectors to render.
+            class_vectors (np.array or scipy.sparse matrix): The class
+                vectors to render.
+
+        Returns:
+            list [np.array]: One uint8 frame per pair of vectors.
+        """
+        frames = []
+        for batch_frames in self.iter_render(noise_vectors, class_vectors):
+            frames.extend(batch_frames)
+        return frames
+
+    @traced('FrameRenderer.render_to')
+    def render_to(self, noise_vectors, class_vectors, encoder):
+        """Renders a frame for every pair of noise and class vectors and
+        writes them to a video, without keeping them in memory.
+
+        Args:
+            noise_vectors (np.array): The noise vectors to render.
+            class_vectors (np.array or scipy.sparse matrix): The class
+                vectors to render.
+            encoder (VideoEncoder): Where to write the frames. It is not
+                closed.
+
+        Returns:
+            int: The number of frames written.
+        """
+        n_frames = 0
+        for batch_frames in self.iter_render(noise_vectors, class_vectors,
+                                             encoder):
+            n_frames += len(batch_frames)
+        return n_frames
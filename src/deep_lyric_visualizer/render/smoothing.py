@@ -0,0 +1,178 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from scipy import sparse
+from scipy.signal import lfilter, lfilter_zi, savgol_filter
+
+from deep_lyric_visualizer.render.sparse_vectors import compact, expand
+
+
+class ClassVectorSmoother(ABC):
+
+    def __init__(self, smooth_factor):
+        """An abstract class, used as a schematic for smoothing the class
+        vectors over time so that the frames do not change too abruptly.
+        Every smoother returns exactly one vector for each input vector.
+
+        Args:
+            smooth_factor (int): The number of frames to smooth over.
+        """
+        self.smooth_factor = max(int(smooth_factor), 1)
+
+    @abstractmethod
+    def smooth_array(self, class_vectors):
+        """An abstract method -- this method should describe how the class
+        vectors are smoothed.
+
+        Args:
+            class_vectors (np.array): A 2D array, one class vector per frame.
+        """
+        pass
+
+    def smooth(self, class_vectors):
+        """Smooths the class vectors.
+
+        Sparse class vectors are smoothed over the classes that are used
+        only, and are returned as a sparse matrix.
+
+        Args:
+            class_vectors (list [np.array] or scipy.sparse matrix): The class
+                vectors, one per frame.
+
+        Returns:
+            np.array: A 2D float32 array with the smoothed class vectors,
+                one per frame.
+        """
+        if sparse.issparse(class_vectors):
+            used, compacted = compact(class_vectors)
+            return expand(used, self.smooth(compacted),
+                          class_vectors.shape[1])
+
+        # the GAN takes float32 input, so there is no use in smoothing at a
+        # higher precision
+        class_vectors = np.asarray(class_vectors, dtype=np.float32)
+        if np.isnan(class_vectors).any():
+            class_vectors = np.nan_to_num(class_vectors)
+
+        if self.smooth_factor == 1 or len(class_vectors) < 2:
+            return class_vectors
+        return self.smooth_array(class_vectors)
+
+
+class LinearSmoother(ClassVectorSmoother):
+
+    def smooth_array(self, class_vectors):
+        """Averages the class vectors in chunks of smooth_factor frames, then
+        linearly interpolates from the mean of each chunk to the mean of the
+        next one. The last (possibly partial) chunk holds its own mean.
+
+        Args:
+            class_vectors (np.array): A 2D array, one class vector per frame.
+
+        Returns:
+            np.array: The smoothed class vectors.
+        """
+        n, dim = class_vectors.shape
+        sf = self.smooth_factor
+        n_full = n - n % sf
+
+        means = class_vectors[:n_full].reshape(-1, sf, dim).mean(axis=1)
+        if n_full < n:
+            tail = class_vectors[n_full:].mean(axis=0, keepdims=True)
+            means = np.concatenate([means, tail])
+
+        # each chunk moves from its own mean towards the next chunk's mean
+        steps = np.diff(means, axis=0, append=means[-1:])
+        t = (np.arange(sf, dtype=np.float32) / (sf - 1))[:, np.newaxis]
+
+        smoothed = np.empty((len(means), sf, dim), dtype=np.float32)
+        np.multiply(steps[:, np.newaxis, :], t, out=smoothed)
+        smoothed += means[:, np.newaxis, :]
+
+        return smoothed.reshape(-1, dim)[:n]
+
+
+class EMASmoother(ClassVectorSmoother):
+
+    def smooth_array(self, class_vectors):
+        """Smooths the class vectors with an exponential moving average,
+        with the same center of mass as a smooth_factor frame window.
+
+        Args:
+            class_vectors (np.array): A 2D array, one class vector per frame.
+
+        Returns:
+            np.array: The smoothed class vectors.
+        """
+        alpha = 2 / (self.smooth_factor + 1)
+        b, a = [alpha], [1, alpha - 1]
+
+        # start from the first vector rather than from zero
+        zi = lfilter_zi(b, a)[:, np.newaxis] * class_vectors[0]
+        smoothed, _ = lfilter(b, a, class_vectors, axis=0, zi=zi)
+        return smoothed.astype(np.float32)
+
+
+class SavgolSmoother(ClassVectorSmoother):
+
+    def __init__(self, smooth_factor, polyorder=2):
+        """Smooths the class vectors with a Savitzky-Golay filter, which keeps
+        peaks sharper than averaging does.
+
+        Args:
+            smooth_factor (int): The number of frames on either side of each
+                frame to fit the polynomial over.
+            polyorder (int, optional): The order of the polynomial.
+                Defaults to 2.
+        """
+        super().__init__(smooth_factor)
+        self.polyorder = polyorder
+
+    def smooth_array(self, class_vectors):
+        """Smooths the class vectors with a Savitzky-Golay filter. Negative
+        values introduced by the fit are set to zero.
+
+        Args:
+            class_vectors (np.array): A 2D array, one class vector per frame.
+
+        Returns:
+            np.array: The smoothed class vectors.
+        """
+        n = len(class_vectors)
+        window = min(2 * self.smooth_factor + 1, n if n % 2 else n - 1)
+        if window <= self.polyorder:
+            return class_vectors
+
+        smoothed = savgol_filter(class_vectors, window, self.polyorder,
+                                 axis=0, mode='interp')
+        return smoothed.clip(min=0)
+
+
+def smooth(class_vectors, smooth_factor, method='linear'):
+    """Smooths the class vectors with the chosen method.
+
+    Args:
+        class_vectors (list [np.array] or scipy.sparse matrix): The class
+            vectors, one per frame.
+        smooth_factor (int): The number of frames to smooth over.
+        method (str, optional): One of {'linear', 'ema', 'savgol'}.
+            Defaults to 'linear', which interpolates between the means of
+            chunks of smooth_factor frames.
+
+    Raises:
+        ValueError: Raised when an unknown method is passed.
+
+    Returns:
+        np.array: A 2D array with the smoothed class vectors, one per frame.
+            This is a sparse matrix if the class vectors were sparse.
+    """
+    if method == 'linear':
+        smoother = LinearSmoother(smooth_factor)
+    elif method == 'ema':
+        smoother = EMASmoother(smooth_factor)
+    elif method == 'savgol':
+        smoother = SavgolSmoother(smooth_factor)
+    else:
+        raise ValueError(f'Unknown smoothing method {method}.')
+
+    return smoother.smooth(class_vectors)
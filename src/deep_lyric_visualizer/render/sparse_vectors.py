@@ -0,0 +1,137 @@
+import logging
+import os
+
+import numpy as np
+from scipy import sparse
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+N_CLASSES = 1000
+
+
+def from_pairs(indices, weights, n_classes=N_CLASSES):
+    """Builds the sparse class vectors from (indices, weights) pairs.
+
+    Args:
+        indices (list [np.array]): The non-zero class ids, one array per
+            frame.
+        weights (list [np.array]): The values for those class ids, one array
+            per frame.
+        n_classes (int, optional): The length of a dense class vector.
+            Defaults to 1000, the number of ImageNet classes.
+
+    Returns:
+        scipy.sparse.csr_matrix: A float32 matrix with one row per frame.
+    """
+    indptr = np.zeros(len(indices) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(idx) for idx in indices])
+
+    if len(indices):
+        flat_indices = np.concatenate(indices).astype(np.int32)
+        flat_weights = np.concatenate(weights).astype(np.float32)
+    else:
+        flat_indices = np.array([], dtype=np.int32)
+        flat_weights = np.array([], dtype=np.float32)
+
+    return sparse.csr_matrix((flat_weights, flat_indices, indptr),
+                             shape=(len(indices), n_classes))
+
+
+def to_sparse(class_vectors):
+    """Converts class vectors to the sparse representation.
+
+    Args:
+        class_vectors (np.array or scipy.sparse matrix): The class vectors,
+            one per frame.
+
+    Returns:
+        scipy.sparse.csr_matrix: A float32 matrix with one row per frame.
+    """
+    if sparse.issparse(class_vectors):
+        return sparse.csr_matrix(class_vectors, dtype=np.float32)
+    return sparse.csr_matrix(np.asarray(class_vectors, dtype=np.float32))
+
+
+def densify(class_vectors):
+    """Converts (a batch of) class vectors to a dense float32 array, which is
+    what the GAN takes as input.
+
+    Args:
+        class_vectors (np.array or scipy.sparse matrix): The class vectors.
+
+    Returns:
+        np.array: A dense 2D float32 array.
+    """
+    if sparse.issparse(class_vectors):
+        return class_vectors.toarray().astype(np.float32, copy=False)
+    return np.asarray(class_vectors, dtype=np.float32)
+
+
+def compact(class_vectors):
+    """Keeps only the classes that are used at some point. A song usually
+    only uses a few dozen of the 1000 classes, so this dense array is small
+    while still giving the same distances and angles between frames.
+
+    Args:
+        class_vectors (np.array or scipy.sparse matrix): The class vectors.
+
+    Returns:
+        tuple (np.array, np.array): The used class ids, and a dense array
+            with one row per frame and one column per used class id.
+    """
+    class_vectors = to_sparse(class_vectors)
+    used = np.unique(class_vectors.indices)
+    return used, class_vectors[:, used].toarray()
+
+
+def expand(used, compacted, n_classes=N_CLASSES):
+    """The inverse of compact.
+
+    Args:
+        used (np.array): The used class ids.
+        compacted (np.array): A dense array with one column per used class id.
+        n_classes (int, optional): The length of a dense class vector.
+            Defaults to 1000.
+
+    Returns:
+        scipy.sparse.csr_matrix: A float32 matrix with one row per frame.
+    """
+    coo = sparse.coo_matrix(np.asarray(compacted, dtype=np.float32))
+    return sparse.csr_matrix((coo.data, (coo.row, used[coo.col])),
+                             shape=(compacted.shape[0], n_classes))
+
+
+def save_class_vectors(path, class_vectors):
+    """Saves the class vectors in the compressed sparse format.
+
+    Args:
+        path (str): Where to save the vectors (a .npz file).
+        class_vectors (np.array or scipy.sparse matrix): The class vectors.
+    """
+    sparse.save_npz(path, to_sparse(class_vectors), compressed=True)
+    logger.debug('Saved class vectors to %s', path)
+
+
+def load_class_vectors(path):
+    """Loads class vectors saved by save_class_vectors. If there is no .npz
+    file, but there is a dense .npy file with the same name (as saved by
+    older versions), that is loaded instead.
+
+    Args:
+        path (str): The location of the .npz file.
+
+    Returns:
+        scipy.sparse.csr_matrix: A float32 matrix with one row per frame.
+    """
+    if os.path.exists(path):
+        return to_sparse(sparse.load_npz(path))
+
+    legacy = os.path.splitext(path)[0] + '.npy'
+    if os.path.exists(legacy):
+        logger.info('Loading dense class vectors from %s', legacy)
+        return to_sparse(np.load(legacy))
+
+    raise FileNotFoundError(f'No class vectors saved at {path}')
@@ -0,0 +1,323 @@
+import logging
+
+import numpy as np
+from scipy import sparse
+from tqdm import tqdm
+
+from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.instrumentation import traced
+from deep_lyric_visualizer.render.sparse_vectors import from_pairs
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+NOISE_DIM = 128
+N_CLASSES = 1000
+
+
+class TrajectoryGenerator:
+
+    def __init__(self, frame_length=512, pitch_sensitivity=220,
+                 tempo_sensitivity=0.25, depth=1, num_classes=12,
+                 sort_classes_by_power=0, jitter=0.5, truncation=1,
+                 seed=None):
+        """Generates the noise and class vectors for each frame from the
+        audio features and the lyric topics. The arguments are the same as
+        the ones of visualize.py.
+
+        Args:
+            frame_length (int, optional): The number of audio samples per
+                frame. Defaults to 512.
+            pitch_sensitivity (int, optional): How quickly the class vectors
+                follow the pitches (between 1 and 299). Defaults to 220.
+            tempo_sensitivity (float, optional): How quickly the noise vectors
+                follow the power of the audio. Defaults to 0.25.
+            depth (float, optional): The maximum value of the class vectors.
+                Defaults to 1.
+            num_classes (int, optional): The number of classes per frame.
+                Defaults to 12.
+            sort_classes_by_power (int, optional): If 1, the classes are
+                assigned to pitches in order of power. Defaults to 0.
+            jitter (float, optional): How much to lower the sensitivity of
+                about half of the noise units at a time. Defaults to 0.5.
+            truncation (float, optional): The truncation of the noise vectors.
+                Defaults to 1.
+            seed (int, optional): The seed of the first noise vector and the
+                jitters. Generating with the same seed and inputs gives the
+                same vectors. Defaults to None, different vectors each time.
+        """
+        self.frame_length = frame_length
+        self.pitch_sensitivity = (300-pitch_sensitivity) * 512 / frame_length
+        self.tempo_sensitivity = tempo_sensitivity * frame_length / 512
+        self.depth = depth
+        self.num_classes = num_classes
+        self.sort_classes_by_power = sort_classes_by_power
+        self.jitter = jitter
+        self.truncation = truncation
+        self.seed = seed
+
+    def new_jitters(self, rng=np.random):
+        """Returns new jitters, setting about half of the noise vector units
+        to a lower sensitivity.
+
+        Args:
+            rng (np.random.RandomState, optional): The random generator.
+                Defaults to the global one.
+
+        Returns:
+            np.array: The multiplier for each noise unit.
+        """
+        return np.where(rng.uniform(0, 1, NOISE_DIM) < 0.5, 1.,
+                        1 - self.jitter)
+
+    def new_update_dir(self, nv2, update_dir):
+        """Reverses the direction of the noise units that have moved too far.
+
+        Args:
+            nv2 (np.array): The current noise vector.
+            update_dir (np.array): The current direction of each noise unit.
+
+        Returns:
+            np.array: The updated directions.
+        """
+        limit = 2*self.truncation - self.tempo_sensitivity
+        too_high = nv2 >= limit
+        update_dir[too_high] = -1
+        update_dir[~too_high & (nv2 < -limit)] = 1
+        return update_dir
+
+    def normalize_cv(self, cv2):
+        """Normalizes a class vector between 0 and 1. With fewer than 6
+        classes, only the num_classes largest values are kept and the maximum
+        is set to 1.
+
+        Args:
+            cv2 (np.array): A class vector.
+
+        Returns:
+            np.array: The normalized class vector.
+        """
+        if self.num_classes < 6:
+            cv2[cv2 < np.sort(cv2)[-self.num_classes]] = 0
+            return cv2 / cv2.max()
+
+        nonzero = np.nan_to_num(cv2)
+        nonzero = nonzero[nonzero != 0]
+        min_class_val = nonzero.min() if len(nonzero) else 0
+
+        cv2[cv2 == 0] = min_class_val
+
+        cv2 = (cv2-min_class_val)/np.ptp(cv2)
+
+        return cv2
+
+    def initial_vectors(self, features, classes, rng=np.random):
+        """Creates the class and noise vectors of the first frame.
+
+        Args:
+            features (AudioFeatures): The features of the song.
+            classes (list [int]): The classes to start with.
+            rng (np.random.RandomState, optional): The random generator.
+                Defaults to the global one.
+
+        Returns:
+            tuple (np.array, np.array): The first class vector and the first
+                noise vector.
+        """
+        chroma, chromasort = features.chroma, features.chromasort
+
+        cv1 = np.zeros(N_CLASSES)
+        first_sound = np.min([np.where(chrow > 0)[0][0] for chrow in chroma])
+        for pi, p in enumerate(chromasort[:self.num_classes]):
+
+            # TODO: Create logic for handling words
+            if self.num_classes < 12:
+                cv1[classes[pi]] = chroma[p][first_sound]
+            else:
+                cv1[classes[p]] = chroma[p][first_sound]
+
+        from scipy.stats import truncnorm
+
+        nv1 = self.truncation * truncnorm.rvs(
+            -2, 2, size=NOISE_DIM, random_state=rng).astype(np.float32)
+
+        return cv1, nv1
+
+    @traced('TrajectoryGenerator.generate')
+    def generate(self, features, class_list, classes, universal, frame_time):
+        """Generates the noise and class vectors for every frame.
+
+        Args:
+            features (AudioFeatures): The features of the song.
+            class_list (np.array): The topic ids for each frame, as returned
+                by Lyrics.frame_topic_index.
+            classes (list [int]): The classes of the first frame.
+            universal (list [int]): The most common topics in the song, used
+                when no other classes are known.
+            frame_time (float): The length of a frame in seconds.
+
+        Returns:
+            tuple (np.array, scipy.sparse.csr_matrix, list): The noise
+                vectors, the (unsmoothed) class vectors and the classes used
+                for each frame. There is one more vector than there are
+                frames, as the first vector comes before the first frame.
+        """
+        noise_vectors, class_vectors, frame_classes = [], [], []
+        for noise_chunk, class_chunk, classes_chunk in self.iter_generate(
+                features, class_list, classes, universal, frame_time):
+            noise_vectors.append(noise_chunk)
+            class_vectors.append(class_chunk)
+            frame_classes.extend(classes_chunk)
+
+        return (np.concatenate(noise_vectors),
+                sparse.vstack(class_vectors, format='csr'), frame_classes)
+
+    def iter_generate(self, features, class_list, classes, universal,
+                      frame_time, chunk_frames=4096):
+        """Generates the noise and class vectors a chunk of frames at a time,
+        so that the stages after this one can start on the first frames of a
+        long song, and do not need to hold the vectors of the whole song.
+
+        Args:
+            features (AudioFeatures): The features of the song.
+            class_list (np.array): The topic ids for each frame, as returned
+                by Lyrics.frame_topic_index.
+            classes (list [int]): The classes of the first frame.
+            universal (list [int]): The most common topics in the song, used
+                when no other classes are known.
+            frame_time (float): The length of a frame in seconds.
+            chunk_frames (int, optional): The number of vectors per chunk.
+                Defaults to 4096.
+
+        Yields:
+            tuple (np.array, scipy.sparse.csr_matrix, list): The noise
+                vectors, the (unsmoothed) class vectors and the classes used
+                for each frame of a chunk. The first chunk has one more vector
+                than frames, as the first vector comes before the first frame.
+        """
+        specm, gradm = features.specm, features.gradm
+        chroma, chromasort = features.chroma, features.chromasort
+        pitch_sensitivity = self.pitch_sensitivity
+        tempo_sensitivity = self.tempo_sensitivity
+
+        if self.sort_classes_by_power == 1:
+            classes = [classes[s]
+                       for s in np.argsort(chromasort[:self.num_classes])]
+
+        # every generation starts from the seed
+        rng = np.random.RandomState(self.seed)
+        cv1, nv1 = self.initial_vectors(features, classes, rng)
+
+        # class vectors are kept as (indices, weights) pairs, as only a few
+        # classes are non-zero in each frame
+        class_indices = [np.flatnonzero(cv1)]
+        class_weights = [cv1[class_indices[0]]]
+        noise_vectors = [nv1]
+        frame_classes = []
+
+        # initialize previous vectors (used to track the previous frame)
+        cvlast = cv1
+        nvlast = nv1
+
+        # initialize the direction of noise vector unit updates
+        update_dir = np.where(nv1 < 0, 1., -1.)
+
+        # initialize noise unit update
+        update_last = np.zeros(NOISE_DIM)
+
+        last_classes = universal
+
+        frames_delay_change_classes_limit = 0.25 / frame_time
+        frame_delay = 0
+        for i in tqdm(range(len(gradm))):
+
+            if frame_delay < frames_delay_change_classes_limit:
+                classes = last_classes
+            else:
+                classes = class_list[i].tolist()
+
+            if self.sort_classes_by_power == 1:
+                classes = [classes[s]
+                           for s in np.argsort(chromasort[:len(classes)])]
+
+            # update jitter vector every 200 frames by setting ~half of noise
+            # vector units to lower sensitivity
+            if i % 200 == 0:
+                jitters = self.new_jitters(rng)
+
+            # set noise vector update based on direction, sensitivity, jitter,
+            # and combination of overall power and gradient of power
+            update = tempo_sensitivity * \
+                (gradm[i]+specm[i]) * update_dir * jitters
+
+            # smooth the update with the previous update (to avoid overly
+            # sharp frame transitions)
+            update = (update+update_last*3)/4
+            update_last = update
+
+            # update noise vector
+            nv2 = nvlast+update
+            noise_vectors.append(nv2)
+            nvlast = nv2
+
+            # update the direction of noise units
+            update_dir = self.new_update_dir(nv2, update_dir)
+
+            # generate new class vector
+            cv2 = np.zeros(N_CLASSES)
+
+            if frame_delay < frames_delay_change_classes_limit:
+                classes = last_classes if last_classes else universal
+                for j in range(len(classes)):
+                    try:
+                        lst = cvlast[cvlast > 0][j]
+                    except IndexError:
+                        lst = 0
+                    cv2[classes[j]] = (
+                        (lst + chroma[chromasort[j]][i] / pitch_sensitivity)
+                        / (1 + 1 / pitch_sensitivity))
+
+                frame_delay += 1
+
+            else:
+                frame_delay = 0
+                for j in range(len(classes)):
+                    try:
+                        lst = cvlast[last_classes[j]]
+                    except IndexError:
+                        lst = 0
+                    cv2[classes[j]] = (
+                        (lst + chroma[chromasort[j]][i] / pitch_sensitivity)
+                        / (1 + 1 / pitch_sensitivity))
+
+            # if more than 6 classes, normalize new class vector between 0 and
+            # 1, else simply set max class val to 1
+            cv2 = self.normalize_cv(cv2)
+
+            # adjust depth
+            cv2 = cv2*self.depth
+
+            frame_classes.append(classes)
+
+            # this prevents rare bugs where all classes are the same value
+            if np.std(cv2[np.where(cv2 != 0)]) < 0.0000001:
+                cv2[classes[0]] = cv2[classes[0]]+0.01
+
+            nonzero = np.flatnonzero(cv2)
+            class_indices.append(nonzero)
+            class_weights.append(cv2[nonzero])
+
+            cvlast = cv2
+            last_classes = classes
+
+            if len(noise_vectors) >= chunk_frames:
+                yield (np.array(noise_vectors),
+                       from_pairs(class_indices, class_weights), frame_classes)
+                noise_vectors, class_indices, class_weights = [], [], []
+                frame_classes = []
+
+        logger.debug('Generated vectors for %d frames.', len(gradm))
+
+        if noise_vectors:
+            yield (np.array(noise_vectors),
+                   from_pairs(class_indices, class_weights), frame_classes)
@@ -0,0 +1,141 @@
+import logging
+
+from deep_lyric_visualizer.helpers import setup_logger
+from deep_lyric_visualizer.instrumentation import span
+from deep_lyric_visualizer.render.audio_features import AudioFeatures
+from deep_lyric_visualizer.render.fingerprint import file_sha256
+from deep_lyric_visualizer.render.smoothing import smooth
+from deep_lyric_visualizer.render.trajectory import TrajectoryGenerator
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+def lyric_topics(lyrics, num_classes=12):
+    """Loads the topics of the lyrics, assigning them if they were not
+    assigned before or cannot be read.
+
+    Args:
+        lyrics (Lyrics): The lyrics of the song.
+        num_classes (int, optional): The number of topics. Defaults to 12.
+
+    Returns:
+        tuple (pd.DataFrame, list [int]): The lyric of each line with its
+            topic, and the most common topics, which are the classes used
+            for the whole song.
+    """
+    try:
+        lyrics.load()
+    except FileNotFoundError:
+        lyrics.assign_topics(n=num_classes)
+
+    try:
+        lyric_df = lyrics.generate_lyric_df()
+    except Exception:
+        logger.warning('Could not use the saved topics of %s. Assigning '
+                       'them again.', lyrics.songname)
+        lyrics.assign_topics(n=num_classes)
+        lyric_df = lyrics.generate_lyric_df()
+
+    universal = lyric_df['topic_id'].value_counts()[
+        0:num_classes].index.tolist()
+    return lyric_df, universal
+
+
+def song_vectors(features, lyrics, classes, universal, frame_time,
+                 frame_length=512, pitch_sensitivity=220,
+                 tempo_sensitivity=0.25, depth=1, num_classes=12,
+                 sort_classes_by_power=0, jitter=0.5, truncation=1,
+                 smooth_factor=20, smooth_method='linear', seed=None):
+    """Computes the noise and class vectors of each frame from the audio
+    features and the lyric topics, and smooths the class vectors. This is
+    shared by visualize.py, the preview and the batch renderer, so that they
+    render the same vectors from the same parameters.
+
+    Args:
+        features (AudioFeatures): The features of the song.
+        lyrics (Lyrics): The lyrics of the song, with their topics.
+        classes (list [int]): The classes of the song.
+        universal (list [int]): The most common topics, from lyric_topics.
+        frame_time (float): The number of seconds per frame.
+        smooth_factor (int, optional): The number of frames the class vectors
+            are smoothed over, at a frame length of 512. Defaults to 20.
+        smooth_method (str, optional): How the class vectors are smoothed,
+            one of 'linear', 'ema' or 'savgol'. Defaults to 'linear'.
+
+        The other arguments are the ones of TrajectoryGenerator.
+
+    Returns:
+        tuple (np.array, scipy.sparse matrix, list): The noise vectors, the
+            class vectors and the classes of each frame.
+    """
+    # topic ids for each frame, from the lyrics sung at that time
+    class_list = lyrics.frame_topic_index(1 / frame_time, len(features),
+                                          universal)
+
+    trajectory = TrajectoryGenerator(frame_length, pitch_sensitivity,
+                                     tempo_sensitivity, depth, num_classes,
+                                     sort_classes_by_power, jitter, truncation,
+                                     seed)
+    noise_vectors, class_vectors, class_frames = trajectory.generate(
+        features, class_list, classes, universal, frame_time)
+
+    # interpolate between class vectors of bin size [smooth_factor] to
+    # smooth frames
+    if smooth_factor > 1:
+        smooth_factor = int(smooth_factor * 512 / frame_length)
+    with span('smooth') as sp:
+        class_vectors = smooth(class_vectors, smooth_factor, smooth_method)
+        sp.items = class_vectors.shape[0]
+
+    return noise_vectors, class_vectors, class_frames
+
+
+def compute_vectors(song, lyrics, frame_length=512, pitch_sensitivity=220,
+                    tempo_sensitivity=0.25, depth=1, num_classes=12,
+                    sort_classes_by_power=0, jitter=0.5, truncation=1,
+                    smooth_factor=20, smooth_method='linear', duration=None,
+                    seed=None, feature_cache=None, audio_sha256=None):
+    """Computes the noise and class vectors of a song from its audio file,
+    with the classes chosen from the topics of its lyrics.
+
+    Args:
+        song (str): The path of the audio file.
+        lyrics (Lyrics): The lyrics of the song.
+        duration (float, optional): The number of seconds to render.
+            Defaults to None, the whole song.
+        feature_cache (str, optional): A directory to cache the audio features
+            in, by the hash of the song. Defaults to None, no cache.
+        audio_sha256 (str, optional): The hash of the song, if it is known.
+            Defaults to None, which hashes the file when there is a cache.
+
+        The other arguments are the ones of song_vectors.
+
+    Returns:
+        tuple (np.array, scipy.sparse matrix, float): The noise vectors, the
+            class vectors and the number of frames per second.
+    """
+    import librosa
+
+    def compute_features():
+        y, sr = librosa.load(song, duration=duration)
+        return AudioFeatures.from_audio(y, sr, frame_length)
+
+    if feature_cache:
+        features = AudioFeatures.cached(
+            feature_cache, audio_sha256 or file_sha256(song),
+            compute_features, frame_length=frame_length, stream_audio=0,
+            duration=duration, onsets=0)
+    else:
+        features = compute_features()
+
+    _, universal = lyric_topics(lyrics, num_classes)
+    frame_time = features.duration / len(features)
+    noise_vectors, class_vectors, _ = song_vectors(
+        features, lyrics, universal, universal, frame_time, frame_length,
+        pitch_sensitivity, tempo_sensitivity, depth, num_classes,
+        sort_classes_by_power, jitter, truncation, smooth_factor,
+        smooth_method, seed)
+
+    n_frames = len(features)
+    return noise_vectors[:n_frames], class_vectors[:n_frames], 1 / frame_time
@@ -0,0 +1,200 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+class VideoStore:
+
+    def __init__(self, store_dir, max_bytes=5 * 1024 ** 3):
+        """A store of finished videos on local disk, named by the fingerprint
+        of their render, so that a render with the same inputs can be served
+        without running again. When the store grows above max_bytes, the
+        least recently used videos are removed.
+
+        Args:
+            store_dir (str): The directory to store the videos in. It is
+                created if it does not exist.
+            max_bytes (int, optional): The maximum size of the store on disk.
+                Defaults to 5GB.
+        """
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.store_dir, 'tmp'), exist_ok=True)
+        self._index = OrderedDict()
+        self.size = 0
+        self._scan()
+
+    def _scan(self):
+        """Builds the in-memory LRU index from the videos already on disk,
+        oldest (least recently used) first.
+        """
+        entries = []
+        for entry in os.scandir(self.store_dir):
+            if entry.is_file() and entry.name.endswith('.mp4'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name[:-4],
+                                stat.st_size))
+
+        for _, fingerprint, size in sorted(entries):
+            self._index[fingerprint] = size
+            self.size += size
+
+        logger.debug('Found %d videos (%d bytes) in %s', len(self._index),
+                     self.size, self.store_dir)
+
+    def path(self, fingerprint):
+        """Returns the location of a video in the store.
+
+        Args:
+            fingerprint (str): The fingerprint of the render.
+
+        Returns:
+            str: The path of the video.
+        """
+        return os.path.join(self.store_dir, fingerprint + '.mp4')
+
+    def temporary_path(self, fingerprint):
+        """Returns where to render a video before adding it with put, on the
+        same file system as the store so that it is moved, not copied.
+
+        Args:
+            fingerprint (str): The fingerprint of the render.
+
+        Returns:
+            str: The path to render to.
+        """
+        return os.path.join(self.store_dir, 'tmp',
+                            f'{fingerprint}.{threading.get_ident()}.mp4')
+
+    def get(self, fingerprint):
+        """Looks up a video.
+
+        Args:
+            fingerprint (str): The fingerprint of the render.
+
+        Returns:
+            str: The path of the video, or None if it is not in the store.
+        """
+        loc = self.path(fingerprint)
+        with self._lock:
+            if fingerprint not in self._index or not os.path.exists(loc):
+                self.misses += 1
+                return None
+            self._index.move_to_end(fingerprint)
+            self.hits += 1
+        os.utime(loc)
+        return loc
+
+    def put(self, fingerprint, video_file):
+        """Moves a finished video into the store, with its .json sidecar if
+        there is one, evicting old videos if necessary.
+
+        Args:
+            fingerprint (str): The fingerprint of the render.
+            video_file (str): The video. It is moved, not copied.
+
+        Returns:
+            str: The path of the video in the store.
+        """
+        loc = self.path(fingerprint)
+        os.replace(video_file, loc)
+        if os.path.exists(video_file + '.json'):
+            os.replace(video_file + '.json', loc + '.json')
+
+        size = os.path.getsize(loc)
+        with self._lock:
+            self.size += size - self._index.pop(fingerprint, 0)
+            self._index[fingerprint] = size
+            self._evict()
+        return loc
+
+    def _remove(self, fingerprint):
+        self.size -= self._index.pop(fingerprint, 0)
+        for loc in (self.path(fingerprint), self.path(fingerprint) + '.json'):
+            try:
+                os.remove(loc)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        """Removes the least recently used videos until the store fits in
+        max_bytes, keeping at least the newest video.
+        """
+        n_evicted = 0
+        while self.size > self.max_bytes and len(self._index) > 1:
+            self._remove(next(iter(self._index)))
+            n_evicted += 1
+
+        if n_evicted:
+            logger.debug('Evicted %d videos from %s', n_evicted,
+                         self.store_dir)
+
+
+class RenderJobs:
+
+    def __init__(self, max_workers=1):
+        """Runs renders in background threads, one job per fingerprint:
+        submitting a fingerprint that is already rendering returns the
+        running job instead of starting another.
+
+        Args:
+            max_workers (int, optional): The number of renders running at a
+                time. Defaults to 1, as a render uses the whole machine.
+        """
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fingerprint, fn, *args, **kwargs):
+        """Starts a render, unless one with the same fingerprint is running.
+
+        Args:
+            fingerprint (str): The fingerprint of the render.
+            fn (function): The function rendering the video.
+            *args, **kwargs: Its arguments.
+
+        Returns:
+            tuple (concurrent.futures.Future, bool): The job, and whether it
+                was started by this call.
+        """
+        with self._lock:
+            job = self._jobs.get(fingerprint)
+            if job is not None:
+                logger.info('Joining the running render %s.', fingerprint)
+                return job, False
+            job = self._executor.submit(fn, *args, **kwargs)
+            self._jobs[fingerprint] = job
+
+        job.add_done_callback(lambda done: self._finish(fingerprint, done))
+        return job, True
+
+    def _finish(self, fingerprint, job):
+        with self._lock:
+            if self._jobs.get(fingerprint) is job:
+                del self._jobs[fingerprint]
+        if job.exception() is not None:
+            logger.error('Render %s failed: %s', fingerprint,
+                         job.exception())
+
+    def get(self, fingerprint):
+        """Returns the running job of a fingerprint.
+
+        Args:
+            fingerprint (str): The fingerprint of the render.
+
+        Returns:
+            concurrent.futures.Future: The job, or None if it is not running.
+        """
+        with self._lock:
+            return self._jobs.get(fingerprint)
@@ -0,0 +1,54 @@
+import logging
+
+from deep_lyric_visualizer.helpers import setup_logger
+
+setup_logger()
+logger = logging.getLogger(__name__)
+
+
+class VideoEncoder:
+
+    def __init__(self, path, fps, audio_file=None, metadata=None):
+        """Writes frames to a video one at a time with ffmpeg, so that the
+        frames of a song are never all in memory. ffmpeg is started with the
+        size of the first frame.
+
+        Args:
+            path (str): The video file.
+            fps (float): The number of frames per second.
+            audio_file (str, optional): The audio of the video, cut to the
+                length of the video. Defaults to None, a silent video.
+            metadata (dict, optional): Tags of the video, such as comment.
+                Defaults to None.
+        """
+        self.path = path
+        self.fps = fps
+        self.audio_file = audio_file
+        self.metadata = metadata or {}
+        self.n_frames = 0
+        self.writer = None
+
+    def write(self, frame):
+        """Adds a frame to the video.
+
+        Args:
+            frame (np.array): A uint8 image of shape (height, width, 3).
+        """
+        if self.writer is None:
+            from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+            params = ['-shortest']
+            for key, value in self.metadata.items():
+                params += ['-metadata', f'{key}={value}']
+            height, width = frame.shape[:2]
+            self.writer = FFMPEG_VideoWriter(
+                self.path, (width, height), self.fps, codec='libx264',
+                audiofile=self.audio_file, ffmpeg_params=params)
+        self.writer.write_frame(frame)
+        self.n_frames += 1
+
+    def close(self):
+        """Finishes the video."""
+        if self.writer is not None:
+            self.writer.close()
+            logger.info('Wrote %d frames to %s.', self.n_frames, self.path)
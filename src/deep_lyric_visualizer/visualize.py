@@ -4,20 +4,26 @@ import librosa
 import argparse
 import numpy as np
 import pandas as pd
-import moviepy.editor as mpy
-import random
-import torch
-from scipy.misc import toimage
-from tqdm import tqdm
-from pytorch_pretrained_biggan import (BigGAN, one_hot_from_names, truncated_noise_sample,
-                                       save_as_images, display_in_terminal)
 import os
 import yaml
-from moviepy.video.tools.subtitles import SubtitlesClip
-from moviepy.video.VideoClip import TextClip
-from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
 
 from srt import Subtitle
+
+from deep_lyric_visualizer import instrumentation
+from deep_lyric_visualizer.instrumentation import span
+from deep_lyric_visualizer.render.keyframes import (KeyframeSelector, latent_deltas,
+                                                    slerp_positions, blend_frames)
+from deep_lyric_visualizer.render.frame_cache import FrameCache
+from deep_lyric_visualizer.render.sparse_vectors import (compact, save_class_vectors,
+                                                         load_class_vectors)
+from deep_lyric_visualizer.render.audio_features import AudioFeatures
+from deep_lyric_visualizer.render.fingerprint import (
+    file_sha256, fingerprint_params, lrc_sha256, new_seed, render_fingerprint,
+    save_fingerprint)
+from deep_lyric_visualizer.render.progress import ProgressReporter
+from deep_lyric_visualizer.render.renderer import FrameRenderer, parse_batch_size
+from deep_lyric_visualizer.render.vectors import lyric_topics, song_vectors
+from deep_lyric_visualizer.render.video_encoder import VideoEncoder
 # get input arguments
 parser = argparse.ArgumentParser()
 parser.add_argument("--song", required=True)
@@ -33,19 +39,53 @@ parser.add_argument("--jitter", type=float, default=0.5)
 parser.add_argument("--frame_length", type=int, default=512)
 parser.add_argument("--truncation", type=float, default=1)
 parser.add_argument("--smooth_factor", type=int, default=20)
-parser.add_argument("--batch_size", type=int, default=30)
+parser.add_argument("--smooth_method", default='linear',
+                    choices=['linear', 'ema', 'savgol'])
+parser.add_argument("--batch_size", type=parse_batch_size, default=30)
+parser.add_argument("--memory_budget", type=float, default=None)
 parser.add_argument("--use_previous_classes", type=int, default=0)
 parser.add_argument("--use_previous_vectors", type=int, default=0)
 parser.add_argument("--output_file", default="output.mp4")
 parser.add_argument("--subtitles", default=1, type=int)
+parser.add_argument("--keyframes", type=int, default=0)
+parser.add_argument("--keyframe_threshold", type=float, default=2.5)
+parser.add_argument("--onset_threshold", type=float, default=0.5)
+parser.add_argument("--max_keyframe_gap", type=int, default=6)
+parser.add_argument("--frame_cache", default='')
+parser.add_argument("--frame_cache_size", type=float, default=10)
+parser.add_argument("--trace", default='')
+parser.add_argument("--stream_audio", type=int, default=0)
+parser.add_argument("--audio_jobs", type=int, default=1)
+parser.add_argument("--seed", type=int, default=None)
+parser.add_argument("--lyrics", default='')
+parser.add_argument("--feature_cache", default='')
+parser.add_argument("--progress", default='')
+parser.add_argument("--fingerprint", default='')
 args = parser.parse_args()
 
+# record the time spent in each stage, and write it as a Chrome trace
+if args.trace:
+    instrumentation.enable()
+
+# report the stage of the render, and the frames rendered, to a file which
+# the web app polls
+progress = ProgressReporter(args.progress) if args.progress else None
+
+
+def start_stage(stage, total=None):
+    if progress:
+        progress.start(stage, total)
 
-# read song
+
+# read song (or only stream it later, for long songs that do not fit in
+# memory)
 if args.song:
     song = args.song
     print('\nReading audio \n')
-    y, sr = librosa.load(song)
+    start_stage('load_audio')
+    if not args.stream_audio:
+        with span('load_audio'):
+            y, sr = librosa.load(song)
 else:
     raise ValueError(
         "you must enter an audio file name in the --song argument")
@@ -55,24 +95,12 @@ model_name = 'biggan-deep-' + args.resolution
 
 frame_length = args.frame_length
 
-# set pitch sensitivity
-pitch_sensitivity = (300-args.pitch_sensitivity) * 512 / frame_length
-
-# set tempo sensitivity
-tempo_sensitivity = args.tempo_sensitivity * frame_length / 512
-
-# set depth
-depth = args.depth
-
 # set number of classes
 num_classes = args.num_classes
 
 # set sort_classes_by_power
 sort_classes_by_power = args.sort_classes_by_power
 
-# set jitter
-jitter = args.jitter
-
 # set truncation
 truncation = args.truncation
 
@@ -91,6 +119,17 @@ outname = args.output_file
 # subtitles
 subtitles = args.subtitles
 
+# set keyframe mode (only render frames where the music or vectors change)
+keyframes = args.keyframes
+
+# set frame cache (reuse frames rendered from identical vectors)
+if args.frame_cache:
+    frame_cache = FrameCache(args.frame_cache, model_name, args.resolution,
+                             truncation,
+                             int(args.frame_cache_size * 1024 ** 3))
+else:
+    frame_cache = None
+
 # Import lyric information for classes
 
 sys.path.append('/home/seanammirati/dev/audio_visual_gen/')
@@ -98,76 +137,50 @@ if True:
     from lyrics.lyrics import Lyrics
 
 
-lyric_base = os.path.splitext(os.path.basename(song))[0]
+# the lyrics are named after the song, unless given (such as by the hash of
+# an uploaded .lrc)
+lyric_base = args.lyrics or os.path.splitext(os.path.basename(song))[0]
 lyrics = Lyrics(lyric_base)
-try:
-    lyrics.load()
-except FileNotFoundError:
-    lyrics.assign_topics(n=num_classes)
+lyric_df, universal = lyric_topics(lyrics, num_classes)
 
-try:
-    lyric_df = lyrics.generate_lyric_df()
-except:
-    lyrics.assign_topics(n=num_classes)
-    lyric_df = lyrics.generate_lyric_df()
+start_stage('audio_features')
+audio_sha256 = file_sha256(song)
 
-universal = lyric_df['topic_id'].value_counts()[0:num_classes].index.tolist()
 
+def compute_features():
+    if args.stream_audio:
+        return AudioFeatures.from_file(song, frame_length, args.duration,
+                                       onsets=args.keyframes == 1,
+                                       n_jobs=args.audio_jobs or None)
+    return AudioFeatures.from_audio(y, sr, frame_length,
+                                    n_jobs=args.audio_jobs or None)
 
-# set smooth factor
-if args.smooth_factor > 1:
-    smooth_factor = int(args.smooth_factor * 512 / frame_length)
+
+# reuse the features of the same audio, by its hash
+if args.feature_cache:
+    features = AudioFeatures.cached(
+        args.feature_cache, audio_sha256, compute_features,
+        frame_length=frame_length, stream_audio=args.stream_audio,
+        duration=args.duration if args.stream_audio else None,
+        onsets=int(args.stream_audio and args.keyframes == 1))
 else:
-    smooth_factor = args.smooth_factor
+    features = compute_features()
+gradm = features.gradm
 
 # set duration
 if args.duration:
     seconds = args.duration
-    frame_lim = int(np.floor(seconds*22050/frame_length/batch_size))
+    frame_lim = int(np.floor(seconds*22050/frame_length))
 else:
-    frame_lim = int(np.floor(len(y)/sr*22050/frame_length/batch_size))
-    seconds = librosa.core.get_duration(y, sr)
+    frame_lim = int(np.floor(features.duration*22050/frame_length))
+    seconds = features.duration
 
 
 # Load pre-trained model
-model = BigGAN.from_pretrained(model_name)
-
-# set device
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-
-
-########################################
-########################################
-########################################
-########################################
-########################################
-
-
-# create spectrogram
-spec = librosa.feature.melspectrogram(
-    y=y, sr=sr, n_mels=128, fmax=8000, hop_length=frame_length)
-
-
-# get mean power at each time point
-specm = np.mean(spec, axis=0)
-
-# compute power gradient across time points
-gradm = np.gradient(specm)
-
-# set max to 1
-gradm = gradm/np.max(gradm)
-
-# set negative gradient time points to zero
-gradm = gradm.clip(min=0)
-
-# normalize mean power between 0-1
-specm = (specm-np.min(specm))/np.ptp(specm)
-
-# create chromagram of pitches X time points
-chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=frame_length)
-
-# sort pitches by overall power
-chromasort = np.argsort(np.mean(chroma, axis=1))[::-1]
+start_stage('load_model')
+with span('load_model'):
+    from pytorch_pretrained_biggan import BigGAN
+    model = BigGAN.from_pretrained(model_name)
 
 
 ########################################
@@ -184,8 +197,8 @@ if args.classes:
             "The number of classes entered in the --class argument must equal 12 or [num_classes] if specified")
 
 elif args.use_previous_classes == 1:
-    cvs = np.load('class_vectors.npy')
-    classes = list(np.where(cvs[0] > 0)[0])
+    cvs = load_class_vectors('class_vectors.npz')
+    classes = list(np.where(cvs[0].toarray()[0] > 0)[0])
 
 else:  # select 12 random classes
     classes = universal
@@ -194,252 +207,47 @@ else:  # select 12 random classes
     # classes = cls1000[:12]
 
 
-if sort_classes_by_power == 1:
-
-    classes = [classes[s] for s in np.argsort(chromasort[:num_classes])]
-
-
-# initialize first class vector
-cv1 = np.zeros(1000)
-for pi, p in enumerate(chromasort[:num_classes]):
-
-    # TODO: Create logic for handling words
-    if num_classes < 12:
-        cv1[classes[pi]] = chroma[p][np.min(
-            [np.where(chrow > 0)[0][0] for chrow in chroma])]
-    else:
-        cv1[classes[p]] = chroma[p][np.min(
-            [np.where(chrow > 0)[0][0] for chrow in chroma])]
-
-
-# initialize first noise vector
-nv1 = truncated_noise_sample(truncation=truncation)[0]
-
-# initialize list of class and noise vectors
-class_vectors = [cv1]
-noise_vectors = [nv1]
-
-# initialize previous vectors (will be used to track the previous frame)
-cvlast = cv1
-nvlast = nv1
-
-
-# initialize the direction of noise vector unit updates
-update_dir = np.zeros(128)
-for ni, n in enumerate(nv1):
-    if n < 0:
-        update_dir[ni] = 1
-    else:
-        update_dir[ni] = -1
-
-
-# initialize noise unit update
-update_last = np.zeros(128)
-
-
-########################################
-########################################
-########################################
-########################################
-########################################
-
-
-# get new jitters
-def new_jitters(jitter):
-    jitters = np.zeros(128)
-    for j in range(128):
-        if random.uniform(0, 1) < 0.5:
-            jitters[j] = 1
-        else:
-            jitters[j] = 1-jitter
-    return jitters
-
-
-# get new update directions
-def new_update_dir(nv2, update_dir):
-    for ni, n in enumerate(nv2):
-        if n >= 2*truncation - tempo_sensitivity:
-            update_dir[ni] = -1
-
-        elif n < -2*truncation + tempo_sensitivity:
-            update_dir[ni] = 1
-    return update_dir
-
-
-# smooth class vectors
-def smooth(class_vectors, smooth_factor):
-
-    if smooth_factor == 1:
-        return class_vectors
-
-    class_vectors_terp = []
-    for c in range(int(np.floor(len(class_vectors)/smooth_factor)-1)):
-        ci = c*smooth_factor
-        cva = np.mean(class_vectors[int(ci):int(ci)+smooth_factor], axis=0)
-        cvb = np.mean(
-            np.nan_to_num(class_vectors[int(ci)+smooth_factor:int(ci)+smooth_factor*2]), axis=0)
-
-        for j in range(smooth_factor):
-            cvc = cva*(1-j/(smooth_factor-1)) + cvb*(j/(smooth_factor-1))
-            class_vectors_terp.append(cvc)
+# set seed (a random one is recorded, so that the render can be reproduced)
+seed = args.seed if args.seed is not None else new_seed()
 
-    return np.array(class_vectors_terp)
-
-
-# normalize class vector between 0-1
-def normalize_cv(cv2):
-
-    if num_classes < 6:
-        cv2[cv2 < np.sort(cv2)[-num_classes]] = 0
-        return cv2 / cv2.max()
-    try:
-        min_class_val = min(i for i in np.nan_to_num(cv2) if i != 0)
-    except ValueError:
-        min_class_val = 0
-
-    for ci, c in enumerate(cv2):
-        if c == 0:
-            cv2[ci] = min_class_val
-
-    cv2 = (cv2-min_class_val)/np.ptp(cv2)
-
-    return cv2
+# fingerprint everything that determines the video
+render_params = fingerprint_params(vars(args))
+render_params['classes'] = [int(c) for c in classes]
+if use_previous_vectors == 1:
+    render_params['previous_vectors'] = [
+        file_sha256('class_vectors.npz'), file_sha256('noise_vectors.npy')]
+fingerprint, fingerprint_inputs = render_fingerprint(
+    audio_sha256, lrc_sha256(lyrics.lrc), render_params, seed,
+    model_name)
+if args.fingerprint:
+    # record the key the caller stores the video by (the web app keys it
+    # before the lyric topics and classes are known), keeping the one
+    # computed here in the inputs
+    fingerprint_inputs['content_fingerprint'] = fingerprint
+    fingerprint = args.fingerprint
+print(f'\nRender fingerprint {fingerprint} (seed {seed}) \n')
 
 
 print('\nGenerating input vectors \n')
+start_stage('vectors')
 
 frame_time = seconds / len(gradm)
 
-
-def generate_classes(frame_time, total_values, lyric_df, universal):
-    df = pd.DataFrame()
-    df['frame_times'] = pd.to_timedelta(
-        [frame_time * j for j in range(len(total_values))], unit='s')
-
-    time_df = lyric_df.pivot(index='time', columns='topic', values='topic_id')
-    mrg = pd.merge_asof(df, time_df, left_on='frame_times', right_on='time')
-    mrg.fillna(pd.Series(universal), inplace=True)
-
-    return mrg.iloc[:, 1:]
-
-
-class_list = generate_classes(frame_time, gradm, lyric_df, universal)
-
-last_classes = universal
-
-class_frames = []
-
-frames_delay_change_classes_limit = 0.25 / frame_time
-frame_delay = 0
-used_classes = []
-for i in tqdm(range(len(gradm))):
-
-    if frame_delay < frames_delay_change_classes_limit:
-        classes = last_classes
-    else:
-
-        classes = class_list.iloc[i].astype(int).tolist()
-    # print progress
-    if sort_classes_by_power == 1:
-
-        classes = [classes[s]
-                   for s in np.argsort(chromasort[:len(classes)])]
-
-    # update jitter vector every 100 frames by setting ~half of noise vector units to lower sensitivity
-    if i % 200 == 0:
-        jitters = new_jitters(jitter)
-
-    # get last noise vector
-    nv1 = nvlast
-
-    # set noise vector update based on direction, sensitivity, jitter, and combination of overall power and gradient of power
-    update = np.array([tempo_sensitivity for k in range(128)]) * \
-        (gradm[i]+specm[i]) * update_dir * jitters
-
-    # smooth the update with the previous update (to avoid overly sharp frame transitions)
-    update = (update+update_last*3)/4
-
-    # set last update
-    update_last = update
-
-    # update noise vector
-    nv2 = nv1+update
-
-    # append to noise vectors
-    noise_vectors.append(nv2)
-
-    # set last noise vector
-    nvlast = nv2
-
-    # update the direction of noise units
-    update_dir = new_update_dir(nv2, update_dir)
-
-    # get last class vector
-    cv1 = cvlast
-
-    # generate new class vector
-    cv2 = np.zeros(1000)
-
-    if frame_delay < frames_delay_change_classes_limit:
-        classes = last_classes if last_classes else universal
-        for j in range(len(classes)):
-            try:
-                lst = cvlast[cvlast > 0][j]
-            except IndexError:
-                lst = 0
-            cv2[classes[j]] = (lst + ((chroma[chromasort[j]][i]) /
-                                      (pitch_sensitivity)))/(1+(1/((pitch_sensitivity))))
-
-        frame_delay += 1
-
-    else:
-        frame_delay = 0
-        for j in range(len(classes)):
-            try:
-                lst = cvlast[last_classes[j]]
-            except IndexError:
-                lst = 0
-            cv2[classes[j]] = (lst + ((chroma[chromasort[j]][i]) /
-                                      (pitch_sensitivity)))/(1+(1/((pitch_sensitivity))))
-
-        # takes the latest multiplier (i.e largest) and multiplies it by a constant for the whole track theme
-        # for j in range(len(universal)):
-        #     cv2[universal[j]] += ((chroma[chromasort[j]][i]) /
-        #                           (pitch_sensitivity))/(1+(1/((pitch_sensitivity))))
-
-    # if more than 6 classes, normalize new class vector between 0 and 1, else simply set max class val to 1
-
-    cv2 = normalize_cv(cv2)
-
-    # adjust depth
-    cv2 = cv2*depth
-
-    class_frames.append(used_classes)
-
-    # this prevents rare bugs where all classes are the same value
-    if np.std(cv2[np.where(cv2 != 0)]) < 0.0000001:
-        cv2[classes[0]] = cv2[classes[0]]+0.01
-
-    # append new class vector
-    class_vectors.append(cv2)
-
-    # set last class vector
-    cvlast = cv2
-    last_classes = classes
-
-
-# interpolate between class vectors of bin size [smooth_factor] to smooth frames
-class_vectors = smooth(class_vectors, smooth_factor)
+noise_vectors, class_vectors, class_frames = song_vectors(
+    features, lyrics, classes, universal, frame_time, frame_length,
+    args.pitch_sensitivity, args.tempo_sensitivity, args.depth, num_classes,
+    sort_classes_by_power, args.jitter, truncation, args.smooth_factor,
+    args.smooth_method, seed)
 
 
 # check whether to use vectors from last run
 if use_previous_vectors == 1:
     # load vectors from previous run
-    class_vectors = np.load('class_vectors.npy')
+    class_vectors = load_class_vectors('class_vectors.npz')
     noise_vectors = np.load('noise_vectors.npy')
 else:
     # save record of vectors for current video
-    np.save('class_vectors.npy', class_vectors)
+    save_class_vectors('class_vectors.npz', class_vectors)
     np.save('noise_vectors.npy', noise_vectors)
 
 
@@ -450,128 +258,160 @@ else:
 ########################################
 
 
-# convert to Tensor
-noise_vectors = torch.Tensor(np.array(noise_vectors))
-class_vectors = torch.Tensor(np.array(class_vectors))
-
 # Generate frames in batches of batch_size
 
 print('\n\nGenerating frames \n')
 
 # send to CUDA if running on GPU
-model = model.to(device)
-noise_vectors = noise_vectors.to(device)
-class_vectors = class_vectors.to(device)
-
-
-frames = []
-
-for i in tqdm(range(frame_lim)):
-
-    # print progress
-    pass
-
-    if (i+1)*batch_size > len(class_vectors):
-        torch.cuda.empty_cache()
-        break
-
-    # get batch
-    noise_vector = noise_vectors[i*batch_size:(i+1)*batch_size]
-    class_vector = class_vectors[i*batch_size:(i+1)*batch_size]
-
-    # Generate images
-    with torch.no_grad():
-        output = model(noise_vector, class_vector, truncation)
-
-    output_cpu = output.cpu().data.numpy()
-
-    # convert to image array and add to frames
-    for out in output_cpu:
-        im = np.array(toimage(out))
-        frames.append(im)
-
-    # empty cuda cache
-    torch.cuda.empty_cache()
+renderer = FrameRenderer(model, truncation, batch_size,
+                         frame_cache=frame_cache,
+                         memory_budget_mb=args.memory_budget,
+                         progress=progress)
+
+# render every frame up to the duration (the last batch may be partial)
+n_frames = min(frame_lim, class_vectors.shape[0], len(noise_vectors))
+noise_vectors = noise_vectors[:n_frames]
+class_vectors = class_vectors[:n_frames]
+
+if keyframes == 1:
+    # render the GAN on keyframes only, chosen where the music has an onset
+    # or the vectors have moved far enough, and blend the frames in between
+    if args.stream_audio:
+        onsets = features.onsets
+    else:
+        onsets = librosa.onset.onset_strength(
+            y=y, sr=sr, hop_length=frame_length)
+        onsets = onsets / max(np.max(onsets), 1e-12)
+
+    # vector j + 1 is generated from audio frame j
+    onsets = np.concatenate([[0], onsets])[:n_frames]
+
+    selector = KeyframeSelector(args.keyframe_threshold,
+                                args.onset_threshold,
+                                args.max_keyframe_gap)
+    with span('select_keyframes') as sp:
+        key_idx = selector.select(
+            latent_deltas(noise_vectors, class_vectors), onsets)
+        sp.items = n_frames
+    print(f'\nRendering {len(key_idx)} keyframes for {n_frames} frames \n')
+
+    key_images = renderer.render(noise_vectors[key_idx],
+                                 class_vectors[key_idx])
+
+    with span('blend_frames') as sp:
+        left, weights = slerp_positions(
+            np.hstack([noise_vectors, compact(class_vectors)[1]]), key_idx)
+        frames = list(blend_frames(key_images, left, weights))
+        sp.items = len(frames)
+elif not subtitles:
+    # write the frames to the video while the GAN renders the next ones
+    encoder = VideoEncoder(outname, 22050/frame_length, song,
+                           metadata=dict(comment=fingerprint))
+    with span('write_video') as sp:
+        sp.items = renderer.render_to(noise_vectors, class_vectors, encoder)
+        encoder.close()
+    frames = None
+else:
+    frames = renderer.render(noise_vectors, class_vectors)
 
 
 # Save video
-aud = mpy.AudioFileClip(song, fps=44100)
+if frames is not None:
+    start_stage('write_video')
+    import moviepy.editor as mpy
+    from moviepy.video.tools.subtitles import SubtitlesClip
+    from moviepy.video.VideoClip import TextClip
+    from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+
+    aud = mpy.AudioFileClip(song, fps=44100)
+
+    if args.duration:
+        aud.duration = args.duration
+
+    clip = mpy.ImageSequenceClip(frames, fps=22050/frame_length)
+    clip = clip.set_audio(aud)
+
+    # Add used_classes and lyrics as subtitles
+    if subtitles:
+        lyrics_by_frame = lyric_df.loc[lyric_df['topic'] == 0, 'lyrics'].tolist()
+
+        last_cat = universal
+        srt_str = ''
+        with open('../data/processed/image_classes.yaml', 'r') as f:
+            class_to_name = yaml.load(f)
+
+        start_time = 0
+        n_valid = 1
+        for i in range(len(gradm)):
+            sec = i * frame_time
+            cl_ = class_frames[i]
+            test = last_cat is None
+            if cl_ != last_cat:
+
+                last_cat_end = sec
+                srt_block = Subtitle(n_valid, pd.to_timedelta(
+                    start_time, unit='s'), pd.to_timedelta(last_cat_end, unit='s'), str([class_to_name[x] for x in last_cat])).to_srt()
+                srt_str += srt_block
+                start_time = sec
+                n_valid += 1
+            last_cat = cl_
+
+        with open('test_upper.srt', 'w') as f:
+            f.write(srt_str)
+
+        lyric_df['end'] = lyric_df.groupby(
+            'topic')['time'].shift(-1).fillna(method='ffill')
+
+        with open('test_lower.srt', 'w') as f:
+            for i, row in lyric_df.loc[lyric_df['topic'] == 0].iterrows():
+                if pd.isnull(row['end']):
+                    continue
+                srt_block = Subtitle(
+                    i + 1, row['time'], row['end'], row['lyrics']).to_srt()
+                f.write(srt_block)
+
+        clip.margin(top=110, bottom=110)
+
+        s_up = 'test_upper.srt'
+        s_down = 'test_lower.srt'
+
+        size = clip.size
+
+        def create_generator(direction, fontsize):
+            def generator(txt):
+                if direction == 'South':
+                    tc = TextClip(txt, font='Nunito',
+                                  fontsize=fontsize, color='white',
+                                  method='caption', align=direction, size=size)
+                else:
+                    tc = TextClip(txt, font='Nunito',
+                                  fontsize=fontsize, color='white',
+                                  method='caption', align='center', size=(512, 25))
+                return tc
+            return generator
+
+        sub_1 = SubtitlesClip(s_up, make_textclip=create_generator('North', 8))
+        sub_2 = SubtitlesClip(s_down, make_textclip=create_generator('South', 24))
+
+        sub_1.end = sub_2.end
+
+        final = CompositeVideoClip([clip, sub_1, sub_2], size=size)
+    else:
+        final = clip
 
-if args.duration:
-    aud.duration = args.duration
-
-clip = mpy.ImageSequenceClip(frames, fps=22050/frame_length)
-clip = clip.set_audio(aud)
-
-
-# Add used_classes and lyrics as subtitles
-if subtitles:
-    lyrics_by_frame = lyric_df.loc[lyric_df['topic'] == 0, 'lyrics'].tolist()
-
-    last_cat = universal
-    srt_str = ''
-    with open('../data/processed/image_classes.yaml', 'r') as f:
-        class_to_name = yaml.load(f)
-
-    start_time = 0
-    n_valid = 1
-    for i in range(len(gradm)):
-        sec = i * frame_time
-        cl_ = class_frames[i]
-        test = last_cat is None
-        if cl_ != last_cat:
-
-            last_cat_end = sec
-            srt_block = Subtitle(n_valid, pd.to_timedelta(
-                start_time, unit='s'), pd.to_timedelta(last_cat_end, unit='s'), str([class_to_name[x] for x in last_cat])).to_srt()
-            srt_str += srt_block
-            start_time = sec
-            n_valid += 1
-        last_cat = cl_
-
-    with open('test_upper.srt', 'w') as f:
-        f.write(srt_str)
-
-    lyric_df['end'] = lyric_df.groupby(
-        'topic')['time'].shift(-1).fillna(method='ffill')
-
-    with open('test_lower.srt', 'w') as f:
-        for i, row in lyric_df.loc[lyric_df['topic'] == 0].iterrows():
-            if pd.isnull(row['end']):
-                continue
-            srt_block = Subtitle(
-                i + 1, row['time'], row['end'], row['lyrics']).to_srt()
-            f.write(srt_block)
-
-    clip.margin(top=110, bottom=110)
-
-    s_up = 'test_upper.srt'
-    s_down = 'test_lower.srt'
-
-    size = clip.size
-
-    def create_generator(direction, fontsize):
-        def generator(txt):
-            if direction == 'South':
-                tc = TextClip(txt, font='Nunito',
-                              fontsize=fontsize, color='white',
-                              method='caption', align=direction, size=size)
-            else:
-                tc = TextClip(txt, font='Nunito',
-                              fontsize=fontsize, color='white',
-                              method='caption', align='center', size=(512, 25))
-            return tc
-        return generator
-
-    sub_1 = SubtitlesClip(s_up, make_textclip=create_generator('North', 8))
-    sub_2 = SubtitlesClip(s_down, make_textclip=create_generator('South', 24))
-
-    sub_1.end = sub_2.end
-
-    final = CompositeVideoClip([clip, sub_1, sub_2], size=size)
-else:
-    final = clip
+    with span('write_video') as sp:
+        final.write_videofile(outname, codec='libx264',
+                              audio_codec='aac', fps=clip.fps,
+                              ffmpeg_params=['-metadata',
+                                             f'comment={fingerprint}'])
+        sp.items = len(frames)
+
+save_fingerprint(outname, fingerprint, fingerprint_inputs)
+if progress:
+    progress.finish()
 
 
-final.write_videofile(outname, codec='libx264',
-                      audio_codec='aac', fps=clip.fps)
+if args.trace:
+    tracer = instrumentation.disable()
+    tracer.save(args.trace)
+    print('\n' + tracer.table())
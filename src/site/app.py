@@ -1,18 +1,52 @@
+import json
 import os
-import uuid
+import subprocess
 import eyed3
 
-import shutil
-from flask import Flask, redirect, render_template, request, url_for, request
+from flask import Flask, Request, Response, redirect, render_template, request, send_file, url_for, request
 import time
 
+from deep_lyric_visualizer.content_store import ContentStore
+from deep_lyric_visualizer.lyrics.lyrics import Lyrics
+from deep_lyric_visualizer.render.fingerprint import (
+    fingerprint_params, render_fingerprint)
+from deep_lyric_visualizer.render.progress import (
+    ProgressReporter, read_progress, render_status)
+from deep_lyric_visualizer.render.preview import (
+    BOUNDARY, PreviewStream, load_preview_model, preview_vectors)
+from deep_lyric_visualizer.render.video_cache import RenderJobs, VideoStore
+
+
+class UploadRequest(Request):
+    """A request which streams uploaded files to disk in the upload store,
+    hashing them while they are received, so that they are never held in
+    memory or read again to be hashed.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        return app.config['MP3_STORE'].temporary_file()
+
+
 app = Flask(__name__)
+app.request_class = UploadRequest
 # app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024
 app.config['UPLOAD_EXTENSIONS'] = ['.mp3']
-app.config['ID'] = None
+# uploads are stored by the SHA-256 of their contents, which is also the key
+# of the lyrics and the cached audio features derived from them
+app.config['MP3_STORE'] = ContentStore('static/music', '.mp3')
+app.config['LRC_STORE'] = ContentStore('../../data/lyrics', '.lrc',
+                                       nested=True)
+app.config['FEATURE_CACHE'] = os.path.abspath('static/features')
 app.config['UPLOAD_MP3_FILEPATH'] = None
-app.config['UPLOAD_LRC_FILEDIR'] = None
-app.config['UPLOAD_LRC_FILEPATH'] = None
+app.config['AUDIO_SHA256'] = None
+app.config['LYRICS_ID'] = None
+app.config['PREVIEW'] = None
+app.config['RENDER_SEED'] = 0
+app.config['RENDER_MODEL'] = 'biggan-deep-512'
+app.config['VIDEO_STORE'] = VideoStore('static/videos', 5 * 1024 ** 3)
+app.config['RENDER_JOBS'] = RenderJobs()
+app.config['PROGRESS_DIR'] = os.path.abspath('static/progress')
 
 
 @app.route('/')
@@ -23,16 +57,13 @@ def index():
 
 @app.route('/', methods=['GET', 'POST'])
 def upload_file():
-    id_ = uuid.uuid4()
-    app.config['ID'] = id_
-    remove_if_exists('UPLOAD_MP3_FILEPATH')
-
-    app.config['UPLOAD_MP3_FILEPATH'] = os.path.join(
-        'static/music', f'{id_}.mp3')
-
     uploaded_mp3 = request.files['file']
     if uploaded_mp3.filename != '':
-        uploaded_mp3.save(app.config['UPLOAD_MP3_FILEPATH'])
+        sha256, path = app.config['MP3_STORE'].add_file(uploaded_mp3.stream)
+        app.config['AUDIO_SHA256'] = sha256
+        app.config['UPLOAD_MP3_FILEPATH'] = path
+    else:
+        uploaded_mp3.stream.discard()
 
     time.sleep(10)
     return redirect(url_for('step2'), code=302)
@@ -45,34 +76,63 @@ def step2():
 
 @app.route('/step2', methods=["GET", "POST"])
 def upload_lrc():
-    remove_if_exists('UPLOAD_LRC_FILEDIR', True)
-    id_ = app.config['ID']
-
-    app.config['UPLOAD_LRC_FILEDIR'] = os.path.join(
-        '../../data/lyrics/', str(id_))
-    app.config['UPLOAD_LRC_FILEPATH'] = os.path.join(
-        app.config['UPLOAD_LRC_FILEDIR'], f'{id_}.lrc'
-    )
-
-    os.mkdir(app.config['UPLOAD_LRC_FILEDIR'])
-    print(app.config['UPLOAD_LRC_FILEDIR'])
+    # the lyrics are named by their hash, so the topics assigned to the same
+    # lyrics are reused
     uploaded_lrc = request.files['file']
     if uploaded_lrc.filename != '':
-        uploaded_lrc.save(app.config['UPLOAD_LRC_FILEPATH'])
+        sha256, _ = app.config['LRC_STORE'].add_file(uploaded_lrc.stream)
+        app.config['LYRICS_ID'] = sha256
+    else:
+        uploaded_lrc.stream.discard()
 
 
 @app.route('/config')
 def config():
-    return render_template('config.html')
+    return render_template(
+        'config.html', song_url='/' + str(app.config['UPLOAD_MP3_FILEPATH']))
+
+
+@app.route('/preview', methods=['POST'])
+def preview():
+    # only one preview plays at a time
+    if app.config['PREVIEW']:
+        app.config['PREVIEW'].stop()
 
+    # the preview follows the same trajectory as the render of the same form,
+    # so it uses the frame length, fixed options and seed of render_options;
+    # frames the stream falls behind on are skipped
+    form = request.form
+    noise_vectors, class_vectors, fps = preview_vectors(
+        app.config['UPLOAD_MP3_FILEPATH'],
+        Lyrics(str(app.config['LYRICS_ID'])),
+        frame_length=form.get('frameLength', 512, type=int),
+        pitch_sensitivity=form.get('pitchSensitivity', 220, type=int),
+        tempo_sensitivity=form.get('tempoSensitivity', 0.25, type=float),
+        depth=form.get('depth', 1, type=float),
+        num_classes=form.get('numClasses', 12, type=int),
+        sort_classes_by_power=1,
+        jitter=form.get('jitter', 0.5, type=float),
+        truncation=1,
+        smooth_factor=form.get('smoothFactor', 20, type=int),
+        duration=form.get('duration', None, type=float),
+        seed=app.config['RENDER_SEED'],
+        feature_cache=app.config['FEATURE_CACHE'],
+        audio_sha256=app.config['AUDIO_SHA256'])
 
-def remove_if_exists(key, dir=False):
-    if app.config[key]:
-        if os.path.exists(app.config[key]):
-            if dir:
-                shutil.rmtree(app.config[key])
-            else:
-                os.remove(app.config[key])
+    app.config['PREVIEW'] = PreviewStream(load_preview_model(), noise_vectors,
+                                          class_vectors, fps)
+    return '', 204
+
+
+@app.route('/preview/stream')
+def preview_stream():
+    # the frames are rendered in step with the audio from the first request
+    # of the stream, when the page starts playing the song
+    stream = app.config['PREVIEW']
+    if not stream:
+        return 'No preview was started.', 404
+    return Response(stream.start().mjpeg(),
+                    mimetype=f'multipart/x-mixed-replace; boundary={BOUNDARY}')
 
 
 @app.context_processor
@@ -95,11 +155,176 @@ def dated_url_for(endpoint, **values):
 def processing():
     return render_template('processing.html')
 
+def render_options(form):
+    """Returns the visualize.py options of the render form, in order.
+
+    Args:
+        form (dict): The submitted form.
+
+    Returns:
+        dict: The value of each option.
+    """
+    options = dict(
+        batch_size='auto',
+        num_classes=int(form['numClasses']),
+        pitch_sensitivity=int(form['pitchSensitivity']),
+        tempo_sensitivity=float(form['tempoSensitivity']),
+        depth=float(form['depth']),
+        jitter=float(form['jitter']),
+        frame_length=int(form['frameLength']),
+        smooth_factor=int(form['smoothFactor']),
+        sort_classes_by_power=1,
+        subtitles=int('checked' == form.get('subtitles')),
+        truncation=1,
+        seed=app.config['RENDER_SEED'])
+    if form.get('duration'):
+        options['duration'] = int(form['duration'])
+    return options
+
+
+def site_fingerprint(options):
+    """Returns the fingerprint of a render from the uploaded files and the
+    options of the form, which is the key of the finished video. It is
+    passed to visualize.py, which records it in the video, as the lyric
+    topics and classes that visualize.py fingerprints are only known during
+    the render.
+
+    Args:
+        options (dict): The options, from render_options.
+
+    Returns:
+        str: The fingerprint.
+    """
+    fingerprint, _ = render_fingerprint(
+        app.config['AUDIO_SHA256'], app.config['LYRICS_ID'],
+        fingerprint_params(options), options['seed'],
+        app.config['RENDER_MODEL'])
+    return fingerprint
+
+
+def progress_path(fingerprint):
+    """Returns the file the progress of a render is reported to.
+
+    Args:
+        fingerprint (str): The fingerprint of the render.
+
+    Returns:
+        str: The absolute path of the file.
+    """
+    return os.path.join(app.config['PROGRESS_DIR'], fingerprint + '.json')
+
+
+def render_progress(fingerprint):
+    """Returns the latest progress event of a render.
+
+    Args:
+        fingerprint (str): The fingerprint of the render.
+
+    Returns:
+        dict: The event, from render.ProgressReporter, or None if the render
+            is unknown.
+    """
+    # done is only reported once the video is in the store, after
+    # visualize.py has finished
+    return render_status(
+        read_progress(progress_path(fingerprint)),
+        os.path.exists(app.config['VIDEO_STORE'].path(fingerprint)),
+        app.config['RENDER_JOBS'].get(fingerprint) is not None)
+
+
+def render_video(song, lyrics_id, options, fingerprint):
+    """Renders a video with visualize.py and adds it to the video store.
+
+    Args:
+        song (str): The path of the song, from the site directory.
+        lyrics_id (str): The hash of the lyrics, which names them.
+        options (dict): The options, from render_options.
+        fingerprint (str): The fingerprint of the render.
+    """
+    store = app.config['VIDEO_STORE']
+    output_file = os.path.abspath(store.temporary_path(fingerprint))
+    progress_file = progress_path(fingerprint)
+    cmd = ['python', 'deep_lyric_visualizer/visualize.py',
+           '--song', f'site/{song}', '--output_file', output_file,
+           '--feature_cache', app.config['FEATURE_CACHE'],
+           '--progress', progress_file, '--fingerprint', fingerprint]
+    if lyrics_id:
+        cmd += ['--lyrics', lyrics_id]
+    for option, value in options.items():
+        cmd += [f'--{option}', str(value)]
+    try:
+        subprocess.run(cmd, cwd='..', check=True)
+        store.put(fingerprint, output_file)
+        # the store now answers whether the video is done
+        if os.path.exists(progress_file):
+            os.remove(progress_file)
+    except Exception as error:
+        ProgressReporter(progress_file).fail(str(error))
+        raise
+    finally:
+        # a failed render leaves a partial video behind
+        for path in (output_file, output_file + '.json'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
 @app.route('/processing', methods=["POST"])
 def processing_post():
-    if request.method == 'POST':
-        cmd = f'python deep_lyric_visualizer/visualize.py --song site/{app.config["UPLOAD_MP3_FILEPATH"]} --batch_size=5 --num_classes {request.form["numClasses"]}  --pitch_sensitivity={request.form["pitchSensitivity"]} --tempo_sensitivity={request.form["tempoSensitivity"]} --depth={request.form["depth"]} --jitter={request.form["jitter"]} --frame_length={request.form["frameLength"]} --smooth_factor={request.form["smoothFactor"]} --sort_classes_by_power 1 --subtitles {int("checked" == request.form["subtitles"])}  --truncation 1  --output_file' + (f' --duration {request.form["duration"]}' if request.form['duration'] else ' ') +  "render.mp4"
-        os.system(f'cd ..;' +  cmd)
+    options = render_options(request.form)
+    fingerprint = site_fingerprint(options)
 
+    # serve the video of an identical earlier render, or join the identical
+    # render in progress
+    if app.config['VIDEO_STORE'].get(fingerprint):
+        return redirect(url_for('video', fingerprint=fingerprint))
+    if not app.config['RENDER_JOBS'].get(fingerprint):
+        # replaces the progress of an earlier failed render
+        ProgressReporter(progress_path(fingerprint)).start('queued')
+    app.config['RENDER_JOBS'].submit(fingerprint, render_video,
+                                     app.config['UPLOAD_MP3_FILEPATH'],
+                                     app.config['LYRICS_ID'], options,
+                                     fingerprint)
 
-    return render_template('processing.html')
+    return render_template('processing.html', fingerprint=fingerprint)
+
+
+@app.route('/video/<fingerprint>')
+def video(fingerprint):
+    path = app.config['VIDEO_STORE'].get(fingerprint)
+    if path:
+        return send_file(os.path.abspath(path), mimetype='video/mp4')
+    if app.config['RENDER_JOBS'].get(fingerprint):
+        return 'The video is rendering.', 202
+    return 'There is no video for this render.', 404
+
+
+@app.route('/progress/<fingerprint>')
+def progress(fingerprint):
+    event = render_progress(fingerprint)
+    if event is None:
+        return 'There is no render with this fingerprint.', 404
+    return event
+
+
+@app.route('/progress/<fingerprint>/events')
+def progress_events(fingerprint):
+    # server-sent events, sent when the progress changes, until the render
+    # is done or failed
+    if render_progress(fingerprint) is None:
+        return 'There is no render with this fingerprint.', 404
+
+    def events():
+        last = None
+        while True:
+            event = render_progress(fingerprint)
+            if event is None:
+                return
+            if event != last:
+                yield f'data: {json.dumps(event)}\n\n'
+                last = event
+            if event['state'] != 'running':
+                return
+            time.sleep(1)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
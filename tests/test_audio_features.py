@@ -0,0 +1,109 @@
+import numpy as np
+import soundfile as sf
+
+from deep_lyric_visualizer.render.audio_features import AudioFeatures, _overlapping, _rechunk
+from deep_lyric_visualizer.render.trajectory import TrajectoryGenerator
+
+
+def make_song(path, seconds=12, sr=22050):
+    rng = np.random.RandomState(0)
+    t = np.arange(int(seconds * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 220 * 2 ** (np.floor(t / 2) / 12) * t)
+    y += 0.05 * rng.randn(len(t))
+    sf.write(path, y.astype(np.float32), sr)
+
+
+class TestStreaming:
+
+    def test_rechunk_and_overlap(self):
+        blocks = list(_rechunk([np.arange(5.), np.arange(5., 12.)], 4))
+        assert [len(b) for b in blocks] == [4, 4, 4]
+
+        padded = list(_overlapping(blocks, 2))
+        assert padded[0][0].tolist() == [0, 1, 2, 3, 4, 5]
+        assert padded[1][1:] == (2, 4)
+        assert padded[2][0].tolist() == [6, 7, 8, 9, 10, 11]
+
+    def test_from_file_matches_from_audio(self, tmp_path):
+        import librosa
+
+        path = str(tmp_path / 'song.wav')
+        make_song(path)
+        y, sr = librosa.load(path)
+        full = AudioFeatures.from_audio(y, sr)
+
+        streamed = AudioFeatures.from_file(path, block_frames=100,
+                                           onsets=True)
+        assert len(streamed) == len(full)
+        assert streamed.duration == full.duration
+        assert np.allclose(streamed.specm, full.specm, atol=1e-5)
+        assert np.allclose(streamed.gradm, full.gradm, atol=1e-5)
+        assert np.abs(streamed.chroma - full.chroma).max() < 0.1
+        assert len(streamed.onsets) == len(full)
+
+    def test_parallel_matches_serial(self, tmp_path):
+        import librosa
+
+        path = str(tmp_path / 'song.wav')
+        make_song(path)
+        y, sr = librosa.load(path)
+        serial = AudioFeatures.from_audio(y, sr)
+
+        parallel = AudioFeatures.from_audio(y, sr, n_jobs=2, block_frames=100)
+        assert len(parallel) == len(serial)
+        assert parallel.duration == serial.duration
+        assert np.allclose(parallel.specm, serial.specm, atol=1e-5)
+        assert np.allclose(parallel.gradm, serial.gradm, atol=1e-5)
+        assert np.allclose(parallel.chroma, serial.chroma, atol=1e-3)
+
+        streamed = AudioFeatures.from_file(path, block_frames=100, n_jobs=2)
+        assert np.array_equal(streamed.specm, AudioFeatures.from_file(
+            path, block_frames=100).specm)
+
+
+class TestTrajectory:
+
+    def test_chunks(self):
+        features = AudioFeatures.from_power(
+            np.random.RandomState(0).rand(50),
+            np.random.RandomState(1).rand(12, 50))
+        class_list = np.tile(np.arange(12), (50, 1))
+        trajectory = TrajectoryGenerator(seed=0)
+
+        chunks = []
+        for chunk_frames in (1000, 16):
+            chunks.append(list(trajectory.iter_generate(
+                features, class_list, list(range(12)), list(range(12)),
+                0.02, chunk_frames)))
+
+        assert [len(c[0]) for c in chunks[1]] == [16, 16, 16, 3]
+        assert np.array_equal(
+            np.concatenate([c[0] for c in chunks[1]]), chunks[0][0][0])
+        assert np.array_equal(
+            np.vstack([c[1].toarray() for c in chunks[1]]),
+            chunks[0][0][1].toarray())
+
+
+class TestCache:
+
+    def test_cached(self, tmp_path):
+        features = AudioFeatures.from_power(
+            np.random.RandomState(0).rand(50),
+            np.random.RandomState(1).rand(12, 50))
+        features.duration = 1.2
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return features
+
+        for _ in range(2):
+            cached = AudioFeatures.cached(str(tmp_path), 'abc', compute,
+                                          frame_length=512)
+        assert len(computed) == 1
+        assert np.array_equal(cached.chroma, features.chroma)
+        assert cached.duration == 1.2
+        assert cached.onsets is None
+
+        AudioFeatures.cached(str(tmp_path), 'abc', compute, frame_length=256)
+        assert len(computed) == 2
@@ -0,0 +1,150 @@
+import numpy as np
+import pytest
+import torch
+from scipy import sparse
+
+from deep_lyric_visualizer.render.batch_render import (BatchRenderer, fill_batches, group_by_model,
+                                                       load_manifest, take_batch)
+
+
+class NoiseGAN(torch.nn.Module):
+
+    def __init__(self, max_batch=None):
+        super().__init__()
+        self.max_batch = max_batch
+        self.failures = 0
+
+    def forward(self, z, class_label, truncation):
+        if self.max_batch and len(z) > self.max_batch:
+            self.failures += 1
+            raise RuntimeError('CUDA out of memory. Tried to allocate 2 GiB')
+        return z[:, :48].reshape(-1, 3, 4, 4)
+
+
+class ListEncoder:
+
+    videos = {}
+
+    def __init__(self, path, fps, audio_file, metadata=None):
+        self.frames = self.videos[path] = []
+        self.closed = False
+
+    def write(self, frame):
+        assert not self.closed
+        self.frames.append(frame)
+
+    def close(self):
+        self.closed = True
+
+
+def prepare(spec):
+    rng = np.random.RandomState(spec['seed'])
+    n_frames = spec['n_frames']
+    classes = sparse.csr_matrix(rng.rand(n_frames, 1000) > 0.99)
+    return rng.rand(n_frames, 128), classes, 20
+
+
+class TestManifest:
+
+    def test_defaults(self, tmp_path):
+        path = tmp_path / 'manifest.yml'
+        path.write_text('defaults:\n  resolution: 128\nsongs:\n'
+                        '  - a/first.mp3\n'
+                        '  - song: second.mp3\n    resolution: 256\n'
+                        '    output_file: out.mp4\n')
+        first, second = load_manifest(str(path))
+        assert first['resolution'] == 128
+        assert first['lyrics'] == 'first'
+        assert first['output_file'] == 'a/first.mp4'
+        assert second['resolution'] == 256
+        assert second['output_file'] == 'out.mp4'
+        assert first['smooth_method'] == 'linear'
+
+    def test_group_by_model(self):
+        specs = [dict(song=f'{i}.mp3', resolution=resolution,
+                      truncation=truncation)
+                 for i, (resolution, truncation) in enumerate(
+                     [(256, 1), (128, 1), (256, 0.5), (256, 1), (128, 1)])]
+
+        # the groups of a model are next to each other, and the songs keep
+        # the order of the manifest
+        groups = group_by_model(specs)
+        assert list(groups) == [('biggan-deep-256', 1),
+                                ('biggan-deep-256', 0.5),
+                                ('biggan-deep-128', 1)]
+        assert [[spec['song'] for spec in group]
+                for group in groups.values()] == [['0.mp3', '3.mp3'],
+                                                  ['2.mp3'],
+                                                  ['1.mp3', '4.mp3']]
+
+    def test_unknown_parameter(self, tmp_path):
+        path = tmp_path / 'manifest.yml'
+        path.write_text('songs:\n  - song: first.mp3\n    speed: 2\n')
+        with pytest.raises(ValueError):
+            load_manifest(str(path))
+
+
+class TestBatchRender:
+
+    def test_fill_batches(self):
+        batches = list(fill_batches(iter([('a', 5), ('b', 0), ('c', 9)]), 4))
+        assert batches == [[('a', 0, 4)], [('a', 4, 5), ('c', 0, 3)],
+                           [('c', 3, 7)], [('c', 7, 9)]]
+
+        # a lowered batch size applies from the next batch
+        sizes = iter([4, 2, 2, 2])
+        batches = list(fill_batches(iter([('a', 5), ('c', 4)]),
+                                    lambda: next(sizes)))
+        assert batches == [[('a', 0, 4)], [('a', 4, 5), ('c', 0, 1)],
+                           [('c', 1, 3)], [('c', 3, 4)]]
+
+    def test_take_batch(self):
+        songs = {i: (dict(song=f'{i}.mp3'), *prepare(dict(seed=i, n_frames=n)))
+                 for i, n in enumerate([3, 5])}
+        noise_batch, class_batch, batch_songs = take_batch(
+            songs, [(0, 1, 3), (1, 0, 2)])
+
+        assert np.array_equal(noise_batch[:2], prepare(
+            dict(seed=0, n_frames=3))[0][1:3])
+        assert class_batch.shape == (4, 1000)
+        assert batch_songs == {0: (dict(song='0.mp3'), 3, 20),
+                               1: (dict(song='1.mp3'), 5, 20)}
+        # the first song is done, so its vectors are dropped
+        assert list(songs) == [1]
+
+    def test_demultiplexes_songs(self):
+        specs = [dict(song=f'{i}.mp3', output_file=f'{i}.mp4', seed=i,
+                      n_frames=n, resolution=128, truncation=1)
+                 for i, n in enumerate([7, 12, 3])]
+        models = []
+        renderer = BatchRenderer(
+            batch_size=5, device='cpu',
+            load_model=lambda name: models.append(name) or NoiseGAN(),
+            prepare=prepare, encoder=ListEncoder)
+
+        rendered = renderer.render(specs)
+        assert models == ['biggan-deep-128']
+        assert rendered == {'0.mp4': 7, '1.mp4': 12, '2.mp4': 3}
+
+        single = BatchRenderer(batch_size=5, device='cpu',
+                               load_model=lambda name: NoiseGAN(),
+                               prepare=prepare, encoder=ListEncoder)
+        for spec in specs:
+            batched = ListEncoder.videos[spec['output_file']]
+            single.render([spec])
+            assert np.array_equal(
+                np.stack(batched),
+                np.stack(ListEncoder.videos[spec['output_file']]))
+
+    def test_back_off_lasts(self):
+        specs = [dict(song=f'{i}.mp3', output_file=f'oom{i}.mp4', seed=i,
+                      n_frames=n, resolution=128, truncation=1)
+                 for i, n in enumerate([7, 12, 3])]
+        model = NoiseGAN(max_batch=4)
+        renderer = BatchRenderer(batch_size=8, device='cpu',
+                                 load_model=lambda name: model,
+                                 prepare=prepare, encoder=ListEncoder)
+
+        assert renderer.render(specs) == {'oom0.mp4': 7, 'oom1.mp4': 12,
+                                          'oom2.mp4': 3}
+        assert model.failures == 1
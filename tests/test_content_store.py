@@ -0,0 +1,40 @@
+import hashlib
+import io
+import os
+
+from deep_lyric_visualizer.content_store import ContentStore
+
+
+class TestContentStore:
+
+    def test_deduplicates(self, tmp_path):
+        store = ContentStore(str(tmp_path), '.mp3')
+        data = os.urandom(100000)
+
+        sha256, path = store.add(io.BytesIO(data), chunk_size=4096)
+        assert sha256 == hashlib.sha256(data).hexdigest()
+        assert path == str(tmp_path / f'{sha256}.mp3')
+        with open(path, 'rb') as f:
+            assert f.read() == data
+
+        assert store.add(io.BytesIO(data)) == (sha256, path)
+        assert store.duplicates == 1
+        assert os.listdir(store.tmp_dir) == []
+
+    def test_streamed_upload(self, tmp_path):
+        uploads = ContentStore(str(tmp_path / 'music'), '.mp3')
+        lyrics = ContentStore(str(tmp_path / 'lyrics'), '.lrc', nested=True)
+
+        upload = uploads.temporary_file()
+        upload.write(b'[00:01.00]first line\n')
+        upload.write(b'[00:02.00]second line\n')
+        upload.seek(0)
+        assert upload.read().startswith(b'[00:01.00]')
+
+        sha256, path = lyrics.add_file(upload)
+        assert path == str(tmp_path / 'lyrics' / sha256 / f'{sha256}.lrc')
+        assert os.listdir(uploads.tmp_dir) == []
+
+        upload = uploads.temporary_file()
+        upload.discard()
+        assert os.listdir(uploads.tmp_dir) == []
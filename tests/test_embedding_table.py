@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from deep_lyric_visualizer.nlp.embedding_table import (EmbeddingTable,
+                                                       extract_embedding_table)
+
+
+class FakeEmbedder:
+
+    def __init__(self, words, dim=4):
+        self.vectors = {w: np.full(dim, i, dtype=np.float32)
+                        for i, w in enumerate(words)}
+
+    def get_word_vector(self, word):
+        return self.vectors[word]
+
+
+class TestEmbeddingTable:
+
+    def test_extract_and_load(self, tmp_path):
+        embedder = FakeEmbedder(['dog', 'cat', 'fish', 'bird'])
+        path = str(tmp_path / 'table')
+
+        missing = extract_embedding_table(
+            embedder, ['fish', 'dog', 'dog', 'gonna'], path)
+        assert missing == ['gonna']
+
+        table = EmbeddingTable(path)
+        assert table.vocab == ['dog', 'fish']
+        assert table.dim == 4
+        assert isinstance(table.vectors, np.memmap)
+        assert 'dog' in table and 'cat' not in table
+        assert np.array_equal(table.get_word_vector('fish'),
+                              embedder.get_word_vector('fish'))
+
+        with pytest.raises(KeyError):
+            table.get_word_vector('cat')
+
+    def test_no_tokens_found(self, tmp_path):
+        with pytest.raises(ValueError):
+            extract_embedding_table(FakeEmbedder(['dog']), ['cat'],
+                                    str(tmp_path / 'table'))
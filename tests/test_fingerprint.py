@@ -0,0 +1,61 @@
+import hashlib
+
+import numpy as np
+
+from deep_lyric_visualizer.lyrics.lrc_table import LrcTable
+from deep_lyric_visualizer.render.audio_features import AudioFeatures
+from deep_lyric_visualizer.render.fingerprint import (file_sha256, fingerprint_params, lrc_sha256,
+                                                       render_fingerprint)
+from deep_lyric_visualizer.render.trajectory import TrajectoryGenerator
+
+
+class TestFingerprint:
+
+    def test_seeded_trajectory(self):
+        features = AudioFeatures.from_power(
+            np.random.RandomState(0).rand(300),
+            np.random.RandomState(1).rand(12, 300))
+        class_list = np.tile(np.arange(12), (300, 1))
+
+        def generate(seed):
+            noise_vectors, class_vectors, _ = TrajectoryGenerator(
+                seed=seed).generate(features, class_list, list(range(12)),
+                                    list(range(12)), 0.02)
+            return noise_vectors, class_vectors.toarray()
+
+        first, second, other = generate(7), generate(7), generate(8)
+        assert np.array_equal(first[0], second[0])
+        assert np.array_equal(first[1], second[1])
+        assert not np.array_equal(first[0], other[0])
+
+    def test_hashes(self, tmp_path):
+        path = tmp_path / 'song.mp3'
+        path.write_bytes(b'x' * 3000)
+        assert file_sha256(str(path), chunk_size=1024) == \
+            hashlib.sha256(b'x' * 3000).hexdigest()
+
+        lrc = LrcTable.from_lines(['[00:01.00]hello', '[00:02.00]world'])
+        before = lrc_sha256(lrc)
+        lrc.set_categories([[3, 4], [5]])
+        assert lrc_sha256(lrc) != before
+        lrc.assign_topics(1)
+        assert lrc_sha256(lrc) != lrc_sha256(
+            LrcTable.from_lines(['[00:01.00]hello', '[00:02.00]world']))
+
+    def test_render_fingerprint(self):
+        params = dict(jitter=0.5, depth=1)
+        fingerprint, inputs = render_fingerprint('a', 'l', params, 1, 'm')
+        assert fingerprint == render_fingerprint(
+            'a', 'l', dict(depth=1, jitter=0.5), 1, 'm')[0]
+        assert inputs['seed'] == 1
+        for changed in [('b', 'l', params, 1, 'm'),
+                        ('a', None, params, 1, 'm'),
+                        ('a', 'l', dict(params, jitter=0.4), 1, 'm'),
+                        ('a', 'l', params, 2, 'm'),
+                        ('a', 'l', params, 1, 'n')]:
+            assert render_fingerprint(*changed)[0] != fingerprint
+
+    def test_fingerprint_params(self):
+        options = dict(batch_size='auto', seed=0, jitter=0.5, depth=1,
+                       output_file='out.mp4')
+        assert fingerprint_params(options) == dict(depth=1, jitter=0.5)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from deep_lyric_visualizer.render.frame_cache import FrameCache
+
+
+class TestFrameCache:
+
+    def test_key(self, tmp_path):
+        cache = FrameCache(str(tmp_path), 'biggan-deep-128', 128, 1)
+        other = FrameCache(str(tmp_path), 'biggan-deep-128', 128, 0.5)
+        nv, cv = np.ones(128), np.zeros(1000)
+
+        assert cache.key(nv, cv) == cache.key(nv.astype(np.float32), cv)
+        assert cache.key(nv, cv) != cache.key(nv, cv + 1)
+        assert cache.key(nv, cv) != other.key(nv, cv)
+
+    def test_put_get_and_reload(self, tmp_path):
+        cache = FrameCache(str(tmp_path), 'biggan-deep-128', 128, 1)
+        frame = np.arange(48, dtype=np.uint8).reshape(4, 4, 3)
+        key = cache.key(np.ones(128), np.zeros(1000))
+
+        assert cache.get(key) is None
+        cache.put(key, frame)
+        assert np.array_equal(cache.get(key), frame)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        reloaded = FrameCache(str(tmp_path), 'biggan-deep-128', 128, 1)
+        assert reloaded.size == cache.size
+        assert np.array_equal(reloaded.get(key), frame)
+
+    def test_lru_eviction(self, tmp_path):
+        cache = FrameCache(str(tmp_path), 'biggan-deep-128', 128, 1)
+        frames = [np.full((16, 16, 3), i, np.uint8) for i in range(3)]
+        keys = [cache.key(np.full(128, i), np.zeros(1000)) for i in range(3)]
+
+        cache.put(keys[0], frames[0])
+        cache.put(keys[1], frames[1])
+        cache.max_bytes = cache.size
+
+        # touching the first frame makes the second the least recently used
+        cache.get(keys[0])
+        cache.put(keys[2], frames[2])
+
+        assert cache.get(keys[1]) is None
+        assert np.array_equal(cache.get(keys[0]), frames[0])
+        assert np.array_equal(cache.get(keys[2]), frames[2])
+        assert cache.size <= cache.max_bytes
@@ -0,0 +1,38 @@
+import logging
+
+import numpy as np
+import pytest
+
+from deep_lyric_visualizer.helpers import setup_logger, TruncatedRepr
+
+
+class TestTruncatedRepr:
+
+    def test_short(self):
+        assert str(TruncatedRepr(['a', 'b'])) == "['a', 'b']"
+
+    def test_long(self):
+        vectors = {str(i): np.arange(100.) for i in range(1000)}
+        assert len(str(TruncatedRepr(vectors, limit=50))) <= 50
+        assert len(str(TruncatedRepr('x' * 1000, limit=50))) <= 50
+
+
+class TestSetupLogger:
+
+    def test_levels(self, monkeypatch):
+        nlp = logging.getLogger('deep_lyric_visualizer.nlp')
+        render = logging.getLogger('deep_lyric_visualizer.render')
+        old = nlp.level, render.level
+        monkeypatch.setenv('LOG_LEVELS', 'deep_lyric_visualizer.render=error')
+        try:
+            setup_logger(path='', levels={'deep_lyric_visualizer.nlp':
+                                          'WARNING'})
+            assert nlp.level == logging.WARNING
+            assert render.level == logging.ERROR
+        finally:
+            nlp.setLevel(old[0])
+            render.setLevel(old[1])
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError):
+            setup_logger(profile='does_not_exist')
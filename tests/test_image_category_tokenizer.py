@@ -0,0 +1,43 @@
+from unittest.mock import Mock
+
+import pytest
+
+from deep_lyric_visualizer.generator.generation_environment import GenerationEnvironment
+from deep_lyric_visualizer.image_categories.image_category_tokenizer import ImageCategoryTokenizer
+
+CLASSES = {0: 'tench, Tinca tinca', 1: 'goldfish, Carassius auratus',
+           2: 'great white shark, white shark, man-eater',
+           3: 'the tiger shark, Galeocerdo cuvieri', 4: 'electric ray'}
+
+
+def make_tokenizer(**kwargs):
+    env = Mock(GenerationEnvironment)
+    env.SAVE_FILETYPE = 'pickle'
+    tokenizer = ImageCategoryTokenizer(env, method='regex', **kwargs)
+    tokenizer._stopwords = frozenset(['the'])
+    tokenizer.image_classes = CLASSES
+    return tokenizer
+
+
+class TestImageCategoryTokenizer:
+
+    def test_regex(self):
+        tokenizer = make_tokenizer()
+        tokenizer.tokenize_image_classes()
+        assert tokenizer.class_tokens[2] == [['great', 'white', 'shark'],
+                                             ['white', 'shark'],
+                                             ['man', 'eater']]
+        assert tokenizer.class_tokens[3][0] == ['tiger', 'shark']
+
+    def test_parallel(self):
+        serial = make_tokenizer()
+        serial.tokenize_image_classes()
+
+        parallel = make_tokenizer(n_jobs=2, chunksize=2)
+        parallel.tokenize_image_classes()
+        assert list(parallel.class_tokens.items()) == \
+            list(serial.class_tokens.items())
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            ImageCategoryTokenizer(Mock(GenerationEnvironment), method='spacy')
@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ['torch', 'pytorch_pretrained_biggan', 'wikipedia2vec',
+                 'librosa', 'moviepy', 'nltk']
+
+
+class TestImports:
+
+    def test_text_modules_do_not_import_heavy_dependencies(self):
+        code = ('import sys\n'
+                'import deep_lyric_visualizer.lyrics.lyrics\n'
+                'import deep_lyric_visualizer.render.renderer\n'
+                'import deep_lyric_visualizer.render.audio_features\n'
+                f'print([m for m in {HEAVY_MODULES!r} if m in sys.modules])')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        out = subprocess.check_output([sys.executable, '-c', code], env=env)
+        assert out.decode().strip().splitlines()[-1] == '[]'
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from deep_lyric_visualizer import instrumentation
+from deep_lyric_visualizer.instrumentation import span, traced
+
+
+@pytest.fixture
+def tracer():
+    yield instrumentation.enable()
+    instrumentation.disable()
+
+
+@traced('double')
+def double(x):
+    return 2 * x
+
+
+class TestInstrumentation:
+
+    def test_disabled(self):
+        assert instrumentation.get_tracer() is None
+        with span('stage') as sp:
+            sp.items = 3
+        assert double(2) == 4
+
+    def test_spans(self, tracer, tmp_path):
+        with span('outer', song='a') as sp:
+            sp.items = 2
+            assert double(2) == 4
+            assert double(3) == 6
+
+        assert [e['name'] for e in tracer.events] == \
+            ['double', 'double', 'outer']
+
+        summary = {row['name']: row for row in tracer.summary()}
+        assert summary['double']['calls'] == 2
+        assert summary['outer']['items'] == 2
+        assert summary['outer']['wall'] >= summary['double']['wall']
+
+        path = tmp_path / 'trace.json'
+        tracer.save(str(path))
+        events = json.loads(path.read_text())['traceEvents']
+        assert {e['ph'] for e in events} == {'X'}
+        assert events[-1]['args']['song'] == 'a'
+
+    def test_error(self, tracer):
+        with pytest.raises(ValueError):
+            with span('failing'):
+                raise ValueError('bad')
+        assert 'bad' in tracer.events[0]['args']['error']
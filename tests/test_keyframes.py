@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from deep_lyric_visualizer.render.keyframes import (KeyframeSelector, latent_deltas,
+                                                    slerp_positions, blend_frames)
+
+
+class TestKeyframes:
+
+    def test_select_respects_max_gap(self):
+        selector = KeyframeSelector(delta_threshold=np.inf,
+                                    onset_threshold=np.inf, max_gap=4)
+        keyframes = selector.select(np.zeros(10))
+
+        assert keyframes.tolist() == [0, 4, 8, 9]
+
+        with pytest.raises(ValueError):
+            KeyframeSelector(max_gap=0)
+
+    def test_select_on_onsets_and_deltas(self):
+        selector = KeyframeSelector(delta_threshold=2, onset_threshold=0.5,
+                                    max_gap=100)
+        deltas = np.array([0, 1, 1, 0, 0, 0, 0, 0])
+        onsets = np.array([0, 0, 0, 0, 0, 0.9, 0, 0])
+
+        assert selector.select(deltas, onsets).tolist() == [0, 2, 5, 7]
+
+    def test_latent_deltas(self):
+        noise = np.outer(np.arange(5), np.ones(3))
+        classes = np.zeros((6, 4))
+        deltas = latent_deltas(noise, classes)
+
+        assert len(deltas) == 5
+        assert deltas[0] == 0
+        assert np.allclose(deltas[1:], 0.5)
+
+    def test_blend_between_keyframes(self):
+        latents = np.array([[1, 0], [1, 1], [0, 1]])
+        keyframes = np.array([0, 2])
+        left, weights = slerp_positions(latents, keyframes)
+
+        assert left.tolist() == [0, 0, 0]
+        assert np.allclose(weights, [0, 0.5, 1])
+
+        images = [np.zeros((2, 2, 3), np.uint8),
+                  np.full((2, 2, 3), 100, np.uint8)]
+        frames = list(blend_frames(images, left, weights))
+
+        assert [f[0, 0, 0] for f in frames] == [0, 50, 100]
+        assert all(f.dtype == np.uint8 for f in frames)
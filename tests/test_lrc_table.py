@@ -0,0 +1,99 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+
+from deep_lyric_visualizer.generator.generation_environment import GenerationEnvironment
+from deep_lyric_visualizer.lyrics.lrc_table import LrcTable
+from deep_lyric_visualizer.lyrics.lyrics import Lyrics
+
+LRC = '''[ti:Song]
+[ar:Someone]
+[offset:500]
+
+[00:12.00]Second line
+[00:01.50][01:02.25]Chorus
+not synced
+[00:05]
+'''
+
+
+def make_table():
+    table = LrcTable.from_lines(LRC.splitlines(keepends=True))
+    table.set_categories([[4, 2, 9], None, [7], [1, 3, 5]])
+    return table
+
+
+class TestLrcTable:
+
+    def test_parse(self):
+        table = LrcTable.from_lines(iter(LRC.splitlines(keepends=True)))
+        assert np.allclose(table.times, [2, 5.5, 12.5, 62.75])
+        assert table.lines() == ['Chorus', '', 'Second line', 'Chorus']
+        assert table.text == 'ChorusSecond lineChorus'
+
+    def test_file(self, tmp_path):
+        path = tmp_path / 'song.lrc'
+        path.write_text(LRC)
+        assert LrcTable.from_file(str(path)).lines() == \
+            LrcTable.from_lines(LRC.splitlines()).lines()
+
+    def test_time_index(self):
+        table = make_table()
+        assert table.lines()[table.between(5, 13)] == ['', 'Second line']
+        assert table.line_at(np.array([0, 2, 12.6, 100])).tolist() == \
+            [-1, 0, 2, 3]
+
+    def test_topics(self):
+        table = make_table()
+        table.assign_topics(2)
+        assert table.topic_ids.tolist() == [[4, 2], [-1, -1], [7, -1],
+                                            [1, 3]]
+        assert table.has_topics().tolist() == [True, False, True, True]
+
+
+class TestLyrics:
+
+    def make_lyrics(self):
+        env = Mock(GenerationEnvironment)
+        env.SAVE_FILETYPE = 'pickle'
+        env.fallback_embedder.return_value = None
+        lyrics = Lyrics('song', gen_env=env)
+        lyrics._lrc = make_table()
+        lyrics.lrc.assign_topics(2)
+        return lyrics
+
+    def test_frame_topic_index(self):
+        index = self.make_lyrics().frame_topic_index(1, 14, [100, 200])
+        assert index[[0, 2, 5, 12, 13]].tolist() == \
+            [[100, 200], [4, 2], [4, 2], [4, 2], [7, 200]]
+
+    def test_frame_topic_index_matches_merge_asof(self):
+        # the pivot + merge_asof + fillna that frame_topic_index replaced
+        lyrics = self.make_lyrics()
+        universal = [100, 200]
+        frame_rate = 4
+        n_frames = 280
+
+        df = pd.DataFrame()
+        df['frame_times'] = pd.to_timedelta(
+            [j / frame_rate for j in range(n_frames)], unit='s')
+        time_df = lyrics.generate_lyric_df().pivot(
+            index='time', columns='topic', values='topic_id')
+        mrg = pd.merge_asof(df, time_df, left_on='frame_times',
+                            right_on='time')
+        mrg.fillna(pd.Series(universal), inplace=True)
+        expected = mrg.iloc[:, 1:].astype(int).values
+
+        index = lyrics.frame_topic_index(frame_rate, n_frames, universal)
+        # frames before the first line, and between line starts
+        assert index[0].tolist() == universal
+        assert index[20].tolist() == [4, 2]
+        assert np.array_equal(index, expected)
+
+    def test_generate_lyric_df(self):
+        df = self.make_lyrics().generate_lyric_df()
+        assert df['topic_id'].tolist() == [4, 2, 7, 1, 3]
+        assert df['topic'].tolist() == [0, 1, 0, 0, 1]
+        assert df['lyrics'].tolist()[2] == 'Second line'
+        assert df['time'].iloc[2] == np.timedelta64(12500, 'ms')
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from deep_lyric_visualizer.nlp.ngram_embedder import (NgramEmbedder,
+                                                      build_ngram_table,
+                                                      char_ngrams)
+
+VOCAB = ['dreaming', 'walking', 'tiger', 'nothing']
+
+
+@pytest.fixture
+def embedder(tmp_path):
+    path = str(tmp_path / 'ngrams')
+    build_ngram_table(VOCAB, np.eye(len(VOCAB)), path, n_buckets=4096)
+    return NgramEmbedder(path)
+
+
+class TestNgramEmbedder:
+
+    def test_char_ngrams(self):
+        assert char_ngrams('cat', 3, 3) == ['<ca', 'cat', 'at>']
+        assert char_ngrams('a', 4, 5) == ['<a>']
+
+    def test_similar_words(self, embedder):
+        vectors, found = embedder.get_word_vectors(
+            ['dreamin', 'walkin', 'nothin', 'qqqq'])
+        assert found.tolist() == [True, True, True, False]
+        assert vectors[:3].argmax(axis=1).tolist() == [0, 1, 3]
+        assert np.array_equal(vectors[3], np.zeros(len(VOCAB)))
+
+    def test_get_word_vector(self, embedder):
+        assert embedder.get_word_vector('tigers').argmax() == 2
+        with pytest.raises(KeyError):
+            embedder.get_word_vector('qqqq')
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import pytest
+
+from deep_lyric_visualizer.render.pipeline import pipeline
+
+
+def slow(item):
+    time.sleep(0.02)
+    return item
+
+
+class TestPipeline:
+
+    def test_order_and_overlap(self):
+        def source():
+            for i in range(20):
+                time.sleep(0.02)
+                yield i
+
+        start = time.perf_counter()
+        items = list(pipeline(source(), slow, lambda i: i * 2))
+        assert items == [i * 2 for i in range(20)]
+        # three stages of 0.4 seconds each, run at the same time
+        assert time.perf_counter() - start < 1
+
+    def test_errors(self):
+        def fail(item):
+            if item == 3:
+                raise KeyError(item)
+            return item
+
+        with pytest.raises(KeyError):
+            list(pipeline(iter(range(10)), fail))
+
+        def source():
+            yield 1
+            raise ValueError()
+
+        with pytest.raises(ValueError):
+            list(pipeline(source(), slow))
+
+    def test_close(self):
+        n_threads = threading.active_count()
+        items = pipeline(iter(range(1000)), slow, queue_size=2)
+        assert next(items) == 0
+        items.close()
+        assert threading.active_count() == n_threads
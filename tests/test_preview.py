@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+import torch
+
+from deep_lyric_visualizer.render.preview import FrameQueue, PreviewStream
+
+
+class SlowGAN(torch.nn.Module):
+
+    def __init__(self, delay=0):
+        super().__init__()
+        self.delay = delay
+
+    def forward(self, z, class_label, truncation):
+        time.sleep(self.delay)
+        return torch.rand(len(z), 3, 8, 8)
+
+
+class TestFrameQueue:
+
+    def test_drops_oldest(self):
+        queue = FrameQueue(2)
+        for frame in [b'a', b'b', b'c']:
+            queue.put(frame)
+        queue.close()
+        assert queue.dropped == 1
+        assert [queue.get(), queue.get(), queue.get()] == [b'b', b'c', None]
+
+    def test_timeout(self):
+        assert FrameQueue().get(timeout=0.01) is None
+
+
+class TestPreviewStream:
+
+    def make_stream(self, delay, fps, n_frames=10):
+        return PreviewStream(SlowGAN(delay), np.zeros((n_frames, 128)),
+                             np.zeros((n_frames, 1000)), fps, queue_size=100)
+
+    def test_mjpeg(self):
+        stream = self.make_stream(0, 20).start()
+        parts = list(stream.mjpeg())
+        assert len(parts) == stream.rendered == 10
+        assert parts[0].startswith(b'--frame\r\nContent-Type: image/jpeg')
+        assert parts[0][-4:] == b'\xff\xd9\r\n'
+
+    def test_skips_late_frames(self):
+        stream = self.make_stream(0.05, 100).start()
+        list(stream.mjpeg())
+        assert stream.skipped > 0
+        assert stream.rendered + stream.skipped == 10
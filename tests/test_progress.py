@@ -0,0 +1,86 @@
+import numpy as np
+import torch
+
+from deep_lyric_visualizer.render.progress import ProgressReporter, read_progress, render_status
+from deep_lyric_visualizer.render.renderer import FrameRenderer
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        return self.now
+
+
+class NoiseGAN(torch.nn.Module):
+
+    def forward(self, z, class_label, truncation):
+        return z[:, :48].reshape(-1, 3, 4, 4)
+
+
+class TestProgressReporter:
+
+    def test_events(self, tmp_path):
+        path = str(tmp_path / 'progress' / 'render.json')
+        clock = Clock()
+        progress = ProgressReporter(path, min_interval=1, clock=clock)
+        assert read_progress(path) is None
+
+        progress.start('render', 100)
+        assert read_progress(path)['done'] == 0
+
+        # updates are written at most once per min_interval
+        clock.now = 0.5
+        progress.update(10)
+        assert read_progress(path)['done'] == 0
+        clock.now = 2
+        progress.update(10)
+        event = read_progress(path)
+        assert event['stage'] == 'render'
+        assert event['state'] == 'running'
+        assert (event['done'], event['total']) == (20, 100)
+        assert event['fps'] == 10
+        assert event['eta'] == 8
+
+        clock.now = 3
+        progress.update(80)
+        assert read_progress(path)['done'] == 100
+
+        progress.start('write_video')
+        assert read_progress(path)['eta'] is None
+        progress.fail('ffmpeg exited')
+        event = read_progress(path)
+        assert event['state'] == 'failed'
+        assert event['message'] == 'ffmpeg exited'
+
+    def test_render_status(self, tmp_path):
+        path = str(tmp_path / 'render.json')
+        progress = ProgressReporter(path)
+        progress.start('render', 10)
+        progress.finish()
+        event = read_progress(path)
+
+        # reported done by the render, but not in the store yet
+        status = render_status(event, stored=False, running=True)
+        assert (status['stage'], status['state']) == ('finalizing', 'running')
+        assert event['state'] == 'done'
+
+        assert render_status(event, stored=True, running=False)['state'] == \
+            'done'
+        assert render_status(event, stored=False, running=False)['state'] == \
+            'failed'
+        assert render_status(None, stored=False, running=False) is None
+
+    def test_renderer_reports_batches(self, tmp_path):
+        path = str(tmp_path / 'render.json')
+        progress = ProgressReporter(path, min_interval=0)
+        renderer = FrameRenderer(NoiseGAN(), batch_size=4, device='cpu',
+                                 progress=progress)
+
+        noise = np.random.RandomState(0).rand(10, 128)
+        renderer.render(noise, np.zeros((10, 1000)))
+        event = read_progress(path)
+        assert (event['stage'], event['done'], event['total']) == \
+            ('render', 10, 10)
@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+import torch
+
+from deep_lyric_visualizer.render.renderer import FrameRenderer, is_out_of_memory
+
+
+class SmallMemoryGAN(torch.nn.Module):
+
+    def __init__(self, max_batch):
+        super().__init__()
+        self.max_batch = max_batch
+        self.batches = []
+        self.failures = 0
+
+    def forward(self, z, class_label, truncation):
+        if len(z) > self.max_batch:
+            self.failures += 1
+            raise RuntimeError('CUDA out of memory. Tried to allocate 2 GiB')
+        self.batches.append(len(z))
+        return z[:, :48].reshape(-1, 3, 4, 4)
+
+
+class TestFrameRenderer:
+
+    def test_is_out_of_memory(self):
+        assert is_out_of_memory(MemoryError())
+        assert is_out_of_memory(RuntimeError(
+            "DefaultCPUAllocator: can't allocate memory: you tried to "
+            "allocate 4294967296 bytes"))
+        assert not is_out_of_memory(RuntimeError('size mismatch'))
+
+    def test_backs_off(self):
+        model = SmallMemoryGAN(3)
+        renderer = FrameRenderer(model, batch_size=10, device='cpu')
+        noise = np.random.RandomState(0).rand(10, 128)
+        output = renderer.infer(noise, np.zeros((10, 1000)))
+
+        assert np.allclose(output.reshape(10, -1), noise[:, :48])
+        assert renderer.batch_size == 2
+        assert model.batches == [2, 2, 1, 2, 2, 1]
+
+    def test_back_off_lasts(self):
+        model = SmallMemoryGAN(4)
+        renderer = FrameRenderer(model, batch_size=8, device='cpu')
+        noise = np.random.RandomState(0).rand(40, 128)
+        frames = renderer.render(noise, np.zeros((40, 1000)))
+
+        assert len(frames) == 40
+        assert model.failures == 1
+        assert model.batches == [4] * 10
+
+        with pytest.raises(RuntimeError):
+            FrameRenderer(SmallMemoryGAN(0), device='cpu').infer(
+                noise[:1], np.zeros((1, 1000)))
+
+    def test_tune(self):
+        noise = np.random.RandomState(0).rand(20, 128)
+        classes = np.zeros((20, 1000))
+
+        renderer = FrameRenderer(SmallMemoryGAN(5), batch_size='auto',
+                                 device='cpu', memory_budget_mb=1e9)
+        frames = renderer.render(noise, classes)
+        assert len(frames) == 20
+        assert renderer.batch_size in (1, 2, 4)
+        assert [t['batch_size'] for t in renderer.tuning][-1] <= 4
+
+        renderer = FrameRenderer(SmallMemoryGAN(5), device='cpu',
+                                 memory_budget_mb=1e-3)
+        assert renderer.tune(noise, classes) == 1
+
+    def test_reset_peak_memory(self, monkeypatch):
+        class OldCuda:
+            # torch.cuda of torch 1.3, without reset_peak_memory_stats
+
+            def __init__(self):
+                self.resets = []
+
+            def reset_max_memory_allocated(self, device=None):
+                self.resets.append(('max_memory_allocated', device))
+
+        class NewCuda(OldCuda):
+
+            def reset_peak_memory_stats(self, device=None):
+                self.resets.append(('peak_memory_stats', device))
+
+        renderer = FrameRenderer(SmallMemoryGAN(5), device='cpu')
+        renderer.device = torch.device('cuda')
+        for cuda, reset in [(OldCuda(), 'max_memory_allocated'),
+                            (NewCuda(), 'peak_memory_stats')]:
+            monkeypatch.setattr(torch, 'cuda', cuda)
+            renderer._reset_peak_memory()
+            assert cuda.resets == [(reset, renderer.device)]
+
+    def test_render_to(self):
+        class ListEncoder(list):
+            write = list.append
+
+        noise = np.random.RandomState(0).rand(10, 128)
+        renderer = FrameRenderer(SmallMemoryGAN(4), batch_size=4,
+                                 device='cpu')
+        encoder = ListEncoder()
+        assert renderer.render_to(noise, np.zeros((10, 1000)), encoder) == 10
+        frames = renderer.render(noise, np.zeros((10, 1000)))
+        assert np.array_equal(np.stack(encoder), np.stack(frames))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from deep_lyric_visualizer.render.smoothing import smooth
+
+
+class TestSmoothing:
+
+    def test_linear_covers_every_frame(self):
+        class_vectors = np.repeat(np.arange(5.0), 2)[:9, np.newaxis]
+        smoothed = smooth(class_vectors, 2)
+
+        assert smoothed.shape == (9, 1)
+        # chunk means are 0, 1, 2, 3 and a partial chunk of 4
+        assert np.allclose(smoothed[:, 0], [0, 1, 1, 2, 2, 3, 3, 4, 4])
+
+    def test_nan_and_no_smoothing(self):
+        class_vectors = np.array([[np.nan, 1], [1, 1]])
+
+        assert np.array_equal(smooth(class_vectors, 1), [[0, 1], [1, 1]])
+
+    @pytest.mark.parametrize('method', ['linear', 'ema', 'savgol'])
+    def test_methods_keep_length(self, method):
+        class_vectors = np.random.RandomState(0).rand(103, 20)
+        smoothed = smooth(class_vectors, 10, method)
+
+        assert smoothed.shape == class_vectors.shape
+        assert smoothed.dtype == np.float32
+        assert smoothed.min() >= 0
+        assert smoothed.std(axis=0).mean() < class_vectors.std(axis=0).mean()
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            smooth(np.zeros((4, 2)), 2, 'median')
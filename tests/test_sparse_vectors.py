@@ -0,0 +1,64 @@
+import numpy as np
+from scipy import sparse
+
+from deep_lyric_visualizer.render.keyframes import latent_deltas
+from deep_lyric_visualizer.render.smoothing import smooth
+from deep_lyric_visualizer.render.sparse_vectors import (from_pairs, to_sparse, densify,
+                                                         compact, expand,
+                                                         save_class_vectors,
+                                                         load_class_vectors)
+
+
+def random_class_vectors(n=50, n_classes=1000, per_frame=3):
+    rng = np.random.RandomState(0)
+    dense = np.zeros((n, n_classes), dtype=np.float32)
+    for row in dense:
+        row[rng.choice(20, per_frame, replace=False) * 7] = rng.rand(per_frame)
+    return dense
+
+
+class TestSparseVectors:
+
+    def test_pairs_round_trip(self):
+        dense = random_class_vectors()
+        indices = [np.flatnonzero(row) for row in dense]
+        weights = [row[idx] for row, idx in zip(dense, indices)]
+        matrix = from_pairs(indices, weights)
+
+        assert sparse.issparse(matrix)
+        assert matrix.nnz == 150
+        assert np.array_equal(densify(matrix), dense)
+        assert np.array_equal(densify(matrix[10:20]), dense[10:20])
+
+    def test_compact_expand(self):
+        dense = random_class_vectors()
+        used, compacted = compact(dense)
+
+        assert compacted.shape == (50, len(used))
+        assert np.array_equal(densify(expand(used, compacted)), dense)
+
+    def test_save_load(self, tmp_path):
+        dense = random_class_vectors()
+        path = str(tmp_path / 'class_vectors.npz')
+        save_class_vectors(path, dense)
+
+        assert np.array_equal(densify(load_class_vectors(path)), dense)
+
+        legacy = str(tmp_path / 'legacy.npy')
+        np.save(legacy, dense)
+        loaded = load_class_vectors(str(tmp_path / 'legacy.npz'))
+        assert np.array_equal(densify(loaded), dense)
+
+    def test_sparse_smoothing_and_deltas_match_dense(self):
+        dense = random_class_vectors()
+        matrix = to_sparse(dense)
+        noise = np.random.RandomState(1).rand(50, 128)
+
+        for method in ['linear', 'ema', 'savgol']:
+            smoothed = smooth(matrix, 5, method)
+            assert sparse.issparse(smoothed)
+            assert np.allclose(densify(smoothed), smooth(dense, 5, method),
+                               atol=1e-6)
+
+        assert np.allclose(latent_deltas(noise, matrix),
+                           latent_deltas(noise, dense))
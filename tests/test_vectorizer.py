@@ -0,0 +1,125 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+from deep_lyric_visualizer.generator.generation_environment import GenerationEnvironment
+from deep_lyric_visualizer.image_categories.image_category_vectorizer import ImageCategoryVectorizer
+from deep_lyric_visualizer.nlp.vectorizer import Vectorizer
+
+
+class CountingEmbedder:
+
+    def __init__(self, words, dim=4):
+        self.vectors = {w: np.arange(dim, dtype=np.float32) + i
+                        for i, w in enumerate(words)}
+        self.calls = 0
+
+    def get_word_vector(self, word):
+        self.calls += 1
+        return self.vectors[word]
+
+
+def make_env(embedder, fallback=None):
+    env = Mock(GenerationEnvironment)
+    env.SAVE_FILETYPE = 'pickle'
+    env.wordvec_dim = 4
+    env.word_embedder.return_value = embedder
+    env.fallback_embedder.return_value = fallback
+    return env
+
+
+class TestVectorizer:
+
+    def test_get_word_vectors(self):
+        embedder = CountingEmbedder(['dog', 'cat'])
+        vectorizer = Vectorizer(make_env(embedder))
+
+        vectors, found = vectorizer.get_word_vectors(
+            ['dog', 'gonna', 'dog', 'cat'])
+        assert found.tolist() == [True, False, True, True]
+        assert np.array_equal(vectors[0], embedder.vectors['dog'])
+        assert np.array_equal(vectors[1], np.zeros(4))
+        assert vectorizer.oov_tokens == {'gonna'}
+        assert embedder.calls == 3
+
+        # known tokens and known missing tokens are not looked up again
+        vectorizer.get_word_vectors(['cat', 'gonna'])
+        assert embedder.calls == 3
+
+    def test_memoize_vectorize_tokens(self):
+        vectorizer = Vectorizer(make_env(CountingEmbedder(['dog'])))
+        assert vectorizer.memoize_vectorize_tokens(['dog', 'ya']) == 50
+        assert list(vectorizer.word_to_vec) == ['dog']
+
+    def test_vectorize_word(self):
+        embedder = CountingEmbedder(['dog'])
+        vectorizer = Vectorizer(make_env(embedder))
+        assert np.array_equal(vectorizer.vectorize_word('dog'),
+                              embedder.vectors['dog'])
+        for _ in range(2):
+            with pytest.raises(KeyError):
+                vectorizer.vectorize_word('gonna')
+        assert embedder.calls == 2
+
+
+class TestImageCategoryVectorizer:
+
+    def test_mean_strategy(self):
+        embedder = CountingEmbedder(['tiger', 'shark', 'fish'])
+        vectorizer = ImageCategoryVectorizer(make_env(embedder))
+
+        category = [['tiger', 'shark'], ['xyz'], ['fish', 'abc']]
+        expected = ((embedder.vectors['tiger'] + embedder.vectors['shark']) / 2
+                    + embedder.vectors['fish']) / 2
+        assert np.allclose(vectorizer._mean_strategy(category), expected)
+        assert np.allclose(vectorizer._mean_strategy([['xyz']]), np.zeros(4))
+
+    def test_vectorize_categories(self):
+        embedder = CountingEmbedder(['tiger', 'shark', 'fish'])
+        vectorizer = ImageCategoryVectorizer(make_env(embedder))
+
+        categories = {3: [['tiger', 'shark'], ['fish']], 7: [['xyz'], []],
+                      1: [['fish', 'tiger']]}
+        vectors = vectorizer.vectorize_categories(categories)
+        assert list(vectors) == [3, 7, 1]
+        for id_, category in categories.items():
+            assert np.allclose(vectors[id_],
+                               vectorizer._mean_strategy(category))
+        assert np.allclose(vectors[7], np.zeros(4))
+
+    def test_strategies(self):
+        embedder = CountingEmbedder(['tiger', 'shark', 'fish'])
+        vectorizer = ImageCategoryVectorizer(make_env(embedder))
+        v = embedder.vectors
+
+        first = vectorizer.vectorize_category([['tiger'], ['shark']], 'first')
+        assert np.allclose(first, (v['tiger'] + v['shark'] / 2) / 1.5)
+
+        # fish is in both categories, so it counts less than shark
+        idf = vectorizer.vectorize_categories(
+            {0: [['tiger', 'fish']], 1: [['shark', 'fish']]}, 'idf')
+        weight = np.log(3 / 2) + 1
+        assert np.allclose(idf[1], (weight * v['shark'] + v['fish'])
+                           / (weight + 1))
+
+        with pytest.raises(ValueError):
+            vectorizer.vectorize_category([['tiger']], 'median')
+
+
+class FakeFallback:
+
+    def get_word_vectors(self, words):
+        found = np.array([w.endswith('in') for w in words])
+        return np.ones((len(words), 4), dtype=np.float32), found
+
+
+class TestVectorizerFallback:
+
+    def test_fallback(self):
+        vectorizer = Vectorizer(make_env(CountingEmbedder(['dog']),
+                                         FakeFallback()))
+        vectors, found = vectorizer.get_word_vectors(['dog', 'dreamin', 'ya'])
+        assert found.tolist() == [True, True, False]
+        assert np.array_equal(vectors[1], np.ones(4))
+        assert vectorizer.oov_tokens == {'ya'}
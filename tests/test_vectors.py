@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from deep_lyric_visualizer.render.audio_features import AudioFeatures
+from deep_lyric_visualizer.render.vectors import lyric_topics, song_vectors
+
+
+class FakeLyrics:
+
+    songname = 'song'
+
+    def __init__(self, saved=True, readable=True):
+        self.saved = saved
+        self.readable = readable
+        self.assigned = 0
+
+    def load(self):
+        if not self.saved:
+            raise FileNotFoundError(self.songname)
+
+    def assign_topics(self, n):
+        self.assigned += 1
+        self.readable = True
+
+    def generate_lyric_df(self):
+        if not self.readable:
+            raise KeyError('topic_id')
+        return pd.DataFrame(dict(topic_id=[3, 1, 3, 2, 3, 1]))
+
+    def frame_topic_index(self, fps, n_frames, universal):
+        return np.tile(universal, (n_frames, 1))
+
+
+class TestLyricTopics:
+
+    def test_saved(self):
+        lyrics = FakeLyrics()
+        lyric_df, universal = lyric_topics(lyrics, 2)
+        assert universal == [3, 1]
+        assert lyrics.assigned == 0
+
+    def test_assigns_missing_or_unreadable_topics(self):
+        for lyrics in (FakeLyrics(saved=False), FakeLyrics(readable=False)):
+            assert lyric_topics(lyrics, 3)[1] == [3, 1, 2]
+            assert lyrics.assigned == 1
+
+
+class TestSongVectors:
+
+    def test_seeded(self):
+        features = AudioFeatures.from_power(
+            np.random.RandomState(0).rand(50),
+            np.random.RandomState(1).rand(12, 50))
+        lyrics = FakeLyrics()
+        _, universal = lyric_topics(lyrics, 12)
+
+        vectors = [song_vectors(features, lyrics, universal, universal, 0.02,
+                                num_classes=3, seed=0)
+                   for _ in range(2)]
+        noise_vectors, class_vectors, class_frames = vectors[0]
+        assert len(noise_vectors) == class_vectors.shape[0]
+        assert np.array_equal(noise_vectors, vectors[1][0])
+        assert np.array_equal(class_vectors.toarray(),
+                              vectors[1][1].toarray())
@@ -0,0 +1,75 @@
+import threading
+import time
+
+from deep_lyric_visualizer.render.video_cache import RenderJobs, VideoStore
+
+
+def make_video(store, fingerprint, size):
+    path = store.temporary_path(fingerprint)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    with open(path + '.json', 'w') as f:
+        f.write('{}')
+    return path
+
+
+class TestVideoStore:
+
+    def test_put_get(self, tmp_path):
+        store = VideoStore(str(tmp_path))
+        assert store.get('abc') is None
+
+        path = store.put('abc', make_video(store, 'abc', 10))
+        assert store.get('abc') == path
+        assert open(path, 'rb').read() == b'x' * 10
+        assert (tmp_path / 'abc.mp4.json').exists()
+        assert (store.hits, store.misses) == (1, 1)
+
+        # found again after a restart, without the temporary directory
+        assert VideoStore(str(tmp_path)).get('abc') == path
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        store = VideoStore(str(tmp_path), max_bytes=25)
+        for fingerprint in ['a', 'b']:
+            store.put(fingerprint, make_video(store, fingerprint, 10))
+        store.get('a')
+        store.put('c', make_video(store, 'c', 10))
+
+        assert store.get('b') is None
+        assert not (tmp_path / 'b.mp4.json').exists()
+        assert store.get('a') and store.get('c')
+        assert store.size == 20
+
+
+class TestRenderJobs:
+
+    def test_coalesces(self):
+        release = threading.Event()
+        calls = []
+
+        def render(fingerprint):
+            calls.append(fingerprint)
+            release.wait(5)
+            return fingerprint
+
+        jobs = RenderJobs(max_workers=2)
+        first, started = jobs.submit('a', render, 'a')
+        assert started
+        second, started = jobs.submit('a', render, 'a')
+        assert not started and second is first
+        other, started = jobs.submit('b', render, 'b')
+        assert started
+
+        release.set()
+        assert first.result() == 'a' and other.result() == 'b'
+        assert sorted(calls) == ['a', 'b']
+
+        # the job is forgotten by a callback after its result is set
+        for _ in range(100):
+            if jobs.get('a') is None:
+                break
+            time.sleep(0.01)
+        assert jobs.get('a') is None
+
+        third, started = jobs.submit('a', render, 'a')
+        assert started and third.result() == 'a'